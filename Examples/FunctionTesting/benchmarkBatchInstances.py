@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkBatchInstances.py
+#
+#     Generate the 100 instance files of a 10x10 grid of [wght] and [wdth] values,
+#     one by one with generateInstance( ) and by a BatchInstancer in one process and
+#     in a pool of processes. The files of the BatchInstancer must be the same, for
+#     any number of processes.
+#
+import os
+import shutil
+import tempfile
+import hashlib
+import multiprocessing
+from time import time
+
+import pagebot
+from pagebot.fonttoolbox.variablefontbuilder import generateInstance
+from pagebot.fonttoolbox.batchinstancer import BatchInstancer
+
+FONT_PATH = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+STEPS = 10 # Grid of STEPS x STEPS instances.
+
+def getDigests(paths):
+    digests = []
+    for path in paths:
+        f = open(path, 'rb')
+        digests.append(hashlib.md5(f.read()).hexdigest())
+        f.close()
+    return digests
+
+locations = BatchInstancer(FONT_PATH).getGridLocations(['wght', 'wdth'], steps=STEPS)
+
+targetDirectory = tempfile.mkdtemp()
+t = time()
+for location in locations:
+    generateInstance(FONT_PATH, location, targetDirectory)
+t = time() - t
+print 'generateInstance            %0.2fs  %0.1fms/instance' % (t, t*1000/len(locations))
+shutil.rmtree(targetDirectory)
+
+digests = None
+for processes in (1, multiprocessing.cpu_count(), 4):
+    targetDirectory = tempfile.mkdtemp()
+    instancer = BatchInstancer(FONT_PATH, processes=processes)
+    t = time()
+    paths = instancer.generate(locations, targetDirectory)
+    t = time() - t
+    if digests is None:
+        digests = getDigests(paths)
+        same = 'reference'
+    else:
+        same = getDigests(paths) == digests and 'same files' or 'DIFFERENT FILES'
+    print 'BatchInstancer(processes=%d) %0.2fs  %0.1fms/instance  %s  %s' % (processes, t,
+        t*1000/len(locations), instancer, same)
+    shutil.rmtree(targetDirectory)
@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkComposer.py
+#
+#     Compose a galley of text and images into books of increasing length, with
+#     pages that are made from a template on demand. The template has two linked
+#     text boxes and a Placer for the images. The number of pages per second
+#     should not go down for longer books.
+#     Text is measured by the headless TextLayout, so this also runs without DrawBot.
+#
+import os
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import TextBox, Placer, Rect, Galley
+from pagebot.elements.pbpage import Template
+from pagebot.composer import Composer
+from pagebot.fonttoolbox.textlayout import TextLayout, FONT_PATH
+from pagebot import getFSAttributes
+
+TextBox.TEXT_LAYOUT = TextLayout(defaultFont=os.path.join(FONT_PATH, 'fontbureau/AmstelvarAlpha-VF.ttf'))
+PAGES = (10, 100, 1000) # Approximate number of pages of the book.
+FRAGMENT = u'Lorem ipsum dolor sit amet, consectetur adipiscing elit %d. '
+
+template = Template(w=500, h=500, name='Chapter')
+TextBox('', parent=template, name='column1', x=30, y=30, w=200, h=120, nextElement='column2')
+TextBox('', parent=template, name='column2', x=270, y=30, w=200, h=120)
+Placer(parent=template, name='image', x=30, y=200, w=440, h=270)
+
+def makeGalley(pageCount):
+    u"""Answer a galley with about 13 fragments of text and one image per page."""
+    attributes = getFSAttributes(style=dict(font='Verdana', fontSize=10, leading=12))
+    galley = Galley()
+    for n in range(pageCount):
+        textBox = TextBox('', parent=galley)
+        for m in range(13):
+            textBox.textBuffer.appendText(FRAGMENT % m, attributes)
+        Rect(parent=galley, name='image%d' % n)
+    return galley
+
+for pageCount in PAGES:
+    galley = makeGalley(pageCount)
+    doc = Document(w=500, h=500, autoPages=1, template=template)
+    composer = Composer(makeNewPage=True)
+    t = time()
+    composer.compose(galley, doc)
+    print '%5d pages  %0.2fs  %s (%d measurements)' % (composer.pageCount, time() - t, composer, composer.measurements)
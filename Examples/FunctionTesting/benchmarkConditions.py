@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkConditions.py
+#
+#     Evaluate the conditions of many elements on a page repeatedly, calling
+#     condition.evaluate(e, score) for each condition in the list (as Element.evaluate
+#     did before) and with the compiled ConditionProgram of each element. Both must
+#     answer the same score. The speed is in simple conditions per second, so the
+#     compound Fit counts as its 4 parts.
+#
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Rect
+from pagebot.conditions import Fit, Left2Left, Top2Top, Center2Center, Bottom2Bottom
+from pagebot.conditions.score import Score
+
+ELEMENTS = 1000
+PASSES = 20
+
+def evaluateConditions(elements):
+    u"""Evaluate by dispatching through the condition list of each element."""
+    score = Score()
+    for e in elements:
+        for condition in e.conditions:
+            condition.evaluate(e, score)
+    return score
+
+def evaluatePrograms(elements):
+    u"""Evaluate by the compiled program of each element."""
+    score = Score()
+    for e in elements:
+        e.getConditionProgram().evaluate(e, score)
+    return score
+
+doc = Document(w=1000, h=1000, autoPages=1)
+page = doc[0]
+for n in range(ELEMENTS):
+    Rect(parent=page, x=n % 900, y=n % 800, w=50, h=50,
+        conditions=[Fit(), Left2Left(), Top2Top(), Center2Center(), Bottom2Bottom()])
+elements = page.elements
+stepCount = sum([len(e.getConditionProgram().steps) for e in elements])
+
+for name, evaluate in (('Conditions', evaluateConditions), ('Programs', evaluatePrograms)):
+    t = time()
+    for n in range(PASSES):
+        score = evaluate(elements)
+    t = time() - t
+    print '%-12s %s  %0.2fs  %d conditions/s' % (name, score, t, stepCount*PASSES/t)
@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkCssCascade.py
+#
+#     Measure the cost of e.css(name) on deep element trees, with and without
+#     the cached cascade. The names are the ones that newFS( ) queries for every string.
+#
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Element, Rect
+from pagebot.toolbox.cascade import cascadeGenerations
+
+DEPTHS = (10, 50, 200)
+ELEMENTS = 5000 # Total amount of elements in each tree.
+NAMES = ('font', 'fontSize', 'leading', 'rLeading', 'textFill', 'tracking', 'rTracking',
+    'xTextAlign', 'openTypeFeatures', 'tabs', 'hyphenation', 'language', 'indent', 'rIndent')
+
+def makeTree(doc, depth, total):
+    u"""Make columns of nested elements with the requested depth, until there are total elements.
+    Answer the list of leaf elements."""
+    page = doc[0]
+    leafs = []
+    count = 0
+    while count < total:
+        parent = page
+        for n in range(depth):
+            parent = Rect(parent=parent, w=10, h=10)
+            count += 1
+        leafs.append(parent)
+    return leafs
+
+def run(leafs, useCache, loops=10):
+    Element.CSS_CACHE = useCache
+    cascadeGenerations.reset()
+    t = time()
+    for n in range(loops):
+        for e in leafs:
+            for name in NAMES:
+                e.css(name)
+    return time() - t
+
+for depth in DEPTHS:
+    doc = Document(w=500, h=500, autoPages=1)
+    leafs = makeTree(doc, depth, ELEMENTS)
+    calls = 10 * len(leafs) * len(NAMES)
+    tPlain = run(leafs, False)
+    tCached = run(leafs, True)
+    print 'Depth %d, %d leafs, %d css calls: plain %0.3fs cached %0.3fs (%0.1fx) %s' % (depth, len(leafs), calls,
+        tPlain, tCached, tPlain/max(tCached, 0.000001), cascadeGenerations)
+Element.CSS_CACHE = True
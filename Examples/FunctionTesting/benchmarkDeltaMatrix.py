@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkDeltaMatrix.py
+#
+#     Calculate the glyph coordinates of Variable Fonts at random locations, glyph by
+#     glyph with GlyphCoordinates (the reference) and by the DeltaMatrix, and compare the
+#     results: the coordinates must be exactly the same, so the rounded coordinates in
+#     the instance files are the same too. Then make complete instances both ways.
+#
+import os
+from random import seed, uniform
+from time import time
+
+import pagebot
+from pagebot.fonttoolbox.instancecache import MasterFont
+from pagebot.fonttoolbox.deltamatrix import DeltaMatrix
+
+FONTS_PATH = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/'
+FONT_NAMES = ('AmstelvarAlpha-VF.ttf', 'Decovar-VF-2axes.ttf', 'Decovar-VF-chained3.ttf')
+LOCATIONS = 20
+
+def otRound(value):
+    return int(value + 0.5) if value >= 0 else -int(-value + 0.5)
+
+seed(LOCATIONS)
+for fontName in FONT_NAMES:
+    master = MasterFont(FONTS_PATH + fontName)
+    locations = []
+    for n in range(LOCATIONS):
+        location = {}
+        for tag, (minValue, defaultValue, maxValue) in master.axes.items():
+            location[tag] = uniform(minValue, maxValue)
+        locations.append(master.getNormalizedLocation(location))
+
+    t = time()
+    matrix = DeltaMatrix(master) # Also reads the variations of all glyphs, as used by the reference.
+    compile = time() - t
+
+    t = time()
+    reference = []
+    for location in locations:
+        reference.append([(name, master.getCoordinates(name, location)) for name in master.getGlyphNames()])
+    referenceTime = time() - t
+
+    t = time()
+    results = [matrix.getGlyphCoordinates(location) for location in locations]
+    matrixTime = time() - t
+
+    different = rounded = 0
+    for glyphCoordinates, result in zip(reference, results):
+        result = dict(result)
+        for name, coordinates in glyphCoordinates:
+            if coordinates is None:
+                if name in result:
+                    different += 1
+            elif list(coordinates) != list(result[name]):
+                different += 1
+                if [(otRound(x), otRound(y)) for x, y in coordinates] != [(otRound(x), otRound(y)) for x, y in result[name]]:
+                    rounded += 1
+    print '%s %s compiled in %0.2fs' % (fontName, matrix, compile)
+    print '    GlyphCoordinates %6.1fms/location' % (referenceTime*1000/LOCATIONS)
+    print '    DeltaMatrix      %6.1fms/location  Different glyphs: %d  Rounded different: %d' % (
+        matrixTime*1000/LOCATIONS, different, rounded)
+
+    for useMatrix in (False, True):
+        master.DELTA_MATRIX = useMatrix
+        t = time()
+        for location in locations:
+            master.instantiate(location)
+        t = time() - t
+        print '    Instances %-18s %6.1fms/instance' % (useMatrix and '(DeltaMatrix)' or '(GlyphCoordinates)',
+            t*1000/LOCATIONS)
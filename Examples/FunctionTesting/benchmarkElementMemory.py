@@ -0,0 +1,75 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkElementMemory.py
+#
+#     Report the amount of bytes per element, for a grid of small elements, as in tables,
+#     Bitcount grids and scatter plots. The size is measured by walking all objects that
+#     are referred to by the elements. Shared objects are counted only once.
+#     The "used" column shows the size after all elements answered their lazy attributes,
+#     such as e.info, e.report and e.timeMarks, which is how elements were always initialized.
+#
+import sys
+import weakref
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Rect, Oval
+from pagebot.elements.element import Element
+
+COUNTS = (1000, 10000, 50000)
+
+def getDeepSize(obj, seen):
+    u"""Answer the size of obj and all objects it refers to, that are not in seen.
+    Don't follow the references to other elements, the document and weakrefs."""
+    if id(obj) in seen or isinstance(obj, (Document, weakref.ref, type)) or callable(obj):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += getDeepSize(key, seen) + getDeepSize(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            if not isinstance(value, Element):
+                size += getDeepSize(value, seen)
+    else:
+        for cls in type(obj).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name not in ('__dict__', '__weakref__'):
+                    size += getDeepSize(getattr(obj, name, None), seen)
+        if hasattr(obj, '__dict__'):
+            size += getDeepSize(obj.__dict__, seen)
+    return size
+
+def makeGrid(count):
+    u"""Answer a page with count small elements."""
+    doc = Document(w=1000, h=1000, autoPages=1)
+    page = doc[0]
+    for n in range(count):
+        if n % 2:
+            Rect(parent=page, x=n % 100 * 10, y=n / 100 * 10, w=8, h=8, fill=(1, 0, 0))
+        else:
+            Oval(parent=page, x=n % 100 * 10, y=n / 100 * 10, w=8, h=8, fill=(0, 0, 1))
+    return doc, page
+
+for count in COUNTS:
+    t = time()
+    doc, page = makeGrid(count)
+    t = time() - t
+    seen = set()
+    size = sum([getDeepSize(e, seen) for e in page.elements])
+    for e in page.elements: # Answer the lazy attributes, as drawing and building would.
+        e.info, e.report, e.timeMarks
+    seen = set()
+    usedSize = sum([getDeepSize(e, seen) for e in page.elements])
+    print '%6d elements: %5d bytes/element, used %5d bytes/element, created in %0.2fs' % (count,
+        size/count, usedSize/count, t)
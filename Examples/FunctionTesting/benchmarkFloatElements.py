@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkFloatElements.py
+#
+#     Float many elements into a page with the Float2Top condition, with the skylines
+#     of the float layout, with the spatial index of the page elements and with neither.
+#     All runs must answer the same positions. The elements start in random columns,
+#     so they stack as bars of a histogram.
+#
+from random import seed, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Rect
+from pagebot.elements.element import Element
+from pagebot.conditions import Float2Top
+
+COUNTS = (1000, 3000, 10000)
+LINEAR_MAX = 1000 # Floating without index takes too long for larger amounts.
+
+def floatElements(count, useIndex, useLayout):
+    u"""Answer the list of positions after floating count elements of random size into a page."""
+    Element.SPATIAL_INDEX = useIndex
+    Element.FLOAT_LAYOUT = useLayout
+    seed(count)
+    doc = Document(w=1000, h=100000, originTop=True, autoPages=1)
+    page = doc[0]
+    for n in range(count):
+        Rect(parent=page, x=randint(0, 99)*10, w=randint(5, 10), h=randint(5, 30), conditions=[Float2Top()])
+    t = time()
+    page.solve()
+    t = time() - t
+    return [e.point for e in page.elements], t
+
+for count in COUNTS:
+    positions, t = floatElements(count, True, True)
+    indexPositions, tIndex = floatElements(count, True, False)
+    assert positions == indexPositions
+    if count <= LINEAR_MAX:
+        linearPositions, tLinear = floatElements(count, False, False)
+        assert positions == linearPositions
+        print '%6d elements: skyline %0.2fs, index %0.2fs, linear %0.2fs (%0.1fx)' % (count, t, tIndex, tLinear, tLinear/t)
+    else:
+        print '%6d elements: skyline %0.2fs, index %0.2fs (%0.1fx)' % (count, t, tIndex, tIndex/t)
+Element.SPATIAL_INDEX = True
+Element.FLOAT_LAYOUT = True
@@ -0,0 +1,73 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkIncrementalSolve.py
+#
+#     Solve a document with many floating elements, once by solving all conditions in
+#     page order and once with the dependency ordered solver. Both must answer the same
+#     positions. Then move one element and solve again, where the solver only solves the
+#     conditions that depend on the moved element.
+#
+from random import seed, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Rect
+from pagebot.conditions import Float2TopLeft, Float2Top, Left2Left, Top2Top, Fit2Width
+
+PAGES = 50
+ELEMENTS = 100 # Per page.
+
+def makeDocument():
+    seed(PAGES)
+    doc = Document(w=1000, h=2000, originTop=True, autoPages=PAGES)
+    for pn, pages in doc.pages.items():
+        page = pages[0]
+        Rect(parent=page, h=50, conditions=[Left2Left(), Top2Top(), Fit2Width()]) # Header
+        for n in range(ELEMENTS):
+            if n % 2:
+                conditions = [Float2TopLeft()]
+            else:
+                conditions = [Float2Top()]
+            Rect(parent=page, x=randint(0, 90)*10, y=1000, w=randint(5, 20)*10, h=randint(2, 10)*10,
+                conditions=conditions)
+    return doc
+
+def getPositions(doc):
+    return [[e.point for e in page.elements] for page in doc.pages.getPages()]
+
+def solve(doc, incremental):
+    doc.INCREMENTAL_SOLVE = incremental
+    t = time()
+    score = doc.solve()
+    return time() - t, score
+
+doc = makeDocument()
+tPageOrder, score = solve(doc, False)
+positions = getPositions(doc)
+
+doc = makeDocument()
+tSolver, score = solve(doc, True)
+assert getPositions(doc) == positions
+print '%d pages, %d elements: page order %0.2fs, solver %0.2fs (graph %0.2fs, %d conditions solved)' % \
+    (PAGES, PAGES*(ELEMENTS+1), tPageOrder, tSolver, doc.solver.buildTime, doc.solver.solveCount)
+
+# Make the header of one page higher, so the elements on that page need to float down.
+header = doc.pages.getPages()[PAGES//2].elements[0]
+header.h = 200
+tIncremental, score = solve(doc, True)
+print 'After changing one header: solver %0.3fs, %d conditions solved' % (tIncremental, doc.solver.solveCount)
+
+header.h = 50
+tIncremental, score = solve(doc, True)
+assert getPositions(doc) == positions
+print 'After changing it back: solver %0.3fs, %d conditions solved' % (tIncremental, doc.solver.solveCount)
+print doc.solver
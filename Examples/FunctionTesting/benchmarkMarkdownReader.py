@@ -0,0 +1,71 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkMarkdownReader.py
+#
+#     Compare reading a markdown manuscript through an .md.xml file on disk
+#     with parsing it in memory, and with answering it from the MarkDownCache,
+#     as repeated builds of an unchanged manuscript do.
+#
+import os
+import codecs
+import shutil
+import tempfile
+from time import time
+
+import xml.etree.ElementTree as ET
+
+from pagebot.readers.mdreader import MarkDownCache, markDown2XML, parseMarkDown, readMarkDownText
+
+MD_PATH = '../Books/UsingVariableFonts.md'
+BUILDS = 10 # Number of builds of the same manuscript.
+
+def readThroughFile(mdText, path):
+    xml = markDown2XML(mdText)
+    f = codecs.open(path, mode="w", encoding="utf-8")
+    f.write(xml)
+    f.close()
+    return ET.parse(path).getroot()
+
+mdText = readMarkDownText(MD_PATH)
+tmpDir = tempfile.mkdtemp()
+
+t = time()
+for n in range(BUILDS):
+    root = readThroughFile(mdText, os.path.join(tmpDir, 'manuscript.md.xml'))
+tFile = time() - t
+nodeCount = len(list(root.iter()))
+
+t = time()
+for n in range(BUILDS):
+    assert len(list(parseMarkDown(mdText).iter())) == nodeCount
+tMemory = time() - t
+
+cache = MarkDownCache()
+t = time()
+for n in range(BUILDS):
+    assert len(list(parseMarkDown(mdText, cache=cache).iter())) == nodeCount
+tCache = time() - t
+
+# First run with a cache path saves the XML, a new cache on the same path is the next run of the script.
+parseMarkDown(mdText, cache=MarkDownCache(tmpDir))
+diskCache = MarkDownCache(tmpDir)
+t = time()
+assert len(list(parseMarkDown(mdText, cache=diskCache).iter())) == nodeCount
+tDiskCache = time() - t
+assert diskCache.hits == 1
+shutil.rmtree(tmpDir)
+
+print '%d builds of %d characters, %d nodes' % (BUILDS, len(mdText), nodeCount)
+print 'Through .md.xml file: %0.2fms/build' % (tFile*1000/BUILDS)
+print 'In memory:            %0.2fms/build' % (tMemory*1000/BUILDS)
+print 'MarkDownCache:        %0.3fms/build (%s)' % (tCache*1000/BUILDS, cache)
+print 'Cache path, new run:  %0.2fms' % (tDiskCache*1000)
@@ -0,0 +1,51 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkNewFS.py
+#
+#     Call newFS( ) 100k times with a few styles and elements, as a document does,
+#     and compare with resolving all attributes through css( ) and formatting a new
+#     string for every call.
+#
+from time import time
+
+from pagebot import newFS, getFSAttributes, attributes2FS
+from pagebot.style import getRootStyle
+from pagebot.toolbox.attributecache import fsAttributeCache
+from pagebot.elements.element import Element
+from pagebot.elements.pbtextbox import TextBox
+
+CALLS = 100000
+TEXT = u'Lorem ipsum dolor sit amet'
+
+rootStyle = getRootStyle()
+styles = [
+    dict(font='Verdana', fontSize=10, leading=14),
+    dict(font='Verdana-Bold', fontSize=10, leading=14),
+    dict(font='Georgia', fontSize=24, rLeading=1.2, uppercase=True),
+    [dict(font='Verdana-Italic'), rootStyle], # Stack of styles.
+]
+page = Element(style=rootStyle)
+boxes = [TextBox('', parent=page, w=200, h=200, style=dict(fontSize=fontSize)) for fontSize in (9, 12)]
+calls = [(None, style) for style in styles] + [(e, None) for e in boxes] + [(e, styles[0]) for e in boxes]
+
+def newFSUncached(t, e=None, style=None):
+    return attributes2FS(t, getFSAttributes(e, style))
+
+for name, f in (('Resolving every call', newFSUncached), ('newFS with cache', newFS)):
+    fsAttributeCache.clear()
+    t = time()
+    for n in range(CALLS):
+        e, style = calls[n % len(calls)]
+        f(TEXT, e, style)
+    duration = time() - t
+    print '%-22s %0.2fs %6d calls/s' % (name, duration, CALLS/duration)
+print fsAttributeCache
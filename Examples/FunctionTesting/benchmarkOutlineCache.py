@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkOutlineCache.py
+#
+#     Draw a specimen grid of the same text at a few locations of a Variable Font many
+#     times, as TTVarFontDesignSpace.getOutline( ) does. Without a shared OutlineCache
+#     (every glyph is expanded and its deltas are applied for every draw), with the cache
+#     of the glyph set, and with a cache that is too small for the grid.
+#
+import os
+from time import time
+
+import pagebot
+from fontTools.pens.boundsPen import ControlBoundsPen
+from pagebot.fonttoolbox.varfontdesignspace import TTVarFontDesignSpace, TTVarGlyph, OutlineCache
+
+FONT_PATH = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+TEXT = 'Hamburgefonstiv'
+LOCATIONS = [dict(wght=wght, wdth=wdth) for wght in (38, 88, 150, 250) for wdth in (60, 200, 402)]
+PASSES = 10
+
+def drawGrid(designSpace, uncached=False):
+    glyphSet = designSpace.glyphSet
+    bounds = []
+    for n in range(PASSES):
+        for location in LOCATIONS:
+            glyphSet.setLocation(location)
+            for c in TEXT:
+                glyphName = designSpace.getGlyphName(ord(c))
+                pen = ControlBoundsPen(glyphSet)
+                if uncached: # New cache for every glyph, as TTVarGlyph without glyph set.
+                    TTVarGlyph(designSpace.ttFont, glyphName, glyphSet.location).draw(pen)
+                else:
+                    glyphSet[glyphName].draw(pen)
+                bounds.append(pen.bounds)
+    return bounds
+
+designSpace = TTVarFontDesignSpace.fromVarFontPath(FONT_PATH)
+count = PASSES * len(LOCATIONS) * len(TEXT)
+reference = None
+for name, cache in (('Uncached', None), ('OutlineCache', OutlineCache(designSpace.ttFont)),
+        ('OutlineCache(100)', OutlineCache(designSpace.ttFont, maxOutlines=100))):
+    if cache is not None:
+        designSpace.glyphSet.cache = cache
+    t = time()
+    bounds = drawGrid(designSpace, uncached=cache is None)
+    t = time() - t
+    if reference is None:
+        reference = bounds
+    print '%-18s %0.2fs  %0.3fms/glyph  %s  %s' % (name, t, t*1000/count,
+        bounds == reference and 'same outlines' or 'DIFFERENT OUTLINES', cache or '')
+print designSpace.glyphSet.cache.getStats()
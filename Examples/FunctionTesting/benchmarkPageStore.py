@@ -0,0 +1,54 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkPageStore.py
+#
+#     Measure how appending pages, looking up page numbers and inserting/removing pages
+#     scales with the number of pages in the document. The time per page should stay
+#     about the same for larger documents.
+#
+from time import time
+
+from pagebot.document import Document
+
+COUNTS = (1000, 3000, 10000)
+INSERTS = 100 # Number of pages inserted at the front and removed again.
+
+def benchmarkPages(count):
+    doc = Document(w=595, h=842, autoPages=0)
+    t = time()
+    for n in range(count):
+        doc.newPage()
+    tAppend = time() - t
+    pages = doc.pages.getPages()
+    t = time()
+    for page in pages:
+        doc.getPageNumber(page)
+        doc.isLeftPage(page)
+        doc.nextPage(page, makeNew=False)
+    tLookup = time() - t
+    assert doc.getPageNumber(pages[-1]) == str(count)
+    t = time()
+    inserted = []
+    for n in range(INSERTS):
+        page = doc.PAGE_CLASS(w=595, h=842)
+        doc.insertPage(page, 0)
+        inserted.append(page)
+    for page in inserted:
+        doc.removePage(page)
+    tInsert = time() - t
+    assert doc.getPageNumber(pages[-1]) == str(count)
+    return tAppend, tLookup, tInsert
+
+for count in COUNTS:
+    tAppend, tLookup, tInsert = benchmarkPages(count)
+    print '%6d pages: append %0.1fus/page, lookup %0.1fus/page, insert+remove at front %0.1fus/page' % \
+        (count, tAppend*1000000/count, tLookup*1000000/count, tInsert*1000000/INSERTS)
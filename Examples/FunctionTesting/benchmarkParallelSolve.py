@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkParallelSolve.py
+#
+#     Solve a catalog of pages with floating elements in one process and with the
+#     pages solved by a pool of processes. Both must answer the same positions and
+#     the same score. Every tenth page has a text flow to the next page, so these
+#     pages are solved in the main process.
+#
+import multiprocessing
+from random import seed, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Rect
+from pagebot.conditions import Float2TopLeft, Float2Top, Left2Left, Top2Top, Fit2Width
+
+PAGES = 1000
+ELEMENTS = 30 # Per page.
+PROCESSES = (2, 4, 8)
+
+def makeDocument():
+    seed(PAGES)
+    doc = Document(w=1000, h=1000, originTop=True, autoPages=PAGES)
+    for index, page in enumerate(doc.pages.getPages()):
+        header = Rect(parent=page, h=50, conditions=[Left2Left(), Top2Top(), Fit2Width()])
+        if not index % 10:
+            header.nextElement = 'header'
+            header.nextPage = index + 1
+        for n in range(ELEMENTS):
+            if n % 2:
+                conditions = [Float2TopLeft()]
+            else:
+                conditions = [Float2Top()]
+            Rect(parent=page, x=randint(0, 90)*10, y=1000, w=randint(5, 20)*10, h=randint(2, 10)*10,
+                conditions=conditions)
+    return doc
+
+def getPositions(doc):
+    return [[e.point for e in page.elements] for page in doc.pages.getPages()]
+
+doc = makeDocument()
+t = time()
+score = doc.solve()
+tSerial = time() - t
+positions = getPositions(doc)
+print '%d pages, %d elements, %d processors. Serial: %0.2fs %s' % (PAGES, PAGES*(ELEMENTS+1),
+    multiprocessing.cpu_count(), tSerial, score)
+
+for processes in PROCESSES:
+    doc = makeDocument()
+    t = time()
+    parallelScore = doc.solve(processes=processes)
+    tParallel = time() - t
+    assert getPositions(doc) == positions
+    assert parallelScore.result == score.result and len(parallelScore.fails) == len(score.fails)
+    print '%d processes: %0.2fs (%0.1fx) %s' % (processes, tParallel, tSerial/tParallel, parallelScore)
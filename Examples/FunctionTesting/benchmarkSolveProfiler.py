@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkSolveProfiler.py
+#
+#     Solve a document with floating elements without and with a SolveProfiler, to
+#     show the overhead of profiling. Then show the summary tables of the condition
+#     classes and the slowest pages, the failure histogram, and write the statistics
+#     as JSON file.
+#
+import os
+from random import seed, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Rect
+from pagebot.conditions import Float2TopLeft, Float2Top, Left2Left, Top2Top, Fit2Width
+from pagebot.conditions.profiler import SolveProfiler
+
+PAGES = 20
+ELEMENTS = 100 # Per page.
+EXPORT_PATH = '_export/solveProfile.json'
+
+def makeDocument():
+    seed(PAGES)
+    doc = Document(w=1000, h=1000, originTop=True, autoPages=PAGES)
+    for pn, pages in doc.pages.items():
+        page = pages[0]
+        Rect(parent=page, h=50, conditions=[Left2Left(), Top2Top(), Fit2Width()]) # Header
+        for n in range(ELEMENTS):
+            if n % 2:
+                conditions = [Float2TopLeft()]
+            else:
+                conditions = [Float2Top()]
+            Rect(parent=page, x=randint(0, 90)*10, y=1000, w=randint(5, 20)*10, h=randint(2, 10)*10,
+                conditions=conditions)
+    return doc
+
+doc = makeDocument()
+t = time()
+score = doc.solve()
+print 'Without profiler: %0.2fs %s' % (time() - t, score)
+
+doc = makeDocument()
+profiler = SolveProfiler()
+t = time()
+score = doc.solve(profiler=profiler)
+print 'With profiler: %0.2fs %s %s' % (time() - t, score, profiler)
+print
+print profiler.getSummary()
+print
+print profiler.getSummary('pages', limit=5)
+print
+print 'Failures by class:', profiler.getFailures(limit=5)
+print 'Failures by element:', [(profiler.elementNames[eId], count)
+    for eId, count in profiler.getFailures(byElement=True, limit=5)]
+
+if not os.path.exists('_export'):
+    os.mkdir('_export')
+profiler.asJson(EXPORT_PATH, indent=2)
+print 'Statistics written to', EXPORT_PATH
@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkStyleMatching.py
+#
+#     Measure the time per node of Typesetter.getMatchingStyleNames for manuscripts
+#     with a growing tag history. Matching through the compiled SelectorMatcher of
+#     the document styles should not depend on the length of the history.
+#     The string joining of all history suffixes is measured for comparison.
+#
+from time import time
+
+from pagebot.document import Document
+from pagebot.typesetter import Typesetter
+
+COUNTS = (250, 500, 1000) # Number of typeset nodes.
+TAGS = ('h1', 'p', 'em', 'p', 'ul', 'li', 'p', 'strong', 'h2', 'p', 'li', 'em')
+
+def joinedSuffixMatches(typesetter, tag):
+    revHistory = typesetter.tagHistory[:]
+    revHistory.reverse()
+    matches = []
+    for n in range(len(revHistory)):
+        styleName = revHistory[:n+1]
+        styleName.reverse()
+        styleName = ' '.join(styleName)
+        if styleName in typesetter.doc.styles:
+            matches.append(styleName)
+    matches.reverse()
+    return matches
+
+def benchmarkMatching(count, match):
+    doc = Document(w=595, h=842, autoPages=1)
+    for name in ('p em', 'li p', 'ul li p', 'h2 p', 'li em', 'p strong'):
+        doc.newStyle(name=name)
+    typesetter = Typesetter(doc=doc)
+    t = time()
+    for n in range(count):
+        tag = TAGS[n % len(TAGS)]
+        typesetter.addHistory(tag)
+        match(typesetter, tag)
+    return time() - t
+
+for count in COUNTS:
+    tTrie = benchmarkMatching(count, Typesetter.getMatchingStyleNames)
+    tJoin = benchmarkMatching(count, joinedSuffixMatches)
+    print '%6d nodes: matcher %0.1fus/node, joined suffixes %0.1fus/node' % \
+        (count, tTrie*1000000/count, tJoin*1000000/count)
@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkStyleStack.py
+#
+#     Compare the style graphics state of the Typesetter, where every node gets a
+#     ChainedStyle with only the values of its tag style, with merging the tag style
+#     into a copy of the complete top style, as it was done before.
+#     Counts the style entries and bytes allocated per node, and the throughput
+#     of typesetting a manuscript of MANUSCRIPT_COPIES times the example book.
+#     Entries and bytes of a ChainedStyle are its own values and the tuple of layers.
+#     The second throughput ignores the output to the galley, which is the same for both,
+#     so it measures the style stack and the reading of styles by newFS( ).
+#
+import copy
+import sys
+from time import time
+
+from pagebot.document import Document
+from pagebot.typesetter import Typesetter
+from pagebot.toolbox.chainedstyle import ChainedStyle
+from pagebot.readers.mdreader import parseMarkDown, readMarkDownText
+
+MD_PATH = '../Books/UsingVariableFonts.md'
+MANUSCRIPT_COPIES = 20
+RUNS = 3 # Best time of RUNS is used.
+
+class CountingTypesetter(Typesetter):
+    def __init__(self, *args, **kwargs):
+        Typesetter.__init__(self, *args, **kwargs)
+        self.nodes = 0
+        self.styles = []
+
+    def getNodeStyle(self, tag):
+        style = Typesetter.getNodeStyle(self, tag)
+        self.nodes += 1
+        self.styles.append(style)
+        return style
+
+    def getEntries(self):
+        total = 0
+        for style in self.styles:
+            total += len(style.style)
+        return total
+
+    def getBytes(self):
+        total = 0
+        for style in self.styles:
+            total += sys.getsizeof(style) + sys.getsizeof(style.style) + sys.getsizeof(style.maps)
+        return total
+
+class CopyingTypesetter(CountingTypesetter):
+    def getNodeStyle(self, tag):
+        u"""Merge the tag style into a copy of the top style, as before."""
+        if self.peekStyle() is None:
+            self.pushStyle(ChainedStyle(None, self.getNamedStyle('root')))
+        mergedStyle = copy.copy(self.peekStyle().maps[0])
+        for styleName in self.getMatchingStyleNames(tag):
+            nodeStyle = self.getNamedStyle(styleName)
+            if nodeStyle:
+                for name, value in nodeStyle.items():
+                    mergedStyle[name] = value
+                break
+        self.nodes += 1
+        self.styles.append(mergedStyle)
+        return ChainedStyle(None, mergedStyle) # Single layer, so the Typesetter reads from the merged copy.
+
+    def getEntries(self):
+        total = 0
+        for style in self.styles:
+            total += len(style)
+        return total
+
+    def getBytes(self):
+        total = 0
+        for style in self.styles:
+            total += sys.getsizeof(style)
+        return total
+
+def benchmarkTypesetter(typesetterClass, root, output=True):
+    times = []
+    for n in range(RUNS):
+        doc = Document(w=595, h=842, autoPages=1)
+        typesetter = typesetterClass(doc=doc)
+        if not output:
+            typesetter.appendString = typesetter.appendHtml = lambda s: None
+        t = time()
+        typesetter.typesetNode(root)
+        times.append(time() - t)
+    return min(times), typesetter
+
+root = parseMarkDown(readMarkDownText(MD_PATH) * MANUSCRIPT_COPIES)
+for typesetterClass in (CopyingTypesetter, CountingTypesetter):
+    t, typesetter = benchmarkTypesetter(typesetterClass, root)
+    tStyles, _ = benchmarkTypesetter(typesetterClass, root, output=False)
+    nodes = typesetter.nodes
+    print '%s: %d nodes, %0.1f style entries/node, %d bytes/node, %d nodes/s, %d nodes/s without output' % \
+        (typesetterClass.__name__, nodes, typesetter.getEntries()/float(nodes), typesetter.getBytes()/nodes,
+        nodes/t, nodes/tStyles)
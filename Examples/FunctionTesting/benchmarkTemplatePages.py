@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkTemplatePages.py
+#
+#     Measure time and memory to make 1000 pages from a few templates. The size is measured
+#     by walking all objects that are referred to by the pages. Shared objects (such as the
+#     style values of the template elements) are counted once.
+#
+import sys
+import weakref
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import Template, Rect, Oval, Line
+
+PAGES = 1000
+
+def getDeepSize(obj, seen):
+    u"""Answer the size of obj and all objects it refers to, that are not in seen.
+    Don't follow the references to the document and weakrefs."""
+    if id(obj) in seen or isinstance(obj, (Document, weakref.ref, type)) or callable(obj):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in dict.items(obj): # Own items only.
+            size += getDeepSize(key, seen) + getDeepSize(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            size += getDeepSize(value, seen)
+    if not isinstance(obj, (list, tuple, set, basestring, int, long, float)):
+        for cls in type(obj).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name not in ('__dict__', '__weakref__'):
+                    size += getDeepSize(getattr(obj, name, None), seen)
+        if getattr(obj, '__dict__', None):
+            size += getDeepSize(obj.__dict__, seen)
+    return size
+
+def makeTemplates(count=4):
+    u"""Answer a list of templates with columns, a header, a footer and some decoration."""
+    templates = []
+    for n in range(count):
+        t = Template(w=595, h=842, name='Template %d' % n)
+        Rect(parent=t, name='Header', x=40, y=20, w=515, h=40, fill=(0.8, 0.8, 0.8))
+        for column in range(n + 2):
+            Rect(parent=t, name='Column %d' % column, x=40 + column*100, y=80, w=90, h=700)
+        footer = Rect(parent=t, name='Footer', x=40, y=800, w=515, h=20)
+        Line(parent=footer, x=0, y=0, w=515, h=0, stroke=0)
+        Oval(parent=footer, x=500, y=2, w=10, h=10, fill=(1, 0, 0))
+        templates.append(t)
+    return templates
+
+def makePages():
+    templates = makeTemplates()
+    doc = Document(w=595, h=842, autoPages=0)
+    t = time()
+    for n in range(PAGES):
+        doc.newPage(template=templates[n % len(templates)])
+    t = time() - t
+    seen = set()
+    for template in templates: # Don't count the templates.
+        getDeepSize(template, seen)
+    size = 0
+    for pn, pages in doc.pages.items():
+        for page in pages:
+            size += getDeepSize(page, seen)
+    return t, size
+
+t, size = makePages()
+print '%d pages in %0.2fs, %d bytes/page' % (PAGES, t, size/PAGES)
@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkTextBuffer.py
+#
+#     Compare filling a TextBox with many styled fragments by adding formatted
+#     strings (fs += s, as TextBox.appendString did before the TextBuffer), with
+#     appending interned runs to the TextBuffer and making the FormattedString once.
+#
+from time import time
+
+from pagebot import newFS, getFSAttributes
+from pagebot.elements.pbtextbox import TextBox
+
+COUNTS = (1000, 3000, 10000) # Number of appended fragments.
+STYLES = (
+    dict(font='Verdana', fontSize=10, leading=14),
+    dict(font='Verdana-Bold', fontSize=10, leading=14),
+    dict(font='Verdana-Italic', fontSize=10, leading=14),
+)
+TEXT = u'Lorem ipsum dolor sit amet, consectetur. '
+
+def appendByAdding(count):
+    fs = None
+    for n in range(count):
+        s = newFS(TEXT, style=STYLES[n/3 % len(STYLES)])
+        if fs is None:
+            fs = s
+        else:
+            fs += s
+    return fs
+
+def appendToBuffer(count):
+    tb = TextBox('', w=400, h=400)
+    for n in range(count):
+        tb.appendText(TEXT, getFSAttributes(style=STYLES[n/3 % len(STYLES)]))
+    fs = tb.fs # One join of all runs.
+    return tb, fs
+
+for count in COUNTS:
+    t = time()
+    appendByAdding(count)
+    tAdding = time() - t
+
+    t = time()
+    tb, fs = appendToBuffer(count)
+    tBuffer = time() - t
+    assert len(tb.text) == count*len(TEXT)
+
+    print '%6d fragments  fs += s: %7.1fms  TextBuffer: %7.1fms (%d runs)' % (count, tAdding*1000, tBuffer*1000, len(tb.textBuffer.pieces))
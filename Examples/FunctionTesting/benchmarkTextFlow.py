@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkTextFlow.py
+#
+#     Flow text through a chain of text boxes on consecutive pages, with the
+#     recursive overflow2Next (each box gets all remaining text and solves the
+#     next box) and with the iterative TextFlow. Then edit the text in the middle
+#     and flow it again, which only measures the boxes from the edit onward.
+#     Text is measured by the headless TextLayout, so this also runs without DrawBot.
+#
+import os
+import sys
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import TextBox
+from pagebot.conditions import Overflow2Next
+from pagebot.fonttoolbox.textlayout import TextLayout, FONT_PATH
+from pagebot.toolbox.textbuffer import TextBuffer
+from pagebot import getFSAttributes
+
+TextBox.TEXT_LAYOUT = TextLayout(defaultFont=os.path.join(FONT_PATH, 'fontbureau/AmstelvarAlpha-VF.ttf'))
+COUNTS = (25, 50, 100, 1000) # Number of boxes in the flow.
+RECURSIVE_MAX = 100 # Larger flows run into the recursion limit with the recursive version.
+FRAGMENT = u'Lorem ipsum dolor sit amet, consectetur adipiscing elit %d. '
+
+class RecursiveTextBox(TextBox):
+    u"""TextBox with the recursive overflow2Next, as it was before TextFlow."""
+    def overflow2Next(self):
+        result = True
+        overflow = self.getOverflow()
+        if overflow and self.nextElement:
+            result = False
+            page = self.getElementPage()
+            if page is not None:
+                nextElement = page.getElementByName(self.nextElement)
+                if nextElement is None or nextElement.fs and self.nextPage:
+                    page = self.doc.getPage(self.nextPage)
+                    nextElement =  page.getElementByName(self.nextElement)
+                if nextElement is not None and not nextElement.fs:
+                    nextElement.fs = overflow
+                    nextElement.prevPage = page.name
+                    nextElement.prevElement = self.name
+                    score = nextElement.solve()
+                    result = len(score.fails) == 0
+        return result
+
+def makeFlow(boxClass, count):
+    doc = Document(w=500, h=500, autoPages=count)
+    boxes = []
+    for pn in range(count):
+        boxes.append(boxClass('', parent=doc.getPage(pn), name='main', w=200, h=100,
+            nextElement='main', nextPage=pn+1, conditions=[Overflow2Next()]))
+    attributes = getFSAttributes(style=dict(font='Verdana', fontSize=10, leading=12))
+    buffer = TextBuffer()
+    for n in range(count*16): # About 15 fragments fit in a box.
+        buffer.appendText(FRAGMENT % n, attributes)
+    boxes[0].textBuffer = buffer
+    return doc, boxes, buffer
+
+for count in COUNTS:
+    tRecursive = None
+    if count <= RECURSIVE_MAX:
+        sys.setrecursionlimit(max(1000, count*20))
+        doc, boxes, buffer = makeFlow(RecursiveTextBox, count)
+        t = time()
+        boxes[0].solve()
+        tRecursive = time() - t
+
+    doc, boxes, buffer = makeFlow(TextBox, count)
+    t = time()
+    boxes[0].solve()
+    tFlow = time() - t
+    textFlow = boxes[0].textFlow
+    assert u''.join([box.text for box in boxes]) == buffer.getText()
+    measurements = textFlow.measurements
+
+    # Edit the text in the last quarter of the flow.
+    placement = textFlow.placements[count*3/4]
+    edited = buffer.slice(0, placement.start)
+    edited.appendText(u'Edited. ', placement.buffer.pieces[0].attributes)
+    for piece in buffer.slice(placement.start).pieces:
+        edited.appendText(piece.text, piece.attributes)
+    boxes[0].textBuffer = edited
+    t = time()
+    boxes[0].solve()
+    tEdit = time() - t
+    assert u''.join([box.text for box in boxes]) == edited.getText()
+
+    if tRecursive is None:
+        recursive = 'recursion limit'
+    else:
+        recursive = '%0.2fs' % tRecursive
+    print '%5d boxes  Recursive: %-15s TextFlow: %0.2fs (%d measurements)  Edit: %0.2fs (%d measurements)' % (
+        count, recursive, tFlow, measurements, tEdit, textFlow.measurements - measurements)
@@ -0,0 +1,48 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkTextLayout.py
+#
+#     Measure the headless text layout, that breaks text into lines with the metrics of
+#     fontTools, without CoreText. The first run reads the font tables and fills the glyph
+#     and kerning caches, the next runs use the cached tables.
+#
+import os
+from time import time
+
+from pagebot.fonttoolbox import textlayout
+from pagebot.fonttoolbox.textlayout import TextLayout, LayoutRun, FONT_PATH
+
+PARAGRAPHS = 500
+TEXT = u"""Vat (Value Added Tax) is not applied to AVANT-GARDE typefaces. Lorem ipsum dolor sit amet,
+consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim
+ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat.
+""".replace('\n', ' ')
+
+layout = TextLayout()
+layout.registerFont('Decovar', os.path.join(FONT_PATH, 'fontbureau/Decovar-VF-2axes.ttf'))
+layout.registerFont('Amstelvar', os.path.join(FONT_PATH, 'fontbureau/AmstelvarAlpha-VF.ttf'))
+
+runs = []
+for n in range(PARAGRAPHS):
+    runs.append(LayoutRun(u'Heading %d\n' % n, 'Decovar', 18, lineHeight=24))
+    runs.append(LayoutRun(TEXT + u'\n', 'Amstelvar', 10, lineHeight=14, tracking=0.1))
+characters = sum([len(run.text) for run in runs])
+
+lines = None
+for label in ('Cold caches', 'Cached glyph tables', 'Cached glyph tables'):
+    lines = None # Free the lines of the previous run before measuring.
+    if label == 'Cold caches':
+        textlayout._fontMetrics.clear()
+    t = time()
+    lines = layout.getTextLines(runs, 300)
+    t = time() - t
+    print '%s: %d characters in %d lines, %0.3fs (%d lines/s)' % (label, characters, len(lines), t, len(lines)/t)
@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkTrajectory.py
+#
+#     Draw the frames of an animation of a word along a path through the design space
+#     of a Variable Font: with an instance for every frame, with the outlines of a
+#     glyph set that calculates the glyphs at each location, and with one Trajectory
+#     that calculates all frames at once. All must draw the same outlines.
+#
+import os
+from math import sin, pi
+from time import time
+
+import pagebot
+from fontTools.pens.boundsPen import ControlBoundsPen
+from pagebot.fonttoolbox.instancecache import MasterFont
+from pagebot.fonttoolbox.varfontdesignspace import TTVarFontDesignSpace
+
+FONT_PATH = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+TEXT = 'Hamburgefonstiv'
+FRAMES = 200
+# Path through the design space: weight up and down, while the width makes one loop.
+LOCATIONS = [dict(wght=38 + 212*sin(pi*frame/FRAMES), wdth=231 + 171*sin(2*pi*frame/FRAMES))
+    for frame in range(FRAMES)]
+
+master = MasterFont(FONT_PATH)
+designSpace = TTVarFontDesignSpace.fromVarFontPath(FONT_PATH)
+glyphNames = [designSpace.getGlyphName(ord(c)) for c in TEXT]
+
+def drawInstances():
+    bounds = []
+    for location in LOCATIONS:
+        ttFont = master.instantiate(master.getNormalizedLocation(location))
+        glyphSet = ttFont.getGlyphSet()
+        for glyphName in glyphNames:
+            pen = ControlBoundsPen(glyphSet)
+            glyphSet[glyphName].draw(pen)
+            bounds.append(pen.bounds)
+    return bounds
+
+def drawGlyphSet():
+    bounds = []
+    glyphSet = designSpace.glyphSet
+    for location in LOCATIONS:
+        glyphSet.setLocation(location)
+        for glyphName in glyphNames:
+            pen = ControlBoundsPen(glyphSet)
+            glyphSet[glyphName].draw(pen)
+            bounds.append(pen.bounds)
+    return bounds
+
+def drawTrajectory():
+    bounds = []
+    trajectory = master.getTrajectory(glyphNames, LOCATIONS)
+    for frame in range(len(trajectory)):
+        for glyphName in glyphNames:
+            pen = ControlBoundsPen(None)
+            trajectory.drawGlyph(pen, frame, glyphName)
+            bounds.append(pen.bounds)
+    return bounds
+
+count = len(LOCATIONS)
+reference = None
+for name, draw in (('Instance per frame', drawInstances), ('Glyph set', drawGlyphSet),
+        ('Trajectory', drawTrajectory)):
+    t = time()
+    bounds = draw()
+    t = time() - t
+    if reference is None:
+        reference = bounds
+    print '%-18s %0.2fs  %0.2fms/frame  %s' % (name, t, t*1000/count,
+        bounds == reference and 'same outlines' or 'DIFFERENT OUTLINES')
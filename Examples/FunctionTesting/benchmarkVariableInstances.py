@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     benchmarkVariableInstances.py
+#
+#     Latency per instance of a Variable Font, for a sequence of locations as an
+#     animation would use them (each location a few times): by generateInstance( ),
+#     writing each instance in an empty directory and opening it again as Font, and by
+#     the InstanceCache, that makes the instances in memory.
+#
+import os
+import shutil
+import tempfile
+from time import time
+
+import pagebot
+from pagebot.fonttoolbox.objects.font import Font
+from pagebot.fonttoolbox.variablefontbuilder import generateInstance, getVarLocation
+from pagebot.fonttoolbox.instancecache import InstanceCache
+
+FONT_PATH = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+LOCATIONS = 40 # Different locations.
+REPEATS = 3 # Times that each location is used.
+
+varFont = Font(FONT_PATH, install=False)
+locations = []
+for n in range(LOCATIONS):
+    location = getVarLocation(varFont, dict(wght=n/(LOCATIONS-1.0), wdth=(n % 4)/3.0))
+    locations += [location] * REPEATS
+
+targetDirectory = tempfile.mkdtemp()
+t = time()
+for location in locations:
+    fontName, path = generateInstance(FONT_PATH, location, targetDirectory)
+    font = Font(path, name=fontName, install=False)
+    len(font) # Read the glyf table, as drawing does.
+t = time() - t
+print 'generateInstance  %0.2fs  %0.1fms/instance' % (t, t*1000/len(locations))
+shutil.rmtree(targetDirectory)
+
+for maxInstances in (8, 64):
+    cache = InstanceCache(maxInstances=maxInstances)
+    t = time()
+    for location in locations:
+        font = cache.getFont(FONT_PATH, location, install=False)
+        len(font)
+    t = time() - t
+    stats = cache.getStats()
+    print 'InstanceCache(%d)  %0.2fs  %0.1fms/instance  %0.1fms/miss  %s' % (maxInstances, t,
+        t*1000/len(locations), stats['latency']*1000, cache)
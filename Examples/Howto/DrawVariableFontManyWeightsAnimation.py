@@ -18,7 +18,7 @@
 import pagebot
 from pagebot.fonttoolbox.objects.font import Font, getFontByName
 from pagebot import newFS
-from pagebot.fonttoolbox.variablefontbuilder import getVariableFont 
+from pagebot.fonttoolbox.variablefontbuilder import getVariableFonts
 from pagebot.style import CENTER
 
 W = H = 500
@@ -27,22 +27,29 @@ ROOT_PATH = pagebot.getRootPath()
 FONT_PATH = ROOT_PATH + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
 f = Font(FONT_PATH, install=True) # Get PageBot Font instance of Variable font.
 
-ULTRALIGHT_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.9, wdth=0.7), styleName='Utrla Light Condensed')
-ULTRALIGHT = getVariableFont(FONT_PATH, dict(wght=1, wdth=0), styleName='Ultra Light')
-LIGHT_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.9, wdth=0.7), styleName='Light Condensed')
-LIGHT = getVariableFont(FONT_PATH, dict(wght=0.9, wdth=0), styleName='Light')
-THIN_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.8, wdth=0.7), styleName='Thin Condensed')
-THIN = getVariableFont(FONT_PATH, dict(wght=0.8, wdth=0), styleName='Thin')
-BOOK_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.7, wdth=0.7), styleName='Book Condensed')
-BOOK = getVariableFont(FONT_PATH, dict(wght=0.7, wdth=0), styleName='Book')
-REGULAR_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.6, wdth=0.7), styleName='Regular Condensed')
-REGULAR = getVariableFont(FONT_PATH, dict(wght=0.6, wdth=0), styleName='Regular')
-MEDIUM_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.5, wdth=0.7), styleName='Medium Condensed')
-MEDIUM = getVariableFont(FONT_PATH, dict(wght=0.5, wdth=0), styleName='Medium')
-SEMIBOLD_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.30, wdth=0.7), styleName='Semibold Condensed')
-SEMIBOLD = getVariableFont(FONT_PATH, dict(wght=0.30, wdth=0), styleName='Semibold')
-BOLD_CONDENSED = getVariableFont(FONT_PATH, dict(wght=0.0, wdth=0.7), styleName='Bold Condensed')
-BOLD = getVariableFont(FONT_PATH, dict(wght=0.0, wdth=0), styleName='Bold')
+# Generate all instances in one batch, in a pool of processes.
+LOCATIONS = [
+    (dict(wght=0.9, wdth=0.7), 'Utrla Light Condensed'),
+    (dict(wght=1, wdth=0), 'Ultra Light'),
+    (dict(wght=0.9, wdth=0.7), 'Light Condensed'),
+    (dict(wght=0.9, wdth=0), 'Light'),
+    (dict(wght=0.8, wdth=0.7), 'Thin Condensed'),
+    (dict(wght=0.8, wdth=0), 'Thin'),
+    (dict(wght=0.7, wdth=0.7), 'Book Condensed'),
+    (dict(wght=0.7, wdth=0), 'Book'),
+    (dict(wght=0.6, wdth=0.7), 'Regular Condensed'),
+    (dict(wght=0.6, wdth=0), 'Regular'),
+    (dict(wght=0.5, wdth=0.7), 'Medium Condensed'),
+    (dict(wght=0.5, wdth=0), 'Medium'),
+    (dict(wght=0.30, wdth=0.7), 'Semibold Condensed'),
+    (dict(wght=0.30, wdth=0), 'Semibold'),
+    (dict(wght=0.0, wdth=0.7), 'Bold Condensed'),
+    (dict(wght=0.0, wdth=0), 'Bold'),
+]
+(ULTRALIGHT_CONDENSED, ULTRALIGHT, LIGHT_CONDENSED, LIGHT, THIN_CONDENSED, THIN, BOOK_CONDENSED, BOOK,
+    REGULAR_CONDENSED, REGULAR, MEDIUM_CONDENSED, MEDIUM, SEMIBOLD_CONDENSED, SEMIBOLD, BOLD_CONDENSED, BOLD) = \
+    getVariableFonts(FONT_PATH, [location for location, styleName in LOCATIONS],
+        styleNames=[styleName for location, styleName in LOCATIONS])
 
 LABEL_FONT = BOOK
 
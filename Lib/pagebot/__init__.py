@@ -16,19 +16,30 @@ __doc__ = """PageBot module"""
 
 __version__ = '0.8-beta'
 
-import CoreText
-import AppKit
-import Quartz
-
 import re
-from drawBot import FormattedString, cmykFill, fill, cmykStroke, stroke, strokeWidth, \
-    hyphenation, cmykLinearGradient, linearGradient, cmykRadialGradient, radialGradient,\
-    shadow, textSize
-
-from drawBot.context.baseContext import BaseContext
+# Without DrawBot and PyObjC (e.g. on Linux), only the headless parts of PageBot work, such as
+# composing and solving with TextBox.TEXT_LAYOUT set to a pagebot.fonttoolbox.textlayout.TextLayout.
+try:
+    import CoreText
+    import AppKit
+    import Quartz
+except ImportError:
+    CoreText = AppKit = Quartz = None
+try:
+    from drawBot import FormattedString, cmykFill, fill, cmykStroke, stroke, strokeWidth, \
+        hyphenation, cmykLinearGradient, linearGradient, cmykRadialGradient, radialGradient,\
+        shadow, textSize
+    from drawBot.context.baseContext import BaseContext
+except ImportError:
+    FormattedString = cmykFill = fill = cmykStroke = stroke = strokeWidth = hyphenation = None
+    cmykLinearGradient = linearGradient = cmykRadialGradient = radialGradient = shadow = textSize = None
+    BaseContext = None
 
 from pagebot.style import NO_COLOR, LEFT
 from pagebot.toolbox.transformer import point2D
+from pagebot.toolbox.elementindex import getTreeOrder
+from pagebot.toolbox.textbuffer import internAttributes, transformText
+from pagebot.toolbox.attributecache import fsAttributeCache
 
 #   P A T H S 
 
@@ -390,10 +401,16 @@ def setShadow(eShadow):
 
 def deepFind(elements, name=None, pattern=None, result=None):
     u"""Perform a dynamic deep find for all elements with the *name*. Don't include self.
-    Either *name* or *pattern* should be defined, otherwise an error is raised."""
+    Either *name* or *pattern* should be defined, otherwise an error is raised.
+    If the elements are placed in a document, then use the element index of the document."""
     assert name or pattern
     if result is None:
         result = []
+    if elements and result == []:
+        found = _indexFind(elements, name, pattern)
+        if found is not None:
+            result += found
+            return result
     for e in elements:
         if pattern is not None and pattern in e.name: # Simple pattern match
             result.append(e)
@@ -402,6 +419,34 @@ def deepFind(elements, name=None, pattern=None, result=None):
         deepFind(e.elements, name, pattern, result)
     return result
 
+def _indexFind(elements, name, pattern):
+    u"""Answer the deepFind result from the element index of the document, in the same depth-first
+    order. Answer None if not all elements are in the same document index."""
+    index = elements[0]._getElementIndex()
+    if index is None:
+        return None
+    positions = {} # Key is id(e) of the top elements, value is their position in the list.
+    for n, e in enumerate(elements):
+        if e._getElementIndex() is not index:
+            return None
+        positions.setdefault(id(e), n)
+    candidates = set()
+    if name is not None:
+        candidates.update(index.findByName(name))
+    if pattern is not None:
+        candidates.update(index.findByPattern(pattern))
+    groups = {} # Key is position of the top element in elements, value is list of found elements.
+    for e in candidates:
+        ancestor = e
+        while ancestor is not None and not id(ancestor) in positions:
+            ancestor = ancestor.parent if hasattr(ancestor, 'elements') else None
+        if ancestor is not None:
+            groups.setdefault(positions[id(ancestor)], []).append(e)
+    result = []
+    for n, found in sorted(groups.items()):
+        result += getTreeOrder(found)
+    return result
+
 def find(elements, name=None, pattern=None, result=None):
     u"""Perform a dynamic find for the named element(s) in self.elements. Don't include self.
     Either *name* or *pattern* should be defined, otherwise an error is raised."""
@@ -454,102 +499,146 @@ def css(name, e, styles=None, default=None):
         return e.css(name)
     return default
 
-def newFS(t, e=None, style=None, w=None, h=None, fontSize=None, styleName=None, tagName=None):
-    u"""Answer a *FormattedString* instance from valid attributes in *style*. Set all values after testing
-    their existence, so they can inherit from previous style formats.
-    If target width *w* or height *h* is defined, then *fontSize* is scaled to make the string fit *w* or *h*."""
-
-    hyphenation(css('hyphenation', e, style)) # TODO: Should be text attribute, not global
-
-    fs = FormattedString('')
-    sFont = css('font', e, style)
-    if sFont is not None:
-        fs.font(sFont)
+def getFSAttributes(e=None, style=None, fontSize=None):
+    u"""Answer the dictionary of FormattedString attributes, resolved from *style* and element *e*, as used
+    by newFS( ). The answered dictionary is interned (shared by all calls with the same attributes), so it
+    should not be altered. If *fontSize* is defined, then it overwrites the style fontSize."""
     # Forced fontSize, then this overwrites the style['fontSize'] if it is there.
     # TODO: add calculation of rFontSize (relative float based on root-fontSize) here too.
     sFontSize = fontSize or css('fontSize', e, style) or 16 # May be scaled to fit w or h if target is defined.
+    lineHeight = None
     sLeading = css('leading', e, style)
     rLeading = css('rLeading', e, style)
     if sLeading or (rLeading and sFontSize):
-        lineHeight = (sLeading or 0) + (rLeading or 0) * (sFontSize or 0)
-        if lineHeight:
-            fs.lineHeight(lineHeight)
-    if sFontSize is not None:
-        fs.fontSize(sFontSize) # For some reason fontSize must be set after leading.
-    sFallbackFont = css('fallbackFont', e, style)
-    if sFallbackFont is not None:
-        fs.fallbackFont(sFallbackFont)
-    sFill = css('textFill', e, style)
-    if sFill is not NO_COLOR: # Test on this flag, None is valid value
-        setFillColor(sFill, fs)
-    sCmykFill = css('cmykFill', e, style, NO_COLOR)
-    if sCmykFill is not NO_COLOR:
-        setFillColor(sCmykFill, fs, cmyk=True)
-    sStroke = css('textStroke', e, style, NO_COLOR)
-    sStrokeWidth = css('textStrokeWidth', e, style)
-    if sStroke is not NO_COLOR and strokeWidth is not None:
-        setStrokeColor(sStroke, sStrokeWidth, fs)
-    sCmykStroke = css('cmykStroke', e, style, NO_COLOR)
-    if sCmykStroke is not NO_COLOR:
-        setStrokeColor(sCmykStroke, sStrokeWidth, fs, cmyk=True)
-    sAlign = css('xTextAlign', e, style) # Warning: xAlign is used for element alignment, not text.
-    if sAlign is not None: # yTextAlign must be solved by parent container element.
-        fs.align(sAlign)
-    sParagraphTopSpacing = css('paragraphTopSpacing', e, style)
-    rParagraphTopSpacing = css('rParagraphTopSpacing', e, style)
-    if sParagraphTopSpacing or (rParagraphTopSpacing and sFontSize):
-        fs.paragraphTopSpacing((sParagraphTopSpacing or 0) + (rParagraphTopSpacing or 0) * (sFontSize or 0))
-    sParagraphBottomSpacing = css('paragraphBottomSpacing', e, style)
-    rParagraphBottomSpacing = css('rParagraphBottomSpacing', e, style)
-    if sParagraphBottomSpacing or (rParagraphBottomSpacing and sFontSize):
-        fs.paragraphBottomSpacing((sParagraphBottomSpacing or 0) + (rParagraphBottomSpacing or 0) * (sFontSize or 0))
-    sTracking = css('tracking', e, style)
-    rTracking = css('rTracking', e, style)
-    if sTracking or (rTracking and sFontSize):
-        fs.tracking((sTracking or 0) + (rTracking or 0) * (sFontSize or 0))
-    sBaselineShift = css('baselineShift', e, style)
-    rBaselineShift = css('rBaselineShift', e, style)
-    if sBaselineShift or (rBaselineShift and sFontSize):
-        fs.baselineShift((sBaselineShift or 0) + (rBaselineShift or 0) * (sFontSize or 0))
-    sOpenTypeFeatures = css('openTypeFeatures', e, style)
-    if sOpenTypeFeatures is not None:
-        fs.openTypeFeatures([], **sOpenTypeFeatures)
-    sTabs = css('tabs', e, style)
-    if sTabs is not None:
-        fs.tabs(*sTabs)
-    sFirstLineIndent = css('firstLineIndent', e, style)
-    rFirstLineIndent = css('rFirstLineIndent', e, style)
-    # TODO: Use this value instead, if current tag is different from previous tag. How to get this info?
-    # sFirstParagraphIndent = style.get('firstParagraphIndent')
-    # rFirstParagraphIndent = style.get('rFirstParagraphIndent')
-    # TODO: Use this value instead, if currently on top of a new string.
-    sFirstColumnIndent = css('firstColumnIndent', e, style)
-    rFirstColumnIndent = css('rFirstColumnIndent', e, style)
-    if sFirstLineIndent or (rFirstLineIndent and sFontSize):
-        fs.firstLineIndent((sFirstLineIndent or 0) + (rFirstLineIndent or 0) * (sFontSize or 0))
-    sIndent = css('indent', e, style)
-    rIndent = css('rIndent', e, style)
-    if sIndent is not None or (rIndent is not None and sFontSize is not None):
-        fs.indent((sIndent or 0) + (rIndent or 0) * (sFontSize or 0))
-    sTailIndent = css('tailIndent', e, style)
-    rTailIndent = css('rTaildIndent', e, style)
-    if sTailIndent or (rTailIndent and sFontSize):
-        fs.tailIndent((sTailIndent or 0) + (rTailIndent or 0) * (sFontSize or 0))
-    sLanguage = css('language', e, style)
-    if sLanguage is not None:
-        fs.language(sLanguage)
-
-    sUpperCase = css('uppercase', e, style)
-    sLowercase = css('lowercase', e, style)
-    sCapitalized = css('capitalized', e, style)
-    if sUpperCase:
-        t = t.upper()
-    elif sLowercase:
-        t = t.lower()
-    elif sCapitalized:
-        t = t.capitalize()
-
-    newt = fs + t # Format plain string t onto new formatted fs.
+        lineHeight = (sLeading or 0) + (rLeading or 0) * (sFontSize or 0) or None
+    attributes = dict(
+        hyphenation=css('hyphenation', e, style),
+        font=css('font', e, style),
+        fontSize=sFontSize,
+        lineHeight=lineHeight,
+        fallbackFont=css('fallbackFont', e, style),
+        textFill=css('textFill', e, style),
+        cmykFill=css('cmykFill', e, style, NO_COLOR),
+        textStroke=css('textStroke', e, style, NO_COLOR),
+        textStrokeWidth=css('textStrokeWidth', e, style),
+        cmykStroke=css('cmykStroke', e, style, NO_COLOR),
+        xTextAlign=css('xTextAlign', e, style), # Warning: xAlign is used for element alignment, not text.
+        openTypeFeatures=css('openTypeFeatures', e, style),
+        tabs=css('tabs', e, style),
+        language=css('language', e, style),
+    )
+    # Values that are the sum of an absolute value and a value relative to the fontSize.
+    for name, sName, rName, testNone in (
+            ('paragraphTopSpacing', 'paragraphTopSpacing', 'rParagraphTopSpacing', False),
+            ('paragraphBottomSpacing', 'paragraphBottomSpacing', 'rParagraphBottomSpacing', False),
+            ('tracking', 'tracking', 'rTracking', False),
+            ('baselineShift', 'baselineShift', 'rBaselineShift', False),
+            # TODO: Use firstParagraphIndent instead, if current tag is different from previous tag.
+            # TODO: Use firstColumnIndent instead, if currently on top of a new string.
+            ('firstLineIndent', 'firstLineIndent', 'rFirstLineIndent', False),
+            ('indent', 'indent', 'rIndent', True),
+            ('tailIndent', 'tailIndent', 'rTaildIndent', False)):
+        sValue = css(sName, e, style)
+        rValue = css(rName, e, style)
+        value = None
+        if testNone:
+            if sValue is not None or (rValue is not None and sFontSize is not None):
+                value = (sValue or 0) + (rValue or 0) * (sFontSize or 0)
+        elif sValue or (rValue and sFontSize):
+            value = (sValue or 0) + (rValue or 0) * (sFontSize or 0)
+        attributes[name] = value
+    textTransform = None
+    if css('uppercase', e, style):
+        textTransform = 'upper'
+    elif css('lowercase', e, style):
+        textTransform = 'lower'
+    elif css('capitalized', e, style):
+        textTransform = 'capitalize'
+    attributes['textTransform'] = textTransform
+    return internAttributes(attributes)
+
+def attributes2FS(t, attributes, transform=True):
+    u"""Answer a new *FormattedString* with plain string t, formatted by the attributes, as answered by
+    getFSAttributes( ). If *transform* is False, then t is supposed to be transformed already."""
+    hyphenation(attributes['hyphenation']) # TODO: Should be text attribute, not global
+
+    fs = FormattedString('')
+    if attributes['font'] is not None:
+        fs.font(attributes['font'])
+    if attributes['lineHeight']:
+        fs.lineHeight(attributes['lineHeight'])
+    fs.fontSize(attributes['fontSize']) # For some reason fontSize must be set after leading.
+    if attributes['fallbackFont'] is not None:
+        fs.fallbackFont(attributes['fallbackFont'])
+    if attributes['textFill'] is not NO_COLOR: # Test on this flag, None is valid value
+        setFillColor(attributes['textFill'], fs)
+    if attributes['cmykFill'] is not NO_COLOR:
+        setFillColor(attributes['cmykFill'], fs, cmyk=True)
+    if attributes['textStroke'] is not NO_COLOR:
+        setStrokeColor(attributes['textStroke'], attributes['textStrokeWidth'], fs)
+    if attributes['cmykStroke'] is not NO_COLOR:
+        setStrokeColor(attributes['cmykStroke'], attributes['textStrokeWidth'], fs, cmyk=True)
+    if attributes['xTextAlign'] is not None: # yTextAlign must be solved by parent container element.
+        fs.align(attributes['xTextAlign'])
+    if attributes['paragraphTopSpacing'] is not None:
+        fs.paragraphTopSpacing(attributes['paragraphTopSpacing'])
+    if attributes['paragraphBottomSpacing'] is not None:
+        fs.paragraphBottomSpacing(attributes['paragraphBottomSpacing'])
+    if attributes['tracking'] is not None:
+        fs.tracking(attributes['tracking'])
+    if attributes['baselineShift'] is not None:
+        fs.baselineShift(attributes['baselineShift'])
+    if attributes['openTypeFeatures'] is not None:
+        fs.openTypeFeatures([], **attributes['openTypeFeatures'])
+    if attributes['tabs'] is not None:
+        fs.tabs(*attributes['tabs'])
+    if attributes['firstLineIndent'] is not None:
+        fs.firstLineIndent(attributes['firstLineIndent'])
+    if attributes['indent'] is not None:
+        fs.indent(attributes['indent'])
+    if attributes['tailIndent'] is not None:
+        fs.tailIndent(attributes['tailIndent'])
+    if attributes['language'] is not None:
+        fs.language(attributes['language'])
+    if transform:
+        t = transformText(t, attributes)
+    return fs + t # Format plain string t onto new formatted fs.
+
+def getCachedFSAttributes(e=None, style=None, fontSize=None, cache=fsAttributeCache):
+    u"""Answer the attributes of getFSAttributes( ), from cache if *e* and *style* were resolved before.
+    Set cache to None to always resolve the attributes."""
+    if cache is None:
+        return getFSAttributes(e, style, fontSize)
+    attributes = cache.get(e, style, fontSize)
+    if attributes is None:
+        attributes = getFSAttributes(e, style, fontSize)
+        cache.set(e, style, fontSize, attributes)
+    return attributes
+
+def templateAttributes2FS(t, attributes, transform=True, cache=fsAttributeCache):
+    u"""Answer the same *FormattedString* as attributes2FS( ), by adding t to a copy of the empty
+    template string of the interned attributes, instead of setting all formatting again."""
+    if cache is None:
+        return attributes2FS(t, attributes, transform)
+    template = cache.getTemplate(attributes)
+    if template is None:
+        template = attributes2FS(u'', attributes)
+        cache.setTemplate(attributes, template)
+    else:
+        hyphenation(attributes['hyphenation']) # Global setting, as in attributes2FS( ).
+    if transform:
+        t = transformText(t, attributes)
+    return template + t
+
+def newFS(t, e=None, style=None, w=None, h=None, fontSize=None, styleName=None, tagName=None):
+    u"""Answer a *FormattedString* instance from valid attributes in *style*. Set all values after testing
+    their existence, so they can inherit from previous style formats.
+    If target width *w* or height *h* is defined, then *fontSize* is scaled to make the string fit *w* or *h*.
+    Resolved attributes are cached by identity of *e* and *style* in pagebot.toolbox.attributecache.fsAttributeCache,
+    so styles should be changed by writing their values, not by changing mutable values in place."""
+    attributes = getCachedFSAttributes(e, style, fontSize)
+    newt = templateAttributes2FS(t, attributes)
+    sFontSize = attributes['fontSize']
     if w is not None: # There is a target width defined, calculate again with the fontSize ratio correction. 
         tw, _ = textSize(newt)
         fontSize = w / tw * sFontSize
@@ -561,10 +650,13 @@ def newFS(t, e=None, style=None, w=None, h=None, fontSize=None, styleName=None,
 
     return newt
 
-def textBoxBaseLines(txt, box):
+def textBoxBaseLines(txt, box, layout=None):
     u"""Answer a list of (x,y) positions of all line starts in the box. This function may become part
-    of standard DrawBot in the near future."""
+    of standard DrawBot in the near future. If the headless *layout* (pagebot.fonttoolbox.textlayout.TextLayout)
+    is defined, then txt is a list of LayoutRun instances, measured without CoreText."""
     x, y, w, h = box
+    if layout is not None:
+        return layout.getBaseLines(txt, box)
     attrString = txt.getNSObject()
     setter = CoreText.CTFramesetterCreateWithAttributedString(attrString)
     path = Quartz.CGPathCreateMutable()
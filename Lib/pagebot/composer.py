@@ -11,7 +11,21 @@
 #
 #     composer.py
 #
-from drawBot import FormattedString
+#     Pagination of a galley, as made by the Typesetter, into the pages of a document.
+#     The elements of the galley are composed in one streaming pass: text is poured
+#     into the flow of text boxes on the current page, other elements (e.g. images
+#     and tables) replace the next free Placer element. If the page is full, the
+#     next page of the document is used, or a new page is made from the template.
+#     Only the current page is kept by the composer, so the time per page does not
+#     grow with the length of the book.
+#
+from collections import deque
+from time import time
+
+from pagebot.elements.pbplacer import Placer
+from pagebot.elements.pbruler import Ruler
+from pagebot.toolbox.textbuffer import TextBuffer
+from pagebot.toolbox.textflow import fitText
 
 class Composer(object):
     u"""A Composer takes a galley and tries to make a “nice” layout (on existing or new document pages),
@@ -19,73 +33,278 @@ class Composer(object):
     page-flows that are copied from their templates.
     If necessary elements can be split, new elements can be made on the page and element can be
     reshaped byt width and height, if that results in better placements.
+    Text of the galley is poured into the text boxes of the flow on each page, starting with the box
+    named flowName (or the first box of a nextElement chain). Other elements replace the Placer
+    elements of the page, in order. Elements that don't fit on the current page wait for the next page.
+
+    >>> import os
+    >>> from pagebot import getFSAttributes
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import TextBox, Placer, Rect, Galley
+    >>> from pagebot.elements.pbpage import Template
+    >>> from pagebot.fonttoolbox.textlayout import TextLayout, FONT_PATH
+    >>> TextBox.TEXT_LAYOUT = TextLayout(defaultFont=os.path.join(FONT_PATH, 'fontbureau/AmstelvarAlpha-VF.ttf'))
+    >>> template = Template(w=500, h=500, name='Chapter')
+    >>> box = TextBox('', parent=template, name='column1', x=30, y=30, w=200, h=120, nextElement='column2')
+    >>> box = TextBox('', parent=template, name='column2', x=270, y=30, w=200, h=120)
+    >>> placer = Placer(parent=template, name='image', x=30, y=200, w=440, h=270)
+    >>> attributes = getFSAttributes(style=dict(font='Verdana', fontSize=10, leading=12))
+    >>> galley = Galley()
+    >>> text = TextBox('', parent=galley)
+    >>> for n in range(20):
+    ...     text.appendText(u'Lorem ipsum dolor sit amet %d. ' % n, attributes)
+    >>> image1, image2 = Rect(parent=galley, name='image1'), Rect(parent=galley, name='image2')
+    >>> doc = Document(w=500, h=500, autoPages=1, template=template)
+    >>> composer = Composer(makeNewPage=True)
+    >>> composer.compose(galley, doc) is doc.getPage(1) # Page 1 is made for the second image.
+    True
+    >>> composer.pageCount, composer.boxCount, composer.elementCount
+    (2, 2, 2)
+    >>> page = doc.getPage(0)
+    >>> [len(box.text) for box in composer.getFlowBoxes(page)] # Text is poured into the linked boxes.
+    [374, 236]
+    >>> [e.name for e in page.elements], (image1.x, image1.y, image1.w, image1.h) # Placer is replaced.
+    (['column1', 'column2', 'image1'], (30, 200, 440, 270))
+    >>> [e.name for e in doc.getPage(1).elements] # The second image waited for the next page.
+    ['column1', 'column2', 'image2']
+    >>> galley = Galley()
+    >>> image1, image2 = Rect(parent=galley, name='image1'), Rect(parent=galley, name='image2')
+    >>> doc = Document(w=500, h=500, autoPages=1, template=template)
+    >>> composer = Composer() # Without makeNewPage, elements that don't fit are unplaced.
+    >>> composer.compose(galley, doc) is doc.getPage(0), composer.unplaced == [image2]
+    (True, True)
+    >>> galley = Galley()
+    >>> text = TextBox('', parent=galley)
+    >>> text.appendText(u'Lorem ipsum', attributes)
+    >>> doc = Document(w=500, h=500, autoPages=1, template=Template(w=500, h=500, name='Empty'))
+    >>> composer = Composer(makeNewPage=True) # Template without text boxes, stop after MAX_EMPTY_PAGES.
+    >>> composer.compose(galley, doc) is None, len(doc.pages), composer.overflow.getText() # New page is removed.
+    (True, 1, u'Lorem ipsum')
+    >>> TextBox.TEXT_LAYOUT = None
     """
-    def __init__(self, validators=None, makeNewPage=False):
+    PLACEHOLDER_CLASS = Placer # Elements on pages that get replaced by non-text galley elements.
+    SKIP_CLASSES = (Ruler,) # Galley elements that have no place on the page, other than in the text.
+    MAX_EMPTY_PAGES = 2 # Stop if pages in a row don't take any text or elements, e.g. by a template without flow.
+    INITIAL_CAPACITY = 500 # Estimated number of characters of the first text box.
+
+    def __init__(self, validators=None, makeNewPage=False, template=None, flowName=None):
         u"""The page, document includes
         the pages that already exist, and it defined the baseStyle for all other cascading styles.
         The style of all document pages and elements may contain conditions that define the weigh
-        value for the quality if their status."""
+        value for the quality if their status.
+        If makeNewPage is True, then new pages are made from template (name or Template instance,
+        default is the default template of the document) when the existing pages are full."""
+        self.validators = validators
         self.makeNewPage = makeNewPage
-        
-    def compose(self, galley, doc):
-        u"""Compose the galley element, starting with the flowId text box on page.
-        The composer negotiates between what the galley needs a sequential space
-        for its elements, and what the page has to offer.
-        If flowId is omitted, then let the page find the entry point for the first flow."""
-        print doc, galley
-
-    def XXXcompose(self, galley, page, flowId=None):
-        u"""Compose the galley element, starting with the flowId text box on page.
-        The composer negotiates between what the galley needs a sequential space
-        for its elements, and what the page has to offer.
-        If flowId is omitted, then let the page find the entry point for the first flow."""
-        if flowId is None:
-            flows = page.getFlows()
-            assert len(flows) # There must be at least one, otherwise error in template.
-            flowId, _ = sorted(flows.keys()) # Arbitrary which one, if there are multiple entries.
-        tb = page.getElementByName(flowId) # Find the seed flow box on the page, as derived from template.
-        assert tb is not None # Make sure, otherwise there is a template error.
-        fs = None
-        # Keeping overflow of text boxes here while iterating.
-        for element in galley.elements:
-            if not element.isText: # This is a non-text element. Try to find placement.
-                self.tryPlacement(page, tb, element)
-                continue
-            if fs is None:
-                fs = element.fs
-            else:
-                fs += element.fs
-            # As long as where is text, try to fit into the boxes on the page.
-            # Otherwise go to the next page, following the flow, creating new pages if necessary.
-            for n in range(1000): # Safety here, "while fs:" seems to be a dangerous method.
-                if fs is None:
-                    break
-                overflow = tb.appendString(fs)
-                if fs == overflow:
-                    print(u'NOT ABLE TO PLACE %s' % overflow)
-                    break
-                fs = overflow
-                if fs: # Can be None or empty
-                    # Overflow in this text box, find new from (page, tbFlow)
-                    page, tb = page.getNextFlowBox(tb, self.makeNewPage)
-                    if tb is None: # In case here is overflow, but no next box defined in the flow.
-                        print 'Overflow in text, but no next flow column defined.', flowId
-                        break
-                else:
-                    break
-
-    def tryPlacement(self, page, tb, element):
-        u"""Try to place the element on page, in relation to the current filling of tb.
-        Try to pass on the template-element w/h by doing a proportional resize of the component."""
-        container = page.findPlacementFor(element)
-        if container is not None:
-            # Replace the component on the page. Don't add to the container, because
-            # that will damage the element that come from the template.
-            page.replaceElement(container, element)
+        self.template = template
+        self.flowName = flowName
+        self.reset()
+
+    def __repr__(self):
+        return '[%s Pages:%d Boxes:%d Elements:%d Unplaced:%d Time:%0.2fs Pages/s:%0.1f]' % (self.__class__.__name__,
+            self.pageCount, self.boxCount, self.elementCount, len(self.unplaced), self.duration, self.pagesPerSecond)
+
+    def reset(self):
+        u"""Reset the state and statistics of the composition."""
+        self.doc = None
+        self.page = None # Current page.
+        self.lastPage = None # Last page that got content.
+        self.overflow = TextBuffer() # Text that did not fit in any page.
+        self.unplaced = [] # Elements that did not find a placeholder.
+        self.pageCount = 0
+        self.boxCount = 0
+        self.elementCount = 0
+        self.measurements = 0
+        self.duration = 0
+        self._boxes = [] # Flow boxes of the current page.
+        self._boxIndex = 0
+        self._placeholders = [] # Free placeholders of the current page.
+        self._pending = deque() # Elements waiting for a placeholder on the next page.
+        self._carry = None # Text in the current box, that following text is added to.
+        self._capacity = self.INITIAL_CAPACITY
+        self._pageUsed = False
+        self._emptyPages = 0
+        self._newPages = [] # Pages made by the composer after the last page that got content.
+
+    def _get_pagesPerSecond(self):
+        if self.duration:
+            return self.pageCount / self.duration
+        return 0
+    pagesPerSecond = property(_get_pagesPerSecond)
+
+    #   P A G E S
+
+    def getFlowBoxes(self, page, flowName=None):
+        u"""Answer the list of text boxes of the flow on page, in order of their nextElement links.
+        The first box is named flowName. If flowName is None, then the first box is the text box that
+        is not the nextElement of another box. Links to boxes on other pages are not followed."""
+        textBoxes = [e for e in page.elements if e.isTextBox]
+        names = {}
+        for e in textBoxes:
+            if e.name and not e.name in names:
+                names[e.name] = e
+        if flowName is not None:
+            box = names.get(flowName)
         else:
-            print('Could not find placement for element %s.' % element)
-        #else:
-        #    print 'TRY TO PLACE', element, element.getSize(), 'on page', page.pageNumber
+            referenced = set([e.nextElement for e in textBoxes if e.nextElement])
+            flowBoxes = [e for e in textBoxes if e.nextElement or e.name in referenced]
+            entries = [e for e in flowBoxes if not e.name in referenced] or flowBoxes
+            if not entries: # No linked boxes, use the first empty text box.
+                entries = [e for e in textBoxes if not len(e.textBuffer)]
+            box = None
+            if entries:
+                box = entries[0]
+        boxes = []
+        while box is not None and not box in boxes:
+            boxes.append(box)
+            box = names.get(box.nextElement)
+        return boxes
+
+    def _startPage(self, page):
+        u"""Make page the current page, place the waiting elements on its placeholders."""
+        self.page = page
+        self._boxes = []
+        self._boxIndex = 0
+        self._placeholders = []
+        self._carry = None
+        self._pageUsed = False
+        if page is not None:
+            self._boxes = self.getFlowBoxes(page, self.flowName)
+            self._placeholders = [e for e in page.elements if isinstance(e, self.PLACEHOLDER_CLASS)]
+            while self._pending and self._placeholders:
+                self._place(self._pending.popleft(), self._placeholders.pop(0))
+
+    def _usePage(self):
+        u"""Count the current page as used by the composition."""
+        if not self._pageUsed:
+            self._pageUsed = True
+            self.pageCount += 1
+            self.lastPage = self.page
+            self._newPages = []
+
+    def _getNextPage(self):
+        u"""Answer the page after the current page. Make a new page from the template if there is none."""
+        page = self.doc.pages.getNextPage(self.page)
+        if page is None and self.makeNewPage:
+            page = self.doc.newPage(template=self.template)
+            self._newPages.append(page)
+        return page
+
+    def _nextPage(self):
+        u"""Go to the next page. Stop, without making a new page, if the current page is the
+        MAX_EMPTY_PAGES page in a row that did not get content."""
+        if self._pageUsed:
+            self._emptyPages = 0
+        else:
+            self._emptyPages += 1
+            if self._emptyPages >= self.MAX_EMPTY_PAGES:
+                self._startPage(None)
+                return
+        self._startPage(self._getNextPage())
+
+    #   T E X T
+
+    def _getBox(self):
+        u"""Answer the current text box of the flow, going to the next page if all boxes of the
+        current page are filled. Answer None if there are no more pages."""
+        while self.page is not None:
+            if self._boxIndex < len(self._boxes):
+                return self._boxes[self._boxIndex]
+            self._nextPage()
+        return None
+
+    def pourText(self, buffer):
+        u"""Pour the TextBuffer buffer into the flow boxes, following the text that is already in the
+        current box. Text that does not fit in any box is added to self.overflow."""
+        if self._carry:
+            source = TextBuffer()
+            source.extend(self._carry)
+            source.extend(buffer)
+        else:
+            source = buffer
+        text = source.getText()
+        start = 0
+        while True:
+            box = self._getBox()
+            if box is None:
+                self.overflow.extend(source.slice(start))
+                return
+            end, full, measurements = fitText(box, source, start, self._capacity, text)
+            self.measurements += measurements
+            box.textBuffer = source.slice(start, end)
+            if end > start:
+                self._usePage()
+            if not full: # All text is in the box, following text is added to it.
+                self._carry = box.textBuffer
+                return
+            if end > start:
+                self._capacity = end - start
+            self.boxCount += 1
+            self._carry = None
+            self._boxIndex += 1
+            start = end
+
+    #   E L E M E N T S
+
+    def _place(self, e, placeholder):
+        u"""Replace the placeholder by e, with the position and size of the placeholder."""
+        page = placeholder.parent
+        e.x, e.y, e.z = placeholder.x, placeholder.y, placeholder.z
+        e.w, e.h = placeholder.w, placeholder.h
+        page.removeElement(placeholder)
+        page.appendElement(e) # Also removes e from the galley.
+        e.solve() # Layout the content of e for the new size.
+        self.elementCount += 1
+        self._usePage()
+
+    def placeElement(self, e):
+        u"""Place e on the next free placeholder of the current page. Otherwise let it wait for the
+        placeholders of the next page."""
+        if self._placeholders and not self._pending:
+            self._place(e, self._placeholders.pop(0))
+        else:
+            self._pending.append(e)
+
+    #   C O M P O S E
+
+    def compose(self, galley, doc, flowName=None):
+        u"""Compose the elements of galley on the pages of doc, starting on the first page. If doc is a
+        page, then start on that page. If flowName is defined, text starts in the text box with that name.
+        Answer the last page that got content. Statistics are in self.pageCount, self.pagesPerSecond, etc."""
+        t = time()
+        page = None
+        if getattr(doc, 'isPage', False):
+            page = doc
+            doc = page.doc
+        self.reset()
+        if flowName is not None:
+            self.flowName = flowName
+        self.doc = doc
+        if page is None:
+            page = doc.pages.getFirstPage()
+            if page is None and self.makeNewPage:
+                page = doc.newPage(template=self.template)
+                self._newPages.append(page)
+        self._startPage(page)
+
+        for e in list(galley.elements): # Placed elements are removed from the galley.
+            if e.isTextBox:
+                self.pourText(e.textBuffer)
+            elif not isinstance(e, self.SKIP_CLASSES):
+                self.placeElement(e)
+        if self._carry:
+            self.boxCount += 1 # The last box that has text.
+        # Elements still waiting for a placeholder, try the next pages.
+        while self._pending and self.page is not None:
+            self._nextPage()
+        self.unplaced = list(self._pending)
+        self._pending.clear()
+        for page in reversed(self._newPages): # Made after the last page that got content, remove them.
+            doc.removePage(page)
+        self._newPages = []
+        self.duration = time() - t
+        return self.lastPage
 
-    #    Validation, evaludating conditions.
-    
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
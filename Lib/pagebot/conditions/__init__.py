@@ -14,4 +14,5 @@
 from pagebot.conditions.align import *
 from pagebot.conditions.floating import *
 from pagebot.conditions.flow import *
-from pagebot.conditions.columns import *
\ No newline at end of file
+from pagebot.conditions.columns import *
+from pagebot.conditions.solver import Solver
@@ -16,6 +16,8 @@ from pagebot.conditions.condition import Condition
 
 class SolveBlock(Condition):
 	u"""Used as a condition in the sequence of conditions, to fix the block of child elements first."""
+	READS = ('children',)
+	ORDER_ONLY = True # The Solver already solves the child elements before the next conditions.
 	def evaluate(self, e, score):
 		for child in e.elements:
 			child.evaluate(score)
@@ -163,7 +165,11 @@ class Fit2BottomSide(Condition):
 #   Not only literally ”shrinking”, if self is smaller than the space occupied by
 #   the child elements, then it will grow on that side.
 
-class Shrink(Condition):
+class ShrinkCondition(Condition):
+	u"""Shrinking conditions depend on the position and size of the child elements and the parent."""
+	READS = ('parent', 'children')
+
+class Shrink(ShrinkCondition):
 	u"""Shrink the element on all sides around the margins of the enclose child elements.
 	There should be at least one child element for this to executed."""
 
@@ -179,7 +185,7 @@ class Shrink(Condition):
 	def solve(self, e, score):	
 		self.solveAll(e, self._getConditions(), score)
 
-class Shrink2BlockSides(Condition):
+class Shrink2BlockSides(ShrinkCondition):
 	u"""Shirink the element on all sides of the children sides. There needs to be at least
 	one child element."""
 
@@ -194,7 +200,7 @@ class Shrink2BlockSides(Condition):
 
 # There are no "ShrinkOrigin" condition, as these may result is extremely large scalings.
 
-class Shrink2BlockLeft(Condition):
+class Shrink2BlockLeft(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockLeft(self.tolerance)
 
@@ -202,7 +208,7 @@ class Shrink2BlockLeft(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.shrink2BlockLeft(), e, score)
 
-class Shrink2BlockRight(Condition):
+class Shrink2BlockRight(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockRight(self.tolerance)
 
@@ -211,7 +217,7 @@ class Shrink2BlockRight(Condition):
 			self.addScore(e.shrink2BlockRight(), e, score)
 
 		
-class Shrink2BlockTop(Condition):
+class Shrink2BlockTop(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockTop(self.tolerance)
 
@@ -219,7 +225,7 @@ class Shrink2BlockTop(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.shrink2BlockTop(), e, score)
 
-class Shrink2BlockBottom(Condition):
+class Shrink2BlockBottom(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockBottom(self.tolerance)
 
@@ -232,7 +238,7 @@ class Shrink2BlockBottom(Condition):
 #   Shrink to sides of the child elements, regardless of their margins or the padding of the parent
 #   There are no "Shrink2Origin" conditions, as these may result is extremely large scalings.
 
-class Shrink2BlockWidthSides(Condition): # Note the plural in the name.
+class Shrink2BlockWidthSides(ShrinkCondition): # Note the plural in the name.
 	def test(self, e):
 		return e.isShrunkOnBlockLeftSide(self.tolerance) and e.isShrunkOnBlockRightSide(self.tolerance)
 
@@ -240,7 +246,7 @@ class Shrink2BlockWidthSides(Condition): # Note the plural in the name.
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.shrink2BlockLeftSide() and e.shrink2BlockRightSide(), e, score)
 		
-class Shrink2BlockLeftSide(Condition):
+class Shrink2BlockLeftSide(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockLeftSide(self.tolerance)
 
@@ -248,7 +254,7 @@ class Shrink2BlockLeftSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.shrink2BlockLeftSide(), e, score)
 
-class Shrink2BlockRightSide(Condition):
+class Shrink2BlockRightSide(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockRightSide(self.tolerance)
 
@@ -256,7 +262,7 @@ class Shrink2BlockRightSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.strink2BlockRightSide(), e, score)
 
-class Shrink2BlockHeightSide(Condition):
+class Shrink2BlockHeightSide(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockTopSide(self.tolerance) and e.isShrunkOnBlockBottomSide(self.tolerance)
 
@@ -264,7 +270,7 @@ class Shrink2BlockHeightSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.shrink2BlockTopSide() and e.shrink2BlockBottomSide(), e, score)
 		
-class Shrink2BlockTopSide(Condition):
+class Shrink2BlockTopSide(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockTopSide(self.tolerance)
 
@@ -272,7 +278,7 @@ class Shrink2BlockTopSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.shrink2BlockTopSide(), e, score)
 
-class Shrink2BlockBottomSide(Condition):
+class Shrink2BlockBottomSide(ShrinkCondition):
 	def test(self, e):
 		return e.isShrunkOnBlockBottomSide(self.tolerance)
 
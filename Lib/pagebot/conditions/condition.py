@@ -12,6 +12,13 @@
 #     condition.py
 #       
 class Condition(object):
+    # Dependencies for the Solver: the elements that are read (besides e itself) and written by solving
+    # the condition on e. Names are 'self', 'parent', 'children' and 'previous' (siblings before e).
+    READS = ('parent',)
+    WRITES = ('self',)
+    ORDER_ONLY = False # If True, the Solver only uses the condition to order the solving of others.
+    READS_CONTENT = False # If True, the condition reads the text of e, and the Solver solves it on every solve.
+
     def __init__(self, value=1, tolerance=1, error=-10, verbose=False):
     	self.value = value # Value to answer if the condition is valid
         self.tolerance = tolerance
@@ -31,15 +38,43 @@ class Condition(object):
             score.result += self.error
             score.fails.append((self, e))
 
+    def _getInstance(self, conditionClass):
+    	u"""Answer the instance of conditionClass with the same parameters as self. Instances
+    	are created once, not for every call of evaluateAll and solveAll."""
+    	instances = self.__dict__.get('_instances')
+    	if instances is None:
+    		instances = self._instances = {}
+    	condition = instances.get(conditionClass)
+    	if condition is None:
+    		condition = instances[conditionClass] = conditionClass(self.value, self.tolerance, self.error, self.verbose)
+    	return condition
+
+    def _getConditions(self):
+    	u"""Compound conditions answer the list of condition classes that they consist of."""
+    	return None
+
+    def getSteps(self):
+    	u"""Answer the list of simple condition instances that evaluating and solving self comes down to,
+    	in order. Compound conditions are expanded, the list is made once."""
+    	steps = self.__dict__.get('_steps')
+    	if steps is None:
+    		conditionClasses = self._getConditions()
+    		if conditionClasses is None:
+    			steps = [self]
+    		else:
+    			steps = []
+    			for conditionClass in conditionClasses:
+    				steps += self._getInstance(conditionClass).getSteps()
+    		self._steps = steps
+    	return steps
+
     def evaluateAll(self, e, conditions, score):
-    	result = 0
     	for conditionClass in conditions:
-    		conditionClass(self.value, self.tolerance, self.error, self.verbose).evaluate(e, score)
+    		self._getInstance(conditionClass).evaluate(e, score)
 
     def solveAll(self, e, conditions, score):
-    	result = 0
     	for conditionClass in conditions:
-    		conditionClass(self.value, self.tolerance, self.error, self.verbose).solve(e, score)
+    		self._getInstance(conditionClass).solve(e, score)
 
     def __repr__(self):
     	return self.__class__.__name__
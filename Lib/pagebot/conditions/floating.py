@@ -14,9 +14,13 @@
 from __future__ import division
 from pagebot.conditions.condition import Condition
 
+class FloatCondition(Condition):
+	u"""Floating conditions depend on the position of the previous siblings."""
+	READS = ('parent', 'previous')
+
 # Margins
 
-class Float2Left(Condition):
+class Float2Left(FloatCondition):
 	u"""Align the element.left with max of all placed element.right or parent.left.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -26,7 +30,7 @@ class Float2Left(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Left(), e, score)
 
-class Float2Right(Condition):
+class Float2Right(FloatCondition):
 	u"""Align the element.right with min of all placed element.left or parent.right.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -36,7 +40,7 @@ class Float2Right(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Right(), e, score)
 
-class Float2Top(Condition):
+class Float2Top(FloatCondition):
 	u"""Align the element.top with max of all placed element.bottom or parent.top.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -46,7 +50,7 @@ class Float2Top(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Top(), e, score)
 
-class Float2Bottom(Condition):
+class Float2Bottom(FloatCondition):
 	u"""Align the element.bottom with max of all placed element.top or parent.bottom.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -58,7 +62,7 @@ class Float2Bottom(Condition):
 
 # Sides
 
-class Float2LeftSide(Condition):
+class Float2LeftSide(FloatCondition):
 	u"""Align the element.left with max of all placed element.right or parent.leftSide.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -68,7 +72,7 @@ class Float2LeftSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2LeftSide(), e, score)
 
-class Float2RightSide(Condition):
+class Float2RightSide(FloatCondition):
 	u"""Align the element.right with min of all placed element.left or parent.rightSide.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -78,7 +82,7 @@ class Float2RightSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2RightSide(), e, score)
 
-class Float2TopSide(Condition):
+class Float2TopSide(FloatCondition):
 	u"""Align the element.top with max of all placed element.bottom or parent.topSide.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -88,7 +92,7 @@ class Float2TopSide(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2TopSide(), e, score)
 
-class Float2BottomSide(Condition):
+class Float2BottomSide(FloatCondition):
 	u"""Align the element.bottom with max of all placed element.top or parent.bottomSide.
 	Positioning includes the margin of all elements."""
 	def test(self, e):
@@ -100,7 +104,7 @@ class Float2BottomSide(Condition):
 
 # Combinations
 
-class Float2LeftTop(Condition):
+class Float2LeftTop(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnLeft(self.tolerance) and e.isFloatOnTop(self.tolerance)
 
@@ -108,7 +112,7 @@ class Float2LeftTop(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Left() and e.float2Top(), e, score)
 
-class Float2TopLeft(Condition):
+class Float2TopLeft(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnTop(self.tolerance) and e.isFloatOnLeft(self.tolerance)
 
@@ -116,7 +120,7 @@ class Float2TopLeft(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Top() and e.float2Left(), e, score)
 
-class Float2RightTop(Condition):
+class Float2RightTop(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnRight(self.tolerance) and e.isFloatOnTop(self.tolerance)
 
@@ -124,7 +128,7 @@ class Float2RightTop(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Right() and e.float2Top(), e, score)
 
-class Float2TopRight(Condition):
+class Float2TopRight(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnTop(self.tolerance) and e.isFloatOnRight(self.tolerance)
 
@@ -132,7 +136,7 @@ class Float2TopRight(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Top() and e.float2Right(), e, score)
 
-class Float2LeftBottom(Condition):
+class Float2LeftBottom(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnLeft(self.tolerance) and e.isFloatOnBottom(self.tolerance)
 
@@ -140,7 +144,7 @@ class Float2LeftBottom(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Left() and e.float2Bottom(), e, score)
 
-class Float2BottomLeft(Condition):
+class Float2BottomLeft(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnBottom(self.tolerance) and e.isFloatOnLeft(self.tolerance)
 
@@ -148,7 +152,7 @@ class Float2BottomLeft(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Bottom() and e.float2Left(), e, score)
 
-class Float2RightBottom(Condition):
+class Float2RightBottom(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnRight(self.tolerance) and e.isFloatOnBottom(self.tolerance)
 
@@ -156,7 +160,7 @@ class Float2RightBottom(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2Right() and e.float2Bottom(), e, score)
 
-class Float2BottomRight(Condition):
+class Float2BottomRight(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnBottom(self.tolerance) and e.isFloatOnRight(self.tolerance)
 
@@ -166,7 +170,7 @@ class Float2BottomRight(Condition):
 
 # Combination sides
 
-class Float2LeftTopSides(Condition):
+class Float2LeftTopSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnLeftSide(self.tolerance) and e.isFloatOnTopSide(self.tolerance)
 
@@ -174,7 +178,7 @@ class Float2LeftTopSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2LeftSide() and e.float2TopSide(), e, score)
 
-class Float2TopLeftSides(Condition):
+class Float2TopLeftSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnTopSide(self.tolerance) and e.isFloatOnLeftSide(self.tolerance)
 
@@ -182,7 +186,7 @@ class Float2TopLeftSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2TopSide() and e.float2LeftSide(), e, score)
 
-class Float2RightTopSides(Condition):
+class Float2RightTopSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnRightSide(self.tolerance) and e.isFloatOnTopSide(self.tolerance)
 
@@ -190,7 +194,7 @@ class Float2RightTopSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2RightSide() and e.float2TopSide(), e, score)
 
-class Float2TopRightSides(Condition):
+class Float2TopRightSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnTopSide(self.tolerance) and e.isFloatOnRightSide(self.tolerance)
 
@@ -198,7 +202,7 @@ class Float2TopRightSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2TopSide() and e.float2RightSide(), e, score)
 
-class Float2LeftBottomSides(Condition):
+class Float2LeftBottomSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnLeftSide(self.tolerance) and e.isFloatOnBottomSide(self.tolerance)
 
@@ -206,7 +210,7 @@ class Float2LeftBottomSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2LeftSide() and e.float2BottomSide(), e, score)
 
-class Float2BottomLeftSides(Condition):
+class Float2BottomLeftSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnBottomSide(self.tolerance) and e.isFloatOnLeftSide(self.tolerance)
 
@@ -214,7 +218,7 @@ class Float2BottomLeftSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2BottomSide() and e.float2LeftSide(), e, score)
 
-class Float2RightBottomSides(Condition):
+class Float2RightBottomSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnRightSide(self.tolerance) and e.isFloatOnBottomSide(self.tolerance)
 
@@ -222,7 +226,7 @@ class Float2RightBottomSides(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.float2RightSide() and e.float2BottomSide(), e, score)
 
-class Float2BottomRightSides(Condition):
+class Float2BottomRightSides(FloatCondition):
 	def test(self, e):
 		return e.isFloatOnBottomSide(self.tolerance) and e.isFloatOnRightSide(self.tolerance)
 
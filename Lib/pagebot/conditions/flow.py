@@ -17,11 +17,14 @@
 #
 from __future__ import division
 from pagebot.conditions.condition import Condition
+from pagebot.conditions.floating import FloatCondition
 
 # Margins
 
 class Overflow2Next(Condition):
 	u"""If there is overflow in the element, then try to solve it."""
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isOverflow(self.tolerance)
 
@@ -36,6 +39,8 @@ class EqualizeFlow22Height(Condition):
 class Baseline2Top(Condition):
 	u"""Place the first baseline on the parent top padding position. Use the regular Top2Top() to place
 	the top of the text on the parent top padding position."""
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isBaselineOnTop(self.tolerance)
 
@@ -44,6 +49,8 @@ class Baseline2Top(Condition):
 			self.addScore(e.baseline2Top(), e, score)
 
 class Baseline2Bottom(Condition):
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isBaselineOnBottom(self.tolerance)
 
@@ -53,9 +60,11 @@ class Baseline2Bottom(Condition):
 
 #	Floating
 
-class FloatBaseline2Top(Condition):
+class FloatBaseline2Top(FloatCondition):
 	u"""Try to do Baseline2Top() or position just under – truncated locked on parent baseline – if there 
 	are already elements in the same z-layer."""
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isBaselineOnTop(self.tolerance)
 
@@ -63,9 +72,11 @@ class FloatBaseline2Top(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.floatBaseline2Top(), e, score)
 
-class FloatAscender2Top(Condition):
+class FloatAscender2Top(FloatCondition):
 	u"""Try to place the ascender of the first line on the parent top padding position. Or just under
 	– truncated locked on parent baseline – if there are already elements in the same z-layer."""
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isAscenderOnTop(self.tolerance)
 
@@ -73,9 +84,11 @@ class FloatAscender2Top(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.floatAscender2Top(), e, score)
 
-class FloatCapHeight2Top(Condition):
+class FloatCapHeight2Top(FloatCondition):
 	u"""Try to place the CapHeight of the first line on the parent top padding position. Or just under
 	– truncated locked on parent baseline – if there are already elements in the same z-layer."""
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isCapHeightOnTop(self.tolerance)
 
@@ -83,9 +96,11 @@ class FloatCapHeight2Top(Condition):
 		if not self.test(e): # Only try to solve if condition test fails. 
 			self.addScore(e.floatCapHeight2Top(), e, score)
 
-class FloatXHeight2Top(Condition):
+class FloatXHeight2Top(FloatCondition):
 	u"""Try to place the xHeight of the first line on the parent top padding position. Or just under
 	– truncated locked on parent baseline – if there are already elements in the same z-layer."""
+	READS_CONTENT = True
+
 	def test(self, e):
 		return e.isXHeightOnTop(self.tolerance)
 
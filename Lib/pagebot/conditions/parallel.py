@@ -0,0 +1,242 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     parallel.py
+#
+#     Solving the pages of a document in a pool of processes. Conditions only read
+#     and write elements in the tree of their own page, so pages can be solved
+#     independently, unless text flows from one page into another. Pages with flows
+#     (elements with nextElement, nextPage, prevElement or prevPage) and the pages
+#     they refer to, are solved in the main process, because the text that flows is
+#     not part of the merged geometry.
+#     The worker processes are forked with a copy of the document. Each worker solves
+#     a chunk of pages and answers the changes in the local styles of the elements, by
+#     their index in depth-first order of the page tree. The changes are set in the
+#     elements of the document in page order, and the fails of all pages are merged
+#     in page order, so the result is the same as solving all pages in one process.
+#
+import os
+import multiprocessing
+
+from pagebot.conditions.score import Score
+from pagebot.conditions.solver import Solver
+
+# Document that is solved by the forked worker processes.
+_document = None
+
+def getTree(page):
+    u"""Answer the list of all elements in the tree of page, in depth-first order."""
+    elements = []
+    stack = [page]
+    while stack:
+        e = stack.pop()
+        elements.append(e)
+        stack.extend(reversed(e.elements))
+    return elements
+
+def _getConditionKey(condition, e):
+    u"""Answer the position of condition in the conditions of e, as ('step', index) in the compiled
+    program or ('condition', index) in e.conditions. Answer None if it cannot be found."""
+    if e.conditions:
+        for index, step in enumerate(e.getConditionProgram().steps):
+            if step[0] is condition:
+                return 'step', index
+        for index, c in enumerate(e.conditions):
+            if c is condition:
+                return 'condition', index
+    return None
+
+def _getCondition(key, e):
+    kind, index = key
+    if kind == 'step':
+        return e.getConditionProgram().steps[index][0]
+    return e.conditions[index]
+
+def _solvePages(pageIndices):
+    u"""Solve the pages with pageIndices in the forked copy of _document. Answer the list of
+    (pageIndex, changes, result, fails) for each page, where changes is a list of
+    (elementIndex, changedItems, deletedNames) and fails is a list of (elementIndex, conditionKey)."""
+    pages = _document.pages.getPages()
+    answer = []
+    for pageIndex in pageIndices:
+        page = pages[pageIndex]
+        elements = getTree(page)
+        before = [dict(e.style.items()) for e in elements]
+        score = Score()
+        if _document.INCREMENTAL_SOLVE:
+            Solver(lambda: [page]).solve(score)
+        else:
+            page.solve(score)
+        changes = []
+        indices = {}
+        for index, e in enumerate(elements):
+            indices[id(e)] = index
+            style = dict(e.style.items())
+            if style != before[index]:
+                changed = {}
+                for name, value in style.items():
+                    if not name in before[index] or before[index][name] != value:
+                        changed[name] = value
+                deleted = [name for name in before[index] if not name in style]
+                changes.append((index, changed, deleted))
+        fails = []
+        for condition, e in score.fails:
+            index = indices.get(id(e))
+            if index is not None:
+                fails.append((index, _getConditionKey(condition, e)))
+        answer.append((pageIndex, changes, score.result, fails))
+    return answer
+
+class ParallelSolver(object):
+    u"""Solver of the pages of a document in a pool of processes. Falls back to solving in the
+    main process if there is only one process or fork is not available.
+
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import Element
+    >>> from pagebot.conditions import Left2Left, Float2Left
+    >>> doc = Document(w=500, h=500, autoPages=4)
+    >>> for page in doc.pages.getPages():
+    ...     a = Element(parent=page, x=100, y=100, w=100, h=100, conditions=[Left2Left()])
+    ...     b = Element(parent=page, x=300, y=100, w=100, h=100, conditions=[Float2Left()])
+    >>> solver = ParallelSolver(doc, processes=2, minPages=2)
+    >>> score = solver.solve()
+    >>> score.result, solver.parallelCount, solver.serialCount
+    (8, 4, 0)
+    >>> [(e.x, e.y) for e in doc[3].elements]
+    [(0, 100), (100, 100)]
+    >>> from pagebot.conditions.condition import Condition
+    >>> class Never(Condition):
+    ...     def test(self, e):
+    ...         return False
+    ...     def solve(self, e, score):
+    ...         self.addScore(False, e, score)
+    >>> doc = Document(w=500, h=500, autoPages=4)
+    >>> for pn, page in enumerate(doc.pages.getPages()):
+    ...     e = Element(parent=page, name='e%d' % pn, conditions=[Never()])
+    >>> doc[1].elements[0].nextElement = 'e2' # Page with a flow is solved in the main process.
+    >>> solver = ParallelSolver(doc, processes=2, minPages=2)
+    >>> score = solver.solve()
+    >>> solver.parallelCount, solver.serialCount, [e.name for condition, e in score.fails] # Fails in page order.
+    (3, 1, ['e0', 'e1', 'e2', 'e3'])
+    """
+    MIN_PAGES = 8 # Don't start processes for less pages.
+
+    def __init__(self, doc, processes=None, minPages=None):
+        self.doc = doc
+        self.processes = processes # Default is the number of processors.
+        self.minPages = minPages or self.MIN_PAGES
+        self.parallelCount = 0 # Number of pages solved by the pool in the last solve.
+        self.serialCount = 0 # Number of pages solved in the main process in the last solve.
+
+    def __repr__(self):
+        return '[%s Processes:%s Parallel:%d Serial:%d]' % (self.__class__.__name__,
+            self.processes, self.parallelCount, self.serialCount)
+
+    def getFlowPages(self, pages):
+        u"""Answer the set of ids of pages that have text flowing to or from other elements,
+        including the pages that their nextPage and prevPage refer to."""
+        flowPages = set()
+        doc = self.doc
+        for page in pages:
+            for e in getTree(page):
+                if e.nextElement or e.prevElement or e.nextPage is not None or e.prevPage is not None:
+                    flowPages.add(id(page))
+                    for pageName in (e.nextPage, e.prevPage):
+                        if pageName is not None:
+                            other = doc.getPage(pageName)
+                            if other is not None:
+                                flowPages.add(id(other))
+        return flowPages
+
+    def _canFork(self):
+        u"""Workers need a forked copy of the document. Daemon processes cannot make a pool."""
+        return hasattr(os, 'fork') and not multiprocessing.current_process().daemon
+
+    def solve(self, score=None):
+        u"""Solve all pages of the document. Answer the score, with the results of all pages."""
+        global _document
+        if score is None:
+            score = Score()
+        doc = self.doc
+        pages = doc.pages.getPages()
+        flowPages = self.getFlowPages(pages)
+        parallel = [index for index, page in enumerate(pages) if not id(page) in flowPages]
+        serial = [page for page in pages if id(page) in flowPages]
+        processes = self.processes or multiprocessing.cpu_count()
+        if processes < 2 or len(parallel) < self.minPages or not self._canFork():
+            serial = pages
+            parallel = []
+        self.parallelCount = len(parallel)
+        self.serialCount = len(serial)
+
+        results = []
+        if parallel:
+            # Chunks of neighboring pages, a few per process to balance the load.
+            chunkSize = max(1, len(parallel) // (processes * 4))
+            chunks = [parallel[index:index+chunkSize] for index in range(0, len(parallel), chunkSize)]
+            _document = doc
+            pool = multiprocessing.Pool(processes)
+            try:
+                for answer in pool.map(_solvePages, chunks):
+                    results += answer
+            finally:
+                pool.close()
+                pool.join()
+                _document = None
+        serialScore = Score(score.profiler) # Fails are merged with the fails of the pool in page order.
+        if serial:
+            if doc.INCREMENTAL_SOLVE:
+                if len(serial) == len(pages):
+                    doc.solver.solve(serialScore) # Keep the incremental graph of all pages.
+                else:
+                    Solver(lambda: serial).solve(serialScore)
+            else:
+                for page in serial:
+                    page.solve(serialScore)
+        score.result += serialScore.result
+        serialFails = {} # Key is page index, value is the list of fails of the elements of that page.
+        if serialScore.fails:
+            serialIds = set([id(page) for page in serial])
+            pageIndices = {}
+            for pageIndex, page in enumerate(pages):
+                if id(page) in serialIds:
+                    for e in getTree(page):
+                        pageIndices[id(e)] = pageIndex
+            for condition, e in serialScore.fails: # Elements that are not on a page are last.
+                serialFails.setdefault(pageIndices.get(id(e), len(pages)), []).append((condition, e))
+
+        answers = {}
+        for answer in results:
+            answers[answer[0]] = answer
+        for pageIndex in range(len(pages) + 1):
+            score.fails += serialFails.get(pageIndex, [])
+            if not pageIndex in answers:
+                continue
+            _, changes, result, fails = answers[pageIndex]
+            elements = getTree(pages[pageIndex])
+            for index, changed, deleted in changes:
+                style = elements[index].style
+                for name, value in sorted(changed.items()):
+                    style[name] = value
+                for name in deleted:
+                    del style[name]
+            score.result += result
+            for index, key in fails:
+                e = elements[index]
+                condition = None # Not a condition of e, only the element can be reported.
+                if key is not None:
+                    condition = _getCondition(key, e)
+                score.fails.append((condition, e))
+        return score
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     profiler.py
+#
+#     Opt-in profiling of evaluating and solving conditions. A SolveProfiler that is
+#     set in the Score (e.g. by doc.solve(profiler=profiler)) records the number of
+#     evaluates and solves, the time and the failures of every condition, per condition
+#     class, per element and per page. Elements are counted by their unique eId, so
+#     elements with the same name (e.g. the text box of a flow on every page) have
+#     their own statistics. Names are only shown in the summary.
+#
+import json
+from time import time
+
+# Indices in the statistics lists.
+EVALUATES, SOLVES, TIME, FAILS = range(4)
+COLUMNS = ('evaluates', 'solves', 'time', 'fails')
+
+class SolveProfiler(object):
+    u"""Statistics of condition evaluates and solves.
+
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import Element
+    >>> from pagebot.conditions import Left2Left
+    >>> doc = Document(w=500, h=500, autoPages=1)
+    >>> e = Element(parent=doc[0], name='box', x=100, w=100, conditions=[Left2Left()])
+    >>> other = Element(parent=doc[0], name='box', x=100, w=100, conditions=[Left2Left()])
+    >>> profiler = SolveProfiler()
+    >>> score = doc.solve(profiler=profiler)
+    >>> profiler.classes['Left2Left'][:2], profiler.elements[e.eId][:2], profiler.pages.keys()
+    ([0, 2], [0, 1], ['1'])
+    >>> print profiler.getSummary('elements', limit=2) # doctest: +NORMALIZE_WHITESPACE +ELLIPSIS
+    Elements                          Evaluates     Solves  Time (ms)    Fails
+    Element:box                               0          1       ...        0
+    Element:box                               0          1       ...        0
+    >>> e.x = 50
+    >>> e.evaluate(score.__class__(profiler=profiler)).result
+    -10
+    >>> profiler.getFailures()
+    [('Left2Left', 1)]
+    >>> stats = json.loads(profiler.asJson())
+    >>> stats['classes']['Left2Left']['evaluates'], stats['solves'], stats['elements'][e.eId]['name']
+    (1, 1, u'Element:box')
+    """
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self):
+        return '[%s Solves:%d Classes:%d Elements:%d Pages:%d Time:%0.3fs]' % (self.__class__.__name__,
+            self.solves, len(self.classes), len(self.elements), len(self.pages), self.duration)
+
+    def reset(self):
+        self.classes = {} # Key is condition class name, value is [evaluates, solves, time, fails]
+        self.elements = {} # Key is element eId, value is [evaluates, solves, time, fails]
+        self.elementNames = {} # Key is element eId, value is the class and name of the element, for the summary.
+        self.pages = {} # Key is page number, value is [evaluates, solves, time, fails]
+        self.failures = {} # Key is (condition class name, element eId), value is count.
+        self._pageKeys = {} # Key is id of element, value is (element, page key)
+        self.solves = 0 # Number of profiled Document.solve( ) calls.
+        self.duration = 0 # Total time of the profiled Document.solve( ) calls.
+        self._start = None
+
+    #   R E C O R D I N G
+
+    def start(self):
+        u"""Mark the start of a profiled Document.solve( )."""
+        self._start = time()
+
+    def stop(self):
+        if self._start is not None:
+            self.duration += time() - self._start
+            self.solves += 1
+            self._start = None
+
+    def getElementKey(self, e):
+        u"""Answer the unique key of e in self.elements. Store the name of e to show in the summary."""
+        key = e.eId
+        if not key in self.elementNames:
+            self.elementNames[key] = '%s:%s' % (e.__class__.__name__, e.name or key)
+        return key
+
+    def getPageKey(self, e):
+        u"""Answer the page number of the page of e as string, as shown in the document."""
+        entry = self._pageKeys.get(id(e))
+        if entry is None or entry[0] is not e:
+            page = e.getElementPage()
+            key = None
+            if page is not None and page.doc is not None:
+                key = page.doc.getPageNumber(page) or None
+            entry = self._pageKeys[id(e)] = e, key
+        return entry[1]
+
+    def _add(self, table, key, index, duration, failed):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = [0, 0, 0, 0]
+        stats[index] += 1
+        stats[TIME] += duration
+        if failed:
+            stats[FAILS] += failed
+
+    def record(self, index, condition, e, duration, failed=0):
+        u"""Record an evaluate (index is EVALUATES) or solve (index is SOLVES) of condition on e,
+        that took duration seconds and added failed fails to the score."""
+        className = condition.__class__.__name__
+        elementKey = self.getElementKey(e)
+        self._add(self.classes, className, index, duration, failed)
+        self._add(self.elements, elementKey, index, duration, failed)
+        pageKey = self.getPageKey(e)
+        if pageKey is not None:
+            self._add(self.pages, pageKey, index, duration, failed)
+        if failed:
+            key = className, elementKey
+            self.failures[key] = self.failures.get(key, 0) + failed
+
+    def run(self, index, method, condition, e, score):
+        u"""Call method(e, score) of condition and record it."""
+        fails = len(score.fails)
+        t = time()
+        method(e, score)
+        self.record(index, condition, e, time() - t, len(score.fails) - fails)
+
+    #   R E P O R T I N G
+
+    def getFailures(self, byElement=False, limit=None):
+        u"""Answer the histogram of failures as list of (key, count), by condition class name or by
+        element eId (with its name in self.elementNames), most failing first."""
+        histogram = {}
+        for (className, elementKey), count in self.failures.items():
+            key = byElement and elementKey or className
+            histogram[key] = histogram.get(key, 0) + count
+        return sorted(histogram.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def getStats(self):
+        u"""Answer the dictionary with all statistics, as exported by self.asJson( )."""
+        def table2Dict(table):
+            return dict([(key, dict(zip(COLUMNS, stats))) for key, stats in table.items()])
+        elements = table2Dict(self.elements)
+        for key, stats in elements.items():
+            stats['name'] = self.elementNames.get(key, key)
+        return dict(solves=self.solves, duration=self.duration, classes=table2Dict(self.classes),
+            elements=elements, pages=table2Dict(self.pages),
+            failures=[dict(condition=className, element=elementKey, count=count)
+                for (className, elementKey), count in sorted(self.failures.items())])
+
+    def asJson(self, path=None, indent=None):
+        u"""Answer the statistics as JSON string. If path is defined, also write it to that file."""
+        s = json.dumps(self.getStats(), indent=indent, sort_keys=True)
+        if path is not None:
+            f = open(path, 'w')
+            f.write(s)
+            f.close()
+        return s
+
+    def getSummary(self, table='classes', sortBy='time', limit=20):
+        u"""Answer the summary table of the statistics of table ('classes', 'elements' or 'pages'),
+        sorted by sortBy (one of COLUMNS), highest first, as string. Elements are shown by name."""
+        stats = getattr(self, table)
+        index = COLUMNS.index(sortBy)
+        lines = ['%-32s %10s %10s %10s %8s' % (table.capitalize(), 'Evaluates', 'Solves', 'Time (ms)', 'Fails')]
+        for key, (evaluates, solves, duration, fails) in sorted(stats.items(),
+                key=lambda item: (-item[1][index], item[0]))[:limit]:
+            if table == 'elements':
+                key = self.elementNames.get(key, key)
+            lines.append('%-32s %10d %10d %10.2f %8d' % (key[:32], evaluates, solves, duration*1000, fails))
+        return '\n'.join(lines)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
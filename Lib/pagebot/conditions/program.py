@@ -0,0 +1,111 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     program.py
+#
+#     Compiled condition lists. The conditions of an element are expanded once into
+#     a flat list of simple conditions (compound conditions like Fit become their
+#     parts) with their bound test and solve methods. Evaluating a program checks
+#     the parent once and adds the scores directly, instead of dispatching through
+#     Condition.evaluate and Condition.addScore for every condition.
+#     The program is kept by the element and used again in the next passes, until
+#     its list of conditions changes, or one of the conditions in the list is replaced.
+#
+from pagebot.conditions.condition import Condition
+from pagebot.conditions.profiler import EVALUATES, SOLVES
+
+def _isInherited(condition, name):
+    u"""Answer the boolean flag if the method name of condition is the one of Condition."""
+    return getattr(condition.__class__, name).im_func is getattr(Condition, name).im_func
+
+class ConditionProgram(object):
+    u"""Flat sequence of bound operations, made from a list of conditions.
+
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import Element
+    >>> from pagebot.conditions import Fit, Left2Left
+    >>> from pagebot.conditions.score import Score
+    >>> doc = Document(w=500, h=500, autoPages=1)
+    >>> e = Element(parent=doc[0], x=100, y=100, w=100, h=100)
+    >>> program = ConditionProgram([Fit(), Left2Left()])
+    >>> program
+    [ConditionProgram Conditions:2 Steps:5]
+    >>> score = program.evaluate(e, Score())
+    >>> score.result, len(score.fails)
+    (-50, 5)
+    >>> score = program.solve(e, Score())
+    >>> score = program.evaluate(e, Score())
+    >>> score.result, len(score.fails), (e.x, e.w)
+    (5, 0, (0, 500))
+    >>> conditions = [Left2Left()]
+    >>> program = ConditionProgram(conditions)
+    >>> program.isValid(conditions), program.isValid(list(conditions))
+    (True, False)
+    >>> conditions[0] = Left2Left() # Replaced condition in the same list.
+    >>> program.isValid(conditions)
+    False
+    """
+    def __init__(self, conditions):
+        self.conditions = conditions # The list that the program was made from.
+        self.items = tuple(conditions) # The conditions of the list, to find replaced conditions.
+        self.count = len(conditions)
+        self.steps = [] # List of (condition, test, evaluate, solve) tuples.
+        for condition in conditions:
+            for step in condition.getSteps():
+                test = None # Only inline the test, if the condition scores as any other condition.
+                if _isInherited(step, 'evaluate') and _isInherited(step, 'addScore'):
+                    test = getattr(step, 'test', None)
+                self.steps.append((step, test, step.evaluate, step.solve))
+
+    def __repr__(self):
+        return '[%s Conditions:%d Steps:%d]' % (self.__class__.__name__, self.count, len(self.steps))
+
+    def isValid(self, conditions):
+        u"""Answer the boolean flag if the program is still made from the list of conditions,
+        with the same conditions in it."""
+        if conditions is not self.conditions or len(conditions) != self.count:
+            return False
+        for condition, item in zip(conditions, self.items):
+            if condition is not item:
+                return False
+        return True
+
+    def evaluate(self, e, score):
+        u"""Evaluate all conditions on e, adding to score. Answer the score."""
+        profiler = score.profiler
+        if profiler is not None:
+            for condition, test, evaluate, solve in self.steps:
+                profiler.run(EVALUATES, evaluate, condition, e, score)
+            return score
+        parent = e.parent
+        for condition, test, evaluate, solve in self.steps:
+            if test is None:
+                evaluate(e, score)
+            elif parent is not None and test(e):
+                score.result += condition.value
+            else:
+                score.result += condition.error
+                score.fails.append((condition, e))
+        return score
+
+    def solve(self, e, score):
+        u"""Solve all conditions on e, adding to score. Answer the score."""
+        profiler = score.profiler
+        for condition, test, evaluate, solve in self.steps:
+            if profiler is None:
+                solve(e, score)
+            else:
+                profiler.run(SOLVES, solve, condition, e, score)
+        return score
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -12,9 +12,10 @@
 #     score.py
 #       
 class Score(object):
-    def __init__(self):
+    def __init__(self, profiler=None):
         self.result = 0
         self.fails = []
+        self.profiler = profiler # Optional SolveProfiler that records the evaluates and solves.
 
     def __repr__(self):
         return 'Score: %s Fails: %d' % (self.result, len(self.fails))
@@ -0,0 +1,407 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     solver.py
+#
+#     Solving the conditions of element trees in the order of their dependencies.
+#     The solver builds a graph of the conditions and the geometry of the elements they
+#     read and write (as declared by condition.READS and condition.WRITES), solves the
+#     conditions in topological order and iterates cycles until nothing moves anymore.
+#     On the next solve, only the conditions that depend on changed elements are solved again.
+#     Conditions that read the text of elements (condition.READS_CONTENT) are solved on every
+#     solve, as changes in content are not visible in the geometry. Elements that override
+#     Element.solve( ) are solved by their own method, as one node, including their children.
+#
+from time import time
+from heapq import heappush, heappop
+
+from pagebot.conditions.score import Score
+from pagebot.conditions.profiler import SOLVES
+
+# Kinds of nodes in the dependency graph.
+CONDITION = 0 # Solving a condition on an element.
+GEOMETRY = 1 # Position and size of an element.
+PREVIOUS = 2 # Geometry of an element and all its previous siblings.
+
+class SolveElement(object):
+    u"""Condition that solves e by its own e.solve( ), for elements that override Element.solve( )."""
+    READS = ('parent',)
+    WRITES = ('self',)
+    ORDER_ONLY = False
+    READS_CONTENT = True # The method may read anything, solve it every time.
+
+    def solve(self, e, score):
+        e.solve(score)
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+SOLVE_ELEMENT = SolveElement()
+
+class Solver(object):
+    u"""Incremental solver of the conditions in the element trees, as answered by getRoots( ).
+    The Document answers its pages in order of page number.
+
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import Element
+    >>> from pagebot.conditions import Left2Left, Float2Left
+    >>> doc = Document(w=500, h=500, autoPages=1)
+    >>> page = doc[0]
+    >>> a = Element(parent=page, x=100, y=100, w=100, h=100, conditions=[Left2Left()])
+    >>> b = Element(parent=page, x=300, y=100, w=100, h=100, conditions=[Float2Left()])
+    >>> solver = Solver(lambda: [page])
+    >>> score = solver.solve()
+    >>> a.x, b.x, solver.solveCount, solver.converged
+    (0, 100, 2, True)
+    >>> score = solver.solve() # Nothing changed, nothing to solve.
+    >>> solver.solveCount
+    0
+    >>> a.x = 50 # Moving a makes b float again, then Left2Left moves a back.
+    >>> score = solver.solve()
+    >>> a.x, b.x, solver.solveCount
+    (0, 100, 2)
+    >>> class Solving(Element):
+    ...     def solve(self, score=None):
+    ...         self.x = 222
+    ...         return Element.solve(self, score)
+    >>> c = Solving(parent=page, x=0, y=300, w=10, h=10)
+    >>> score = solver.solve() # New element, build the graph and solve all.
+    >>> c.x, solver.solveCount
+    (222, 3)
+    >>> c.x = 0 # Solved again by its own method, on every solve.
+    >>> score = solver.solve()
+    >>> c.x, solver.solveCount
+    (222, 1)
+    """
+    MAX_ITERATIONS = 10 # Maximum number of times that the conditions in a cycle are solved.
+
+    def __init__(self, getRoots, maxIterations=None, verbose=False):
+        self.getRoots = getRoots
+        self.maxIterations = maxIterations or self.MAX_ITERATIONS
+        self.verbose = verbose
+        self._structure = None # List of (e, conditions) tuples of the current graph.
+        self._geometry = {} # Key is element, value is its geometry after the last solve.
+        self._changed = set() # Elements that were marked as changed by the caller.
+        # Statistics of the last solve.
+        self.solveCount = 0 # Number of solved conditions.
+        self.iterations = 0 # Maximum number of iterations of a cycle.
+        self.converged = True # False if a cycle did not converge within self.maxIterations.
+        self.solveTime = 0 # Total time of the last solve, in seconds.
+        self.buildTime = 0 # Time spent building the graph in the last solve.
+        self.classCounts = {} # Key is condition class name, value is number of solves.
+        # Statistics of all solves.
+        self.totalSolveCount = 0
+        self.totalSolveTime = 0
+        self.solves = 0
+        self._clearGraph()
+
+    def __repr__(self):
+        return '[%s Nodes:%d Cycles:%d Solved:%d Iterations:%d Converged:%s Time:%0.3fs]' % (self.__class__.__name__,
+            len(self._kinds), self.cycles, self.solveCount, self.iterations, self.converged, self.solveTime)
+
+    def _clearGraph(self):
+        self._kinds = [] # Node kind, by node index.
+        self._elements = [] # Element of the node.
+        self._conditions = [] # Condition of the node, None for other kinds.
+        self._priorities = [] # Tree order of the node, to sort independent nodes.
+        self._successors = [] # List of node indices that depend on the node.
+        self._geometryNodes = {} # Key is element, value is the index of its GEOMETRY node.
+        self._conditionNodes = {} # Key is element, value is the list of its CONDITION nodes.
+        self._order = [] # List of strongly connected components (lists of nodes), in topological order.
+        self._contentNodes = [] # CONDITION nodes that are solved on every solve.
+        self.cycles = 0 # Number of components with more than one condition.
+
+    def markChanged(self, e):
+        u"""The geometry of e changed. Solve the conditions that depend on it on the next solve.
+        Changes in position and size are also found by comparing with the last solve."""
+        self._changed.add(e)
+
+    def reset(self):
+        u"""Forget the graph, so all conditions are solved on the next solve."""
+        self._structure = None
+        self._geometry = {}
+
+    def getGeometry(self, e):
+        u"""Answer the local position and size values of e, as written by the conditions."""
+        style = e.style
+        return style.get('x'), style.get('y'), style.get('z'), style.get('w'), style.get('h'), style.get('d')
+
+    def getStats(self):
+        u"""Answer the dictionary with the statistics of the last solve."""
+        return dict(nodes=len(self._kinds), cycles=self.cycles, solveCount=self.solveCount,
+            iterations=self.iterations, converged=self.converged, solveTime=self.solveTime,
+            buildTime=self.buildTime, classCounts=dict(self.classCounts),
+            totalSolveCount=self.totalSolveCount, totalSolveTime=self.totalSolveTime, solves=self.solves)
+
+    #   G R A P H
+
+    def getConditions(self, e):
+        u"""Answer the tuple of conditions of e in the graph. Elements that override Element.solve( )
+        are solved by their own method."""
+        from pagebot.elements.element import Element # Elements import the conditions.
+        solve = getattr(e.__class__, 'solve', None)
+        if solve is not None and getattr(solve, 'im_func', None) is not Element.solve.im_func:
+            return (SOLVE_ELEMENT,)
+        return tuple(e.conditions or ())
+
+    def _getTree(self):
+        u"""Answer the list of visible elements in depth-first order and the list of (e, conditions)
+        tuples that defines the structure of the graph. The children of elements that solve themselves
+        are not in the graph."""
+        elements = []
+        structure = []
+        stack = list(reversed(self.getRoots()))
+        while stack:
+            e = stack.pop()
+            elements.append(e)
+            conditions = self.getConditions(e)
+            structure.append((e, conditions))
+            if conditions != (SOLVE_ELEMENT,):
+                stack.extend([child for child in reversed(e.elements) if child.show])
+        return elements, structure
+
+    def _newNode(self, kind, e, condition, priority):
+        self._kinds.append(kind)
+        self._elements.append(e)
+        self._conditions.append(condition)
+        self._priorities.append(priority)
+        self._successors.append([])
+        return len(self._kinds) - 1
+
+    def _getNodes(self, names, e, previousNodes):
+        u"""Answer the list of nodes that represent the elements names, seen from e."""
+        geometryNodes = self._geometryNodes
+        nodes = []
+        for name in names:
+            if name == 'parent':
+                node = geometryNodes.get(e.parent)
+                if node is not None:
+                    nodes.append(node)
+            elif name == 'children':
+                for child in e.elements:
+                    node = geometryNodes.get(child)
+                    if node is not None:
+                        nodes.append(node)
+            elif name == 'previous':
+                node = previousNodes.get(e)
+                if node is not None:
+                    nodes.append(node)
+            elif name == 'self':
+                nodes.append(geometryNodes[e])
+        return nodes
+
+    def _build(self, elements, structure):
+        u"""Build the dependency graph of the elements and their conditions, as (e, conditions) in structure."""
+        self._clearGraph()
+        successors = self._successors
+        treeOrder = {}
+        for index, e in enumerate(elements):
+            treeOrder[e] = index
+            self._geometryNodes[e] = self._newNode(GEOMETRY, e, None, (index, 1, 0))
+        # Chain of PREVIOUS nodes through the siblings, so conditions can depend on all previous
+        # siblings, without an edge to each of them.
+        previousNodes = {} # Key is element, value is the PREVIOUS node of the siblings before it.
+        for e in elements:
+            previous = None
+            for child in e.elements:
+                if child in treeOrder:
+                    previousNodes[child] = previous
+                    node = self._newNode(PREVIOUS, child, None, (treeOrder[child], 2, 0))
+                    successors[self._geometryNodes[child]].append(node)
+                    if previous is not None:
+                        successors[previous].append(node)
+                    previous = node
+        for e, conditions in structure:
+            last = None
+            for index, condition in enumerate(conditions):
+                node = self._newNode(CONDITION, e, condition, (treeOrder[e], 0, index))
+                self._conditionNodes.setdefault(e, []).append(node)
+                if condition.READS_CONTENT:
+                    self._contentNodes.append(node)
+                if last is not None:
+                    successors[last].append(node) # Solve the conditions of e in the order of the list.
+                last = node
+                for source in self._getNodes(condition.READS, e, previousNodes):
+                    if source != self._geometryNodes[e]: # Reading itself is implicit.
+                        successors[source].append(node)
+                if not condition.ORDER_ONLY:
+                    successors[node] += self._getNodes(condition.WRITES, e, previousNodes)
+        self._order = self._getComponents()
+        self.cycles = 0
+        for component in self._order:
+            if sum([1 for node in component if self._kinds[node] == CONDITION]) > 1:
+                self.cycles += 1
+
+    def _getComponents(self):
+        u"""Answer the strongly connected components of the graph (Tarjan), in topological order.
+        Independent components are sorted in tree order."""
+        successors = self._successors
+        count = len(successors)
+        indices = [None] * count
+        lowLinks = [0] * count
+        onStack = [False] * count
+        stack = []
+        components = []
+        componentOf = [0] * count
+        index = 0
+        for start in range(count):
+            if indices[start] is not None:
+                continue
+            work = [(start, 0)] # Iterative depth-first search, to avoid the recursion limit.
+            while work:
+                node, position = work.pop()
+                if position == 0:
+                    indices[node] = lowLinks[node] = index
+                    index += 1
+                    stack.append(node)
+                    onStack[node] = True
+                nodeSuccessors = successors[node]
+                while position < len(nodeSuccessors):
+                    successor = nodeSuccessors[position]
+                    position += 1
+                    if indices[successor] is None:
+                        work.append((node, position))
+                        work.append((successor, 0))
+                        break
+                    elif onStack[successor]:
+                        lowLinks[node] = min(lowLinks[node], indices[successor])
+                else:
+                    if lowLinks[node] == indices[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            onStack[member] = False
+                            componentOf[member] = len(components)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+                    if work:
+                        parent = work[-1][0]
+                        lowLinks[parent] = min(lowLinks[parent], lowLinks[node])
+        # Topological order of the components, sorted by tree order where there is a choice.
+        priorities = self._priorities
+        inDegrees = [0] * len(components)
+        componentSuccessors = [set() for component in components]
+        for node in range(count):
+            for successor in successors[node]:
+                c1 = componentOf[node]
+                c2 = componentOf[successor]
+                if c1 != c2 and not c2 in componentSuccessors[c1]:
+                    componentSuccessors[c1].add(c2)
+                    inDegrees[c2] += 1
+        for component in components:
+            component.sort(key=priorities.__getitem__)
+        heap = []
+        for c, component in enumerate(components):
+            if not inDegrees[c]:
+                heappush(heap, (priorities[component[0]], c))
+        order = []
+        while heap:
+            priority, c = heappop(heap)
+            order.append(components[c])
+            for c2 in componentSuccessors[c]:
+                inDegrees[c2] -= 1
+                if not inDegrees[c2]:
+                    heappush(heap, (priorities[components[c2][0]], c2))
+        return order
+
+    #   S O L V I N G
+
+    def solve(self, score=None):
+        u"""Solve the conditions that depend on changed elements, or all conditions if the element
+        trees or their conditions changed. Answer the score of all conditions in the graph."""
+        t = time()
+        if score is None:
+            score = Score()
+        self.solveCount = 0
+        self.iterations = 0
+        self.converged = True
+        self.buildTime = 0
+        self.classCounts = {}
+
+        elements, structure = self._getTree()
+        if structure != self._structure:
+            self._build(elements, structure)
+            self.buildTime = time() - t
+            self._structure = structure
+            self._scores = {} # Key is node, value is the Score of its last solve.
+            dirty = [True] * len(self._kinds)
+        else:
+            dirty = [False] * len(self._kinds)
+            geometry = self._geometry
+            for e in elements:
+                if e in self._changed or self.getGeometry(e) != geometry.get(e):
+                    # Solve the elements that depend on e, and the conditions of e itself.
+                    dirty[self._geometryNodes[e]] = True
+                    for node in self._conditionNodes.get(e, ()):
+                        dirty[node] = True
+            for node in self._contentNodes:
+                dirty[node] = True
+        self._changed = set()
+
+        kinds = self._kinds
+        successors = self._successors
+        for component in self._order:
+            iteration = 0
+            while iteration < self.maxIterations:
+                todo = [node for node in component if dirty[node]]
+                if not todo:
+                    break
+                iteration += 1
+                for node in todo:
+                    if not dirty[node]: # Already solved in this iteration.
+                        continue
+                    dirty[node] = False
+                    if kinds[node] != CONDITION or self._conditions[node].ORDER_ONLY or self._solveNode(node, score.profiler):
+                        for successor in successors[node]:
+                            dirty[successor] = True
+            self.iterations = max(self.iterations, iteration)
+            for node in component:
+                if dirty[node]:
+                    dirty[node] = False
+                    self.converged = False
+                    if self.verbose:
+                        print '[%s] Conditions did not converge in %d iterations: %s' % (self.__class__.__name__,
+                            self.maxIterations, self._elements[node])
+
+        self._geometry = dict([(e, self.getGeometry(e)) for e in elements])
+        for node in sorted(self._scores):
+            nodeScore = self._scores[node]
+            score.result += nodeScore.result
+            score.fails += nodeScore.fails
+        self.solveTime = time() - t
+        self.totalSolveCount += self.solveCount
+        self.totalSolveTime += self.solveTime
+        self.solves += 1
+        return score
+
+    def _solveNode(self, node, profiler=None):
+        u"""Solve the condition of node. Answer the boolean flag if the geometry of the elements it
+        writes has changed. If profiler is defined, it records the solve."""
+        e = self._elements[node]
+        condition = self._conditions[node]
+        targets = [self._elements[target] for target in self._successors[node] if self._kinds[target] == GEOMETRY]
+        before = [self.getGeometry(target) for target in targets]
+        nodeScore = Score()
+        if profiler is None:
+            condition.solve(e, nodeScore)
+        else:
+            profiler.run(SOLVES, condition.solve, condition, e, nodeScore)
+        self._scores[node] = nodeScore
+        self.solveCount += 1
+        name = condition.__class__.__name__
+        self.classCounts[name] = self.classCounts.get(name, 0) + 1
+        return before != [self.getGeometry(target) for target in targets]
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
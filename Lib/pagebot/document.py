@@ -12,14 +12,23 @@
 #     document.py
 #
 import copy
-from drawBot import newPage, installedFonts, installFont
+try:
+    from drawBot import newPage, installedFonts, installFont
+except ImportError:
+    newPage = installedFonts = installFont = None
 
 from pagebot.stylelib import styleLib # Library with named, predefined style dicts.
 from pagebot.conditions.score import Score
+from pagebot.conditions.solver import Solver
+from pagebot.conditions.parallel import ParallelSolver
 from pagebot.elements.pbpage import Page, Template
 from pagebot.elements.views import View, DefaultView, SingleView, ThumbView, MampView, GitView
 from pagebot.style import makeStyle, getRootStyle, TOP, BOTTOM
 from pagebot.toolbox.transformer import obj2StyleId
+from pagebot.toolbox.cascade import CascadeStyle, cascadeGenerations
+from pagebot.toolbox.elementindex import ElementIndex
+from pagebot.toolbox.pagestore import PageStore
+from pagebot.toolbox.selectormatcher import SelectorMatcher
 from pagebot.builders import BuildInfo # Container with Builder flags and data/parametets
 
 class Document(object):
@@ -27,6 +36,12 @@ class Document(object):
     
     PAGE_CLASS = Page # Allow inherited versions of the Page class.
     VIEW_CLASS = View
+    # If True, solve the conditions of all pages in order of their dependencies, and only solve again
+    # what changed, see pagebot.conditions.solver. Default is to solve all conditions of all pages
+    # once, in page order, by page.solve( ).
+    INCREMENTAL_SOLVE = False
+    # Solve the pages that have no text flows in a pool of processes, see self.solve( )
+    PARALLEL_SOLVE = False
 
     def __init__(self, rootStyle=None, styles=None, views=None, name=None, class_=None, title=None, 
             autoPages=1, template=None, templates=None, originTop=True, startPage=0, w=None, h=None, 
@@ -46,7 +61,9 @@ class Document(object):
         self.name = name or title or 'Untitled'
         self.title = title or self.name
 
-        self.pages = {} # Key is pageNumber, Value is row list of pages: self.pages[pn][index] = page
+        self.pages = PageStore() # Key is pageNumber, Value is row list of pages: self.pages[pn][index] = page
+        self.elementIndex = ElementIndex() # Index of all elements on the pages by eId, name and class_.
+        self.solver = Solver(self.pages.getPages) # Dependency graph of the conditions on all pages.
 
         self.initializeTemplates(templates, template) # Template is name or instance default template.
 
@@ -98,9 +115,8 @@ class Document(object):
             pn, index = pnIndex, 0 # Default is left page on pn row.
         return self.pages[pn][index]
     def __setitem__(self, pn, page):
-        if not pn in self.pages:
-            self.pages[pn] = []
-        self.pages[pn].append(page)
+        self.pages.add(pn, page)
+        self.elementIndex.addTree(page)
    
     def _get_ancestors(self):
         return []
@@ -160,6 +176,7 @@ class Document(object):
         if styles is None:
             styles = copy.copy(styleLib['default'])
         self.styles = styles # Dictionary of styles. Key is XML tag name value is Style instance.
+        self._styleMatcher = None # Compiled style names, made by self.getStyleMatcher()
         # Make sure that the default styles for document and page are always there.
         name = 'root'
         self.addStyle(name, self.rootStyle)
@@ -170,6 +187,16 @@ class Document(object):
         if not name in self.styles: # Default dict styles as placeholder, if nothing is defined.
             self.addStyle(name, dict(name=name))
 
+    def _get_rootStyle(self):
+        return self._rootStyle
+    def _set_rootStyle(self, rootStyle):
+        u"""Set the root style as CascadeStyle, so changes invalidate the cached css values of all elements."""
+        if not isinstance(rootStyle, CascadeStyle):
+            rootStyle = CascadeStyle(rootStyle)
+        self._rootStyle = rootStyle
+        cascadeGenerations.bumpTree() # All elements may have cached values from the previous root style.
+    rootStyle = property(_get_rootStyle, _set_rootStyle)
+
     def makeRootStyle(self, rootStyle, **kwargs):
         u"""Create a rootStyle if not defined, then set the arguments from **kwargs, if their entry name already exists.
         This is similar (but not identical) to the makeStyle in Elements. There any value entry is copied, even if that
@@ -210,17 +237,24 @@ class Document(object):
             style = self.rootStyle
         return style.get(name, default)
 
+    def getStyleMatcher(self):
+        u"""Answer the SelectorMatcher of the style names in self.styles. It is compiled again if
+        styles were added or removed since the last call."""
+        matcher = self._styleMatcher
+        if matcher is None or len(matcher.styleNames) != len(self.styles):
+            matcher = self._styleMatcher = SelectorMatcher(self.styles.keys())
+        return matcher
+    styleMatcher = property(getStyleMatcher)
+
     def findStyle(self, styleId):
         u"""Answer the style that fits the optional sequence naming of styleId.
         Answer None if no style can be found. styleId can have one of these formats:
         ('main h1', 'h1 b')"""
         if styleId is None:
             return None
-        styleId = obj2StyleId(styleId)
-        while styleId and not ' '.join(styleId) in self.styles:
-            styleId = styleId[1:]
-        if styleId:
-            return self.styles[styleId]
+        styleName = self.getStyleMatcher().match(obj2StyleId(styleId))
+        if styleName is not None:
+            return self.styles[styleName]
         return None
 
     def getNamedStyle(self, styleName):
@@ -251,6 +285,7 @@ class Document(object):
         with *self.removeStyle* or use *self.replaceStyle(name, style)* instead."""
         assert not name in self.styles
         self.styles[name] = style
+        self._styleMatcher = None
         # Force the name of the style to synchronize with the requested key.
         style['name'] = name
         return style # Answer the style for convenience of the caller.
@@ -258,9 +293,12 @@ class Document(object):
     def removeStyle(self, name):
         u"""Remove the style *name* if it exists. Raise an error if is does not exist."""
         del self.styles[name]
+        self._styleMatcher = None
 
     def replaceStyle(self, name, style):
         u"""Set the style by name. Overwrite the style with that name if it already exists."""
+        if not name in self.styles:
+            self._styleMatcher = None
         self.styles[name] = style
         # Force the name of the style to synchronize with the requested key.
         style['name'] = name
@@ -392,11 +430,26 @@ class Document(object):
         u"""Append a page to the document. Assert that it is a page element."""
         assert page.isPage    
         page.setParent(self) # Set parent as weakref, without calling self.appendElement again.
-        if self.pages.keys():
-            pn = max(self.pages.keys())+1
-        else:
-            pn = 0
-        self[pn] = page
+        self[self.pages.getNextPageNumber()] = page
+
+    def insertPage(self, page, pn):
+        u"""Insert the page as new row at pn. If the row already exists, then the page numbers of that row
+        and all rows after it are incremented."""
+        assert page.isPage
+        if page.parent is self:
+            self.pages.remove(page)
+        page.setParent(self) # Set parent as weakref, without calling self.appendElement again.
+        self.pages.insert(pn, page)
+        self.elementIndex.addTree(page)
+
+    def removePage(self, page, renumber=True):
+        u"""Remove the page from the document. If its row becomes empty and renumber is True, then
+        the page numbers of all rows after it are decremented. Answer the removed page."""
+        assert page.parent is self
+        self.pages.remove(page, renumber)
+        self.elementIndex.removeTree(page)
+        page.setParent(None)
+        return page
 
     def getPage(self, pnOrName, index=0):
         u"""Answer the page at (pn, index). Otherwise search for a page with this name. Raise index errors if it does not exist."""
@@ -415,8 +468,18 @@ class Document(object):
 
     def findPages(self, eId=None, name=None, pattern=None, pageSelection=None):
         u"""Various ways to find pages from their attributes."""
+        if eId is not None and pageSelection is None:
+            page = self.elementIndex.get(eId)
+            if page is not None and page.isPage and page.parent is self:
+                return [page]
         pages = []
-        for pn, pnPages in sorted(self.pages.items()):
+        if eId is None and pattern is None and name is not None and pageSelection is None:
+            # Only search the pages with this name, in order of page number and index.
+            pages = self.pages
+            found = [(pages.getPageNumber(page), pages.getPageIndex(page), page)
+                for page in self.elementIndex.findByName(name) if page.isPage and page.parent is self]
+            return [page for pn, index, page in sorted(found)]
+        for pn, pnPages in self.pages.items():
             if not pageSelection is None and not pn in pageSelection:
                 continue
             for page in pnPages: # List of pages with identical pn
@@ -435,17 +498,17 @@ class Document(object):
     
     def isLeftPage(self, page):
         u"""Answer the boolean flag if the page is currently defined as a left page. Left page is even page number"""
-        for pn, pnPages in self.pages.items():
-            if page in pnPages:
-                return bool(pn & 0x1)
-        return False # Page not found
+        pn = self.pages.getPageNumber(page)
+        if pn is None:
+            return False # Page not found
+        return bool(pn & 0x1)
 
     def isRightPage(self, page):
         u"""Answer the boolean flag if the page is currently defined as a left page. Right page is odd page number."""
-        for pn, pnPages in self.pages.items():
-            if page in pnPages:
-                return not pn & 0x1
-        return False # Page not found
+        pn = self.pages.getPageNumber(page)
+        if pn is None:
+            return False # Page not found
+        return not pn & 0x1
 
     def newPage(self, pn=None, template=None, w=None, h=None, name=None, **kwargs):
         u"""Create a new page with size (self.w, self.h) unless defined otherwise. Add the pages in the row of pn, if defined.
@@ -476,14 +539,10 @@ class Document(object):
         return None
 
     def nextPage(self, page, nextPage=1, makeNew=True):
-        u"""Answer the next page of page. If it does not exist, create a new page."""
-        found = False
-        for pn, pnPages in sorted(self.pages.items()):
-            for index, page in enumerate(pnPages):
-                if found:
-                    return page
-                if eId == page.eId:
-                    found = True
+        u"""Answer the page that is nextPage pages after page. If it does not exist, create a new page."""
+        found = self.pages.getNextPage(page, nextPage)
+        if found is not None:
+            return found
         # Not found, create new one?
         if makeNew:
             return self.newPage()
@@ -491,33 +550,27 @@ class Document(object):
 
     def getPageNumber(self, page):
         u"""Answer a string with the page number pn, if the page can be found. If the page has index > 0:
-        then answer page format "pn-index". pn and index are incremented by 1.
-        TODO: Make a reversed table if this squential search shows to be slow in the future with large docs.
-        """
-        for pn, pnPages in sorted(self.pages.items()):
-            for index, pg in enumerate(pnPages):
-                if pg is page:
-                    if index:
-                        return '%d-%d' % (pn+1, index+1)
-                    return '%d' % (pn+1)
-        return ''
+        then answer page format "pn-index". pn and index are incremented by 1."""
+        pn = self.pages.getPageNumber(page)
+        if pn is None:
+            return ''
+        index = self.pages.getPageIndex(page)
+        if index:
+            return '%d-%d' % (pn+1, index+1)
+        return '%d' % (pn+1)
 
     def getFirstPage(self):
         u"""Answer the list of pages with the lowest sorted page.y. Answer empty list if there are no pages."""
-        for pn, pnPages in sorted(self.pages.items()):
-            for index, page in enumerate(pnPages):
-                return page
-        return None
+        return self.pages.getFirstPage()
 
     def getLastPage(self):
-        u"""Answer last page with the highest sorted page.y. Answer empty list if there are no pages."""
-        pn = sorted(self.pages.keys())[-1]
-        return self.pages[pn][-1]
+        u"""Answer last page with the highest sorted page.y. Answer None if there are no pages."""
+        return self.pages.getLastPage()
 
     def getSortedPages(self, pageSelection=None):
         u"""Answer the dynamic list of pages, sorted by y, x and index."""
         pages = [] # List of (pn, pnPages) tuples of pages with the same page number.
-        for pn, pnPages in sorted(self.pages.items()):
+        for pn, pnPages in self.pages.items(): # Already sorted by page number.
             if pageSelection is not None and not pn in pageSelection:
                 continue
             pages.append((pn, pnPages))
@@ -538,12 +591,29 @@ class Document(object):
                 d = max(page.d, d)
             return w, h, d
 
-    def solve(self, score=None):
-        u"""Evaluate the content of all pages to return the total sum of conditions solving."""
-        score = Score()
-        for pn, pnPages in sorted(self.pages.items()):
-            for page in pnPages: # List of pages with identical pn, step through the pages.
-                page.solve(score)
+    def solve(self, score=None, profiler=None, processes=None):
+        u"""Evaluate the content of all pages to return the total sum of conditions solving.
+        Statistics of the solving are in self.solver.getStats( ). If profiler is defined (a
+        pagebot.conditions.profiler.SolveProfiler instance), then it records the time and fails
+        of all solved conditions.
+        If processes is defined or self.PARALLEL_SOLVE is True, then pages without text flows are
+        solved by a pool of processes (default is one per processor), see pagebot.conditions.parallel.
+        Profiling is always done in the main process."""
+        if score is None:
+            score = Score()
+        if profiler is not None:
+            score.profiler = profiler
+            profiler.start()
+        elif processes > 1 or (processes is None and self.PARALLEL_SOLVE):
+            return ParallelSolver(self, processes).solve(score)
+        if self.INCREMENTAL_SOLVE:
+            self.solver.solve(score)
+        else:
+            for pn, pnPages in self.pages.items():
+                for page in pnPages: # List of pages with identical pn, step through the pages.
+                    page.solve(score)
+        if profiler is not None:
+            profiler.stop()
         return score
 
     #   V I E W S
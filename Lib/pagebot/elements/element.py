@@ -16,10 +16,15 @@ from __future__ import division
 import weakref
 import copy
 
-from drawBot import rect, oval, line, newPath, moveTo, lineTo, lineDash, drawPath, \
-    save, restore, scale, textSize, fill, text, stroke, strokeWidth, shadow
+try:
+    from drawBot import rect, oval, line, newPath, moveTo, lineTo, lineDash, drawPath, \
+        save, restore, scale, textSize, fill, text, stroke, strokeWidth, shadow
+except ImportError: # Headless, elements can be composed and solved, not drawn.
+    rect = oval = line = newPath = moveTo = lineTo = lineDash = drawPath = None
+    save = restore = scale = textSize = fill = text = stroke = strokeWidth = shadow = None
 
 from pagebot.conditions.score import Score
+from pagebot.conditions.program import ConditionProgram
 from pagebot import newFS, setFillColor, setStrokeColor, setGradient, setShadow,\
     x2cx, cx2x, y2cy, cy2y, z2cz, cz2z, w2cw, cw2w, h2ch, ch2h, d2cd, cd2d
 from pagebot.toolbox.transformer import point3D, pointOffset, uniqueID, point2D
@@ -28,9 +33,15 @@ from pagebot.style import makeStyle, ORIGIN_POINT, MIDDLE, CENTER, RIGHT, TOP, B
     ONLINE, INLINE, OUTLINE
 from pagebot.toolbox.transformer import asFormatted, uniqueID
 from pagebot.toolbox.timemark import TimeMark
+from pagebot.toolbox.cascade import CascadeStyle, cascadeGenerations
+from pagebot.toolbox.spatialindex import SpatialIndex
+from pagebot.toolbox.skyline import FloatLayout
+from pagebot.toolbox.elementindex import getTreeOrder
 from pagebot.builders import BuildInfo # Container with Builder flags and data/parametets
 from pagebot.builders.webbuilder import WebBuilder
 
+_NOT_FOUND = object() # Marker for cached css values that are not defined in any ancestor style.
+
 class Element(object):
 
     # Initialize the default Element behavior flags.
@@ -42,6 +53,30 @@ class Element(object):
     isFlow = False # Value is True if self.next if defined.
     isPage = False # Set to True by Page-like elements.
     isView = False 
+
+    # Flag to cache cascaded self.css(name) values. The cache is validated by the generation
+    # counters in pagebot.toolbox.cascade. Set to False to measure the uncached cascade.
+    CSS_CACHE = True
+    # Flag to cache the absolute self.rootX, self.rootY and self.rootZ, validated by the same
+    # generation counters, as the absolute position only depends on x, y, z of self and ancestors.
+    ROOT_CACHE = True
+    # Containers with at least SPATIAL_INDEX_MIN child elements keep a spatial index of their children
+    # for point queries and float conditions. Set SPATIAL_INDEX to False to always test all siblings.
+    SPATIAL_INDEX = True
+    SPATIAL_INDEX_MIN = 32
+    # Style keys that change the (margin) box of an element through cascading values.
+    SPATIAL_INDEX_KEYS = ('ml', 'mr', 'mt', 'mb', 'xAlign', 'yAlign', 'originTop', 'minW', 'maxW', 'minH', 'maxH')
+    # Containers with at least SPATIAL_INDEX_MIN child elements keep the skylines of their children, so
+    # float conditions don't need to test all previous siblings. Set to False to use the spatial index.
+    FLOAT_LAYOUT = True
+
+    # Store the standard instance attributes in slots, instead of a dictionary per element.
+    # The __dict__ slot keeps elements open for other attributes, as set by inheriting classes
+    # and applications, but it only gets created when such an attribute is set.
+    __slots__ = ('__dict__', '__weakref__', '_style', '_cssCache', '_rootCache', '_parent', '_elements', '_eIds',
+        '_eId', '_spatialIndex', '_floatLayout', '_template', '_info', '_timeMarks', '_report', '_t', '_tm0', '_tm1', 'timeKeys', '_name', '_class_',
+        'title', 'conditions', '_conditionProgram', 'prevElement', 'nextElement', 'nextPage', 'prevPage', 'drawBefore', 'drawAfter',
+        'framePath')
     
     def __init__(self, point=None, x=0, y=0, z=0, w=DEFAULT_WIDTH, h=DEFAULT_HEIGHT, d=DEFAULT_DEPTH, 
             t=0, parent=None, name=None, class_=None, title=None, description=None, language=None,
@@ -84,7 +119,7 @@ class Element(object):
         self.framePath = framePath # Optiona frame path to draw instead of bounding box element rectangle.
 
         # Set timer of this element.
-        self.timeMarks = [TimeMark(0, self.style), TimeMark(XXXL, self.style)] # Default TimeMarks from t == 0 until infinite of time.
+        self._timeMarks = None # Default TimeMarks from t == 0 until infinite of time, created on first usage.
         self._t = 0 # Initialize self.style from t = 0
         self._tm0 = self._tm1 = None # Boundary timemarks, where self._tm0.t <= t <= self._tm1.t, with expanded styles.
         self.timeKeys = INTERPOLATING_TIME_KEYS # List of names of style entries that can interpolate in time.
@@ -98,6 +133,7 @@ class Element(object):
         self.class_ = class_ # Optional class name. Ignored if None, not to overwrite CSS of parents.
         self.title = title or name # Optional to make difference between title name, style property
         self._eId = uniqueID(self) # Direct set property with guaranteed unique persistent value. 
+        self.clearElements() # Initialize the child elements before adding self to the index of the parent document.
         self._parent = None # Preset, so it exists for checking when appending parent.
         if parent is not None:
             # Add and set weakref to parent element or None, if it is the root. Caller must add self to its elements separately.
@@ -106,7 +142,8 @@ class Element(object):
         if not conditions is None and not isinstance(conditions, (list, tuple)): # Allow singles
             conditions = [conditions]
         self.conditions = conditions # Explicitedly stored local in element, not inheriting from ancesters. Can be None.
-        self.report = [] # Area for conditions and drawing methods to report errors and warnings.
+        self._conditionProgram = None # Compiled self.conditions, made by self.getConditionProgram( )
+        self._report = None # Area for conditions and drawing methods to report errors and warnings, created on first usage.
         # Save flow reference names
         self.prevElement = prevElement # Name of the prev flow element
         self.nextElement = nextElement # Name of the next flow element
@@ -116,10 +153,48 @@ class Element(object):
         # Initialze self.elements, add template elements and values, copy elements if defined.
         self.applyTemplate(template, elements) 
         # Initialize the default Element behavior tags, in case this is a flow.
-        self.isFlow = not None in (prevElement, nextElement, nextPage)
+        if not None in (prevElement, nextElement, nextPage):
+            self.isFlow = True # Otherwise keep the class default False, without adding an attribute to self.
         # Instance to hold details flags and data to direct the builder of this element.
         # Reference directory paths for source files, as used by building Html/Css templates and self.build
-        self.info = info or BuildInfo()
+        self._info = info # If None, then a default BuildInfo is created on first usage.
+
+    def _get_info(self):
+        u"""Answer the BuildInfo of self. Most elements never get built, so only create it on first usage."""
+        if self._info is None:
+            self._info = BuildInfo()
+        return self._info
+    def _set_info(self, info):
+        self._info = info
+    info = property(_get_info, _set_info)
+
+    def _get_report(self):
+        u"""Answer the list of errors and warnings, as reported by conditions and drawing methods."""
+        if self._report is None:
+            self._report = []
+        return self._report
+    def _set_report(self, report):
+        self._report = report
+    report = property(_get_report, _set_report)
+
+    def _get_name(self):
+        return self._name
+    def _set_name(self, name):
+        u"""Set the name of self. Update the element index of the document, if self is in there."""
+        index = self._getElementIndex()
+        if index is not None:
+            index.rename(self, self._name, name)
+        self._name = name
+    name = property(_get_name, _set_name)
+
+    def _get_class_(self):
+        return self._class_
+    def _set_class_(self, class_):
+        index = self._getElementIndex()
+        if index is not None:
+            index.reclass(self, self._class_, class_)
+        self._class_ = class_
+    class_ = property(_get_class_, _set_class_)
 
     def __repr__(self):
         if self.title:
@@ -172,7 +247,11 @@ class Element(object):
             # Copy condition list. Does not have to be deepCopy, condition instances are multi-purpose.
             self.conditions = copy.copy(template.conditions)
             for e in template.elements:
-                self.appendElement(e.deepCopy())
+                child = e.deepCopy()
+                # Flow links of the template refer to names on the same page, so they are kept.
+                child.prevElement = e.prevElement
+                child.nextElement = e.nextElement
+                self.appendElement(child)
     template = property(_get_template, _set_template)
 
     #   E L E M E N T S
@@ -185,6 +264,9 @@ class Element(object):
     def __setitem__(self, eId, e):
         if not e in self.elements:
             self.elements.append(e)
+            index = self._getElementIndex()
+            if index is not None:
+                index.addTree(e)
         self._eIds[eId] = e
 
     def _get_eId(self):
@@ -226,12 +308,45 @@ class Element(object):
             return self
         return self.parent.getElementPage()
 
+    def _getElementIndex(self):
+        u"""Answer the ElementIndex of the document, if self is part of the page tree of the document.
+        Answer None if self is not placed in a document, or if it is part of a template."""
+        if getattr(self, '_parent', None) is None: # Not initialized or no parent.
+            return None
+        root = self
+        parent = self.parent
+        while parent is not None and isinstance(parent, Element):
+            root = parent
+            parent = parent.parent
+        index = getattr(parent, 'elementIndex', None) # Parent of the root can be a document.
+        if index is not None and root in index:
+            return index
+        return None
+
     def getElementByName(self, name):
-        u"""Answer the first element in the offspring list that fits the name. Answer None if it cannot be found"""
+        u"""Answer the first element in the offspring list that fits the name. Answer None if it cannot be found.
+        If self is placed in a document, then use the element index of the document."""
+        index = self._getElementIndex()
+        if index is not None:
+            found = []
+            for e in index.findByName(name):
+                ancestor = e
+                while ancestor is not None and not ancestor is self: # Only elements in the offspring of self.
+                    ancestor = ancestor.parent if isinstance(ancestor, Element) else None
+                if ancestor is self:
+                    found.append(e)
+            if len(found) > 1: # Multiple with the same name, answer the first in depth-first order.
+                found = getTreeOrder(found)
+            if found:
+                return found[0]
+            return None
+        return self._getElementByName(name)
+
+    def _getElementByName(self, name):
         if self.name == name:
             return self
         for e in self.elements:
-            found = e.getElementByName(name) # Don't search on next page yet.
+            found = e._getElementByName(name) # Don't search on next page yet.
             if found is not None:
                 return found
         return None
@@ -239,18 +354,38 @@ class Element(object):
     def clearElements(self):
         u"""Properly initializes self._elements and self._eIds. 
         Any existing elements get their parent weakrefs become None and will garbage collect."""
+        index = self._getElementIndex()
+        if index is not None:
+            for e in self._elements:
+                index.removeTree(e)
         self._elements = [] 
         self._eIds = {}
+        self._spatialIndex = None
+        self._floatLayout = None
+
+    def __copy__(self):
+        u"""Answer a shallow copy of self, with the same slot values and attributes of inheriting classes."""
+        e = self.__class__.__new__(self.__class__)
+        for name in Element.__slots__:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            value = getattr(self, name, _NOT_FOUND)
+            if value is not _NOT_FOUND:
+                setattr(e, name, value)
+        if self.__dict__:
+            e.__dict__.update(self.__dict__)
+        return e
 
     def deepCopy(self):
         u"""Answer a copy of self, where the "unique" fields are set to default. Also perform a deep copy
         on all child elements."""
         e = copy.copy(self)
+        e._parent = None # Not a child of the parent of self, until it gets appended.
         e._eId = uniqueID(e) # Guaranteed unique Id for every element.
         e.nextElement = None
         e.prevElement = None
-        e.style = copy.copy(self.style)
-        e.clearElements()
+        e.clearElements() # Clear first, so setting the style does not invalidate the caches of shared children.
+        e.style = self.style.copy() # Shallow copy of the items, the values are shared.
         for child in self.elements:
             e.appendElement(child.deepCopy())
         return e
@@ -261,7 +396,13 @@ class Element(object):
         u"""Replace the element, if there is already one at index. Otherwise append it to self.elements
         and answer the index number that it got."""
         if index < len(self.elements):
+            elementIndex = self._getElementIndex()
+            if elementIndex is not None:
+                elementIndex.removeTree(self.elements[index])
+                elementIndex.addTree(e)
             self.elements[index] = e
+            self._spatialIndex = None # Order of the elements changed, build a new index on next query.
+            self._floatLayout = None
             if self.eId:
                 self._eIds[e.eId] = e
             return index
@@ -276,6 +417,11 @@ class Element(object):
             eParent.removeElement(e) # Remove from current parent, if there is one.
         self._elements.append(e) # Possibly add to self again, will move it to the top of the element stack.
         e.setParent(self) # Set parent of element without calling this method again.
+        index = self._getElementIndex()
+        if index is not None:
+            index.addTree(e)
+        if self._spatialIndex is not None:
+            self._spatialIndex.add(e)
         if e.eId: # Store the element by unique element id, if it is defined.
             self._eIds[e.eId] = e
         return len(self._elements)-1 # Answer the element index for e.
@@ -283,7 +429,13 @@ class Element(object):
     def removeElement(self, e):
         u"""If the element is placed in self, then remove it. Don't touch the position."""
         assert e.parent is self
+        index = self._getElementIndex()
+        if index is not None:
+            index.removeTree(e)
         e.setParent(None) # Unlink the parent reference of e
+        if self._spatialIndex is not None:
+            self._spatialIndex.remove(e)
+        self._floatLayout = None # Orders of the elements after e changed.
         if e.eId in self._eIds:
             del self._eIds[e.eId]
         if e in self._elements:
@@ -303,12 +455,79 @@ class Element(object):
         value in the element position. Where None in the element position with not fit any xyz of the point."""
         elements = []
         px, py, pz = point3D(point) 
-        for e in self.elements:
+        candidates = self.elements
+        if px is not None and py is not None:
+            index = self._getSpatialIndex()
+            if index is not None: # Only test the elements with a box that includes the point.
+                candidates = sorted(index.query(px, py, px, py), key=index.getOrder)
+        for e in candidates:
             ex, ey, ez = point3D(e.point)
             if (ex == px or px is None) and (ey == py or py is None) and (ez == pz or pz is None):
                 elements.append(e)
         return elements
 
+    def _getSpatialIndex(self):
+        u"""Answer the SpatialIndex of the child elements. Answer None if self.SPATIAL_INDEX is False
+        or if there are less than self.SPATIAL_INDEX_MIN elements. Build a new index if the
+        elements list was changed directly or if a cascading value changed the boxes of elements."""
+        elements = self._elements
+        if not self.SPATIAL_INDEX or len(elements) < self.SPATIAL_INDEX_MIN:
+            return None
+        keys = cascadeGenerations.keys
+        generations = [cascadeGenerations.tree]
+        for name in self.SPATIAL_INDEX_KEYS:
+            generations.append(keys.get(name, 0))
+        index = self._spatialIndex
+        if index is None or len(index) != len(elements) or index.generations != generations:
+            # Cells of about twice the average element size.
+            size = sum([max(e.mw, e.mh) for e in elements]) / len(elements)
+            index = SpatialIndex(Element._getSpatialBox, cellSize=2*size)
+            for e in elements:
+                index.add(e)
+            index.generations = generations
+            self._spatialIndex = index
+        return index
+
+    def _getFloatLayout(self):
+        u"""Answer the FloatLayout with the skylines of the child elements. Answer None if
+        self.FLOAT_LAYOUT is False or if there are less than self.SPATIAL_INDEX_MIN elements. Make a
+        new layout if the elements list or a cascading value that changes the boxes of elements changed."""
+        elements = self._elements
+        if not self.FLOAT_LAYOUT or len(elements) < self.SPATIAL_INDEX_MIN:
+            return None
+        keys = cascadeGenerations.keys
+        generations = [cascadeGenerations.tree, len(elements), self.w, self.h]
+        for name in self.SPATIAL_INDEX_KEYS:
+            generations.append(keys.get(name, 0))
+        layout = self._floatLayout
+        if layout is None or layout.generations != generations:
+            layout = FloatLayout(self, Element._watchGeometry)
+            layout.generations = generations
+            self._floatLayout = layout
+        if not layout.valid:
+            return None
+        return layout
+
+    def _watchGeometry(self):
+        u"""Register self in the style, so changes in position and size are reported to the spatial index
+        and the float layout of the parent by self._geometryChanged( )."""
+        style = self.style
+        if style.element is None:
+            style.element = weakref.ref(self)
+
+    def _getSpatialBox(self):
+        u"""Answer the (x1, y1, x2, y2) box of self for the spatial index of the parent, including
+        margins and the position of self. Register self in the style, so changes in position and
+        size mark self in the index."""
+        self._watchGeometry()
+        x = self.x
+        y = self.y
+        left = self.mLeft
+        right = self.mRight
+        top = self.mTop
+        bottom = self.mBottom
+        return min(x, left, right), min(y, top, bottom), max(x, left, right), max(y, top, bottom)
+
     def getElementsPosition(self):
         u"""Answer the dictionary of elements that have eIds and their positions."""
         elements = {}
@@ -422,10 +641,71 @@ class Element(object):
 
     # Answer the cascaded style value, looking up the chain of ancestors, until style value is defined.
 
+    def _get_style(self):
+        return self._style
+    def _set_style(self, style):
+        u"""Set the local style dictionary. It is stored as CascadeStyle, so changes in its values
+        invalidate the cached css values of self and all child elements."""
+        if not isinstance(style, CascadeStyle):
+            style = CascadeStyle(style or {})
+        style.element = None # The parent index registers self again on reading the new box.
+        self._style = style
+        self._invalidateCascade()
+        self._geometryChanged()
+    style = property(_get_style, _set_style)
+
+    def _invalidateCascade(self):
+        u"""Clear the cached css values and root positions of self. If self has child elements, their
+        cached values may depend on self too, so then increment the tree generation to invalidate all caches."""
+        self._cssCache = None # Dictionaries are created on first cached value.
+        self._rootCache = None
+        if getattr(self, '_elements', None):
+            cascadeGenerations.bumpTree()
+
+    def _geometryChanged(self):
+        u"""The position or size of self changed. Mark self in the spatial index of the parent, if there is one."""
+        if getattr(self, '_parent', None) is None: # Not initialized yet or no parent.
+            return
+        index = getattr(self.parent, '_spatialIndex', None) # Parent can be a Document, without index.
+        if index is not None:
+            index.markDirty(self)
+        layout = getattr(self.parent, '_floatLayout', None)
+        if layout is not None:
+            layout.markChanged(self)
+
+    def _contentChanged(self):
+        u"""The content (e.g. the text) of self changed. Mark self in the solver of the document, so
+        the conditions of self and the elements that depend on it are solved again."""
+        if getattr(self, '_parent', None) is None: # Not initialized yet or no parent.
+            return
+        solver = getattr(self.doc, 'solver', None)
+        if solver is not None:
+            solver.markChanged(self)
+
     def css(self, name, default=None):
         u"""In case we are looking for a plain css value, cascading from the main ancestor styles
         of self, then follow the parent links until document or root, if self does not contain
-        the requested value."""
+        the requested value. Cascaded values are cached, as long as the generations of the
+        style key and the parent tree in pagebot.toolbox.cascade.cascadeGenerations don't change."""
+        if not self.CSS_CACHE:
+            return self._css(name, default)
+        keyGeneration = cascadeGenerations.keys.get(name, 0)
+        if self._cssCache is None:
+            self._cssCache = {}
+        cached = self._cssCache.get(name)
+        if cached is not None and cached[1] == keyGeneration and cached[2] == cascadeGenerations.tree:
+            cascadeGenerations.hits += 1
+            value = cached[0]
+        else:
+            cascadeGenerations.misses += 1
+            value = self._css(name, _NOT_FOUND)
+            self._cssCache[name] = value, keyGeneration, cascadeGenerations.tree
+        if value is _NOT_FOUND:
+            return default
+        return value
+
+    def _css(self, name, default=None):
+        u"""Answer the uncached cascaded value, following the parent links."""
         if name in self.style:
             return self.style[name]
         if self.parent is not None:
@@ -468,6 +748,7 @@ class Element(object):
         if parent is not None:
             parent = weakref.ref(parent)
         self._parent = parent # Can be None if self needs to be unlinked from a parent tree. E.g. when moving it.
+        self._invalidateCascade() # Cascaded css values now come from other ancestors.
 
     def _get_parent(self):
         u"""Answer the parent of the element, if it exists, by weakref reference. Answer None of there
@@ -481,7 +762,7 @@ class Element(object):
             #assert not self in parent.ancestors, '[%s.%s] Cannot set one of the children "%s" as parent.' % (self.__class__.__name__, self.name, parent)
             parent.appendElement(self)
         else:
-            self._parent = None
+            self.setParent(None)
     parent = property(_get_parent, _set_parent)
 
     def _get_siblings(self):
@@ -697,6 +978,16 @@ class Element(object):
             # If not initialized or t outside cached time span, then create new expanded styles.
             self._tm0, self._tm1 = self.getExpandedTimeMarks(t)
 
+    def _get_timeMarks(self):
+        u"""Answer the sorted list of TimeMarks. Create the default TimeMarks from t == 0 until
+        infinite of time on first usage."""
+        if self._timeMarks is None:
+            self._timeMarks = [TimeMark(0, self.style), TimeMark(XXXL, self.style)]
+        return self._timeMarks
+    def _set_timeMarks(self, timeMarks):
+        self._timeMarks = timeMarks
+    timeMarks = property(_get_timeMarks, _set_timeMarks)
+
     def appendTimeMark(self, tm):
         assert isinstance(tm, TimeMark)
         self.timeMarks.append(tm)
@@ -1148,27 +1439,49 @@ class Element(object):
 
     # Absolute positions
 
-    def _get_rootX(self): # Answer the root value of local self.x, from whole tree of ancestors.
+    def _getRootValue(self, name):
+        u"""Answer the absolute value of local self.style[name] (one of 'x', 'y', 'z'), adding the
+        root value of the parent. The result is cached, as long as the generation of the name
+        (incremented on any change of that coordinate in any element) and the tree generation
+        (incremented on reparenting of containers) in cascadeGenerations are unchanged."""
+        if not self.ROOT_CACHE:
+            return self._getUncachedRootValue(name)
+        keyGeneration = cascadeGenerations.keys.get(name, 0)
+        if self._rootCache is None:
+            self._rootCache = {}
+        cached = self._rootCache.get(name)
+        if cached is not None and cached[1] == keyGeneration and cached[2] == cascadeGenerations.tree:
+            return cached[0]
+        value = self._getUncachedRootValue(name)
+        self._rootCache[name] = value, keyGeneration, cascadeGenerations.tree
+        return value
+
+    def _getUncachedRootValue(self, name):
         parent = self.parent
-        if parent is not None:
-            return self.x + parent.rootX # Add relative self to parents position.
-        return self.x
+        if parent is not None and not self.isPage: # Pages are the root of positions, the document has none.
+            return self.style[name] + parent._getRootValue(name) # Add relative self to parents position.
+        return self.style[name]
+
+    def _get_rootX(self): # Answer the root value of local self.x, from whole tree of ancestors.
+        return self._getRootValue('x')
     rootX = property(_get_rootX)
 
     def _get_rootY(self): # Answer the absolute value of local self.y, from whole tree of ancestors.
-        parent = self.parent
-        if parent is not None:
-            return self.y + parent.rootY # Add relative self to parents position.
-        return self.y
+        return self._getRootValue('y')
     rootY = property(_get_rootY)
 
     def _get_rootZ(self): # Answer the absolute value of local self.z, from whole tree of ancestors.
-        parent = self.parent
-        if parent is not None:
-            return self.z + parent.rootZ # Add relative self to parents position.
-        return self.z
+        return self._getRootValue('z')
     rootZ = property(_get_rootZ)
 
+    def _get_rootPoint(self): # Answer the absolute 2D position of self.
+        return self.rootX, self.rootY
+    rootPoint = property(_get_rootPoint)
+
+    def _get_rootPoint3D(self): # Answer the absolute 3D position of self.
+        return self.rootX, self.rootY, self.rootZ
+    rootPoint3D = property(_get_rootPoint3D)
+
     # (w, h, d) size of the element.
 
     def _get_w(self): # Width
@@ -1709,18 +2022,61 @@ class Element(object):
         self.style['scaleZ'] = scaleZ # Set on local style, shielding parent self.css value.
     scaleZ = property(_get_scaleZ, _set_scaleZ)
 
+    def _getFloatSiblings(self, previousOnly, vertical):
+        u"""Answer the sibling elements that can block floating self. If previousOnly is True, then only answer
+        the siblings before self in the list. If the parent has a spatial index, then only answer the siblings
+        that overlap the vertical projection of self (if vertical is True) or the horizontal projection."""
+        parent = self.parent
+        index = parent._getSpatialIndex()
+        if index is None or not self in index:
+            siblings = []
+            for e in parent.elements:
+                if previousOnly and e is self: # Only look at siblings that are previous in the list.
+                    break
+                siblings.append(e)
+            return siblings
+        if vertical:
+            left = self.mLeft
+            right = self.mRight
+            siblings = index.queryX(min(left, right), max(left, right))
+        else:
+            top = self.mTop
+            bottom = self.mBottom
+            siblings = index.queryY(min(top, bottom), max(top, bottom))
+        if previousOnly:
+            order = index.getOrder(self)
+            siblings = [e for e in siblings if index.getOrder(e) < order]
+        return siblings
+
+    def _getSiblingsFloatLayout(self, previousOnly, tolerance):
+        u"""Answer the FloatLayout of the parent, if it can answer the float sides of self. Otherwise
+        answer None, then the siblings are tested one by one."""
+        if not previousOnly or tolerance:
+            return None
+        getFloatLayout = getattr(self.parent, '_getFloatLayout', None) # Parent can be a Document.
+        if getFloatLayout is None:
+            return None
+        layout = getFloatLayout()
+        if layout is None or layout.getOrder(self) is None:
+            return None
+        return layout
+
     def getFloatTopSide(self, previousOnly=True, tolerance=0):
         u"""Answer the max y that can float to top, without overlapping previous sibling elements.
         This means we are just looking at the vertical projection between (self.left, self.right).
         Note that the y may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available spave, includes the margins of the elements."""
+        layout = self._getSiblingsFloatLayout(previousOnly, tolerance)
+        if layout is not None:
+            left, right = sorted((self.mLeft, self.mRight))
+            if self.originTop:
+                return max(0, layout.getMax(self, 'top', False, left, right))
+            return min(self.parent.h, -layout.getMax(self, 'top', True, left, right))
         if self.originTop:
             y = 0
         else:
             y = self.parent.h
-        for e in self.parent.elements: 
-            if previousOnly and e is self: # Only look at siblings that are previous in the list.
-                break 
+        for e in self._getFloatSiblings(previousOnly, True):
             if abs(e.z - self.z) > tolerance or e.mRight < self.mLeft or self.mRight < e.mLeft:
                 continue # Not equal z-layer or not in window of vertical projection.
             if self.originTop:
@@ -1734,13 +2090,17 @@ class Element(object):
         This means we are just looking at the vertical projection of (self.left, self.right).
         Note that the y may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available spave, includes the margins of the elements."""
+        layout = self._getSiblingsFloatLayout(previousOnly, tolerance)
+        if layout is not None:
+            left, right = sorted((self.mLeft, self.mRight))
+            if self.originTop:
+                return min(self.parent.h, -layout.getMax(self, 'bottom', True, left, right))
+            return max(0, layout.getMax(self, 'bottom', False, left, right))
         if self.originTop:
             y = self.parent.h
         else:
             y = 0
-        for e in self.parent.elements: # All elements that share self.parent, except self.
-            if previousOnly and e is self: # Only look at siblings that are previous in the list.
-                break 
+        for e in self._getFloatSiblings(previousOnly, True):
             if abs(e.z - self.z) > tolerance or e.mRight < self.mLeft or self.mRight < e.mLeft:
                 continue # Not equal z-layer or not in window of vertical projection.
             if self.originTop:
@@ -1754,10 +2114,13 @@ class Element(object):
         This means we are just looking at the horizontal projection of (self.top, self.bottom).
         Note that the x may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available spave, includes the margins of the elements."""
+        layout = self._getSiblingsFloatLayout(previousOnly, tolerance)
+        if layout is not None:
+            top, bottom = sorted((self.mTop, self.mBottom))
+            if top < bottom: # Siblings that only touch self don't overlap, this needs a height.
+                return max(0, layout.getMax(self, 'left', False, top, bottom, closed=False))
         x = 0
-        for e in self.parent.elements: # All elements that share self.parent, except self.
-            if previousOnly and e is self: # Only look at siblings that are previous in the list.
-                break 
+        for e in self._getFloatSiblings(previousOnly, False):
             if abs(e.z - self.z) > tolerance:
                 continue # Not equal z-layer
             if self.originTop: # not in window of horizontal projection.
@@ -1774,10 +2137,11 @@ class Element(object):
         This means we are just looking at the vertical projection of (self.left, self.right).
         Note that the y may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available spave, includes the margins of the elements."""
+        layout = self._getSiblingsFloatLayout(previousOnly, tolerance)
+        if layout is not None and self.originTop and self.mTop <= self.mBottom: # Compared as top-down projection.
+            return min(self.parent.w, -layout.getMax(self, 'right', True, self.mTop, self.mBottom))
         x = self.parent.w
-        for e in self.parent.elements: # All elements that share self.parent, except self.
-            if previousOnly and e is self: # Only look at siblings that are previous in the list.
-                break 
+        for e in self._getFloatSiblings(previousOnly, False):
             if abs(e.z - self.z) > tolerance or e.mBottom < self.mTop or self.mBottom < e.mTop:
                 continue # Not equal z-layer or not in window of horizontal projection.
             x = min(e.mLeft, x)
@@ -2092,13 +2456,20 @@ class Element(object):
 
     #   V A L I D A T I O N
 
+    def getConditionProgram(self):
+        u"""Answer the ConditionProgram of self.conditions. It is made once and made again if
+        self.conditions is replaced or changes in length."""
+        program = self._conditionProgram
+        if program is None or not program.isValid(self.conditions):
+            program = self._conditionProgram = ConditionProgram(self.conditions)
+        return program
+
     def evaluate(self, score=None):
         u"""Evaluate the content of element e with the total sum of conditions."""
         if score is None:
             score = Score()
         if self.conditions: # Can be None or empty
-            for condition in self.conditions: # Skip in case there are no conditions in the style.
-             condition.evaluate(self, score)
+            self.getConditionProgram().evaluate(self, score)
         for e in self.elements: # Also works if showing element is not a container.
             if e.show:
                 e.evaluate(score)
@@ -2109,8 +2480,7 @@ class Element(object):
         if score is None:
             score = Score()
         if self.conditions: # Can be None or empty
-            for condition in self.conditions: # Skip in case there are no conditions in the style.
-                condition.solve(self, score)
+            self.getConditionProgram().solve(self, score)
         for e in self.elements: # Also works if showing element is not a container.
             if e.show:
                 e.solve(score)
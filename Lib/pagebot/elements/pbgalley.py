@@ -11,7 +11,10 @@
 #
 #     galley.py
 #
-from drawBot import rect
+try:
+    from drawBot import rect
+except ImportError:
+    rect = None
 
 from pagebot.style import NO_COLOR, makeStyle
 from pagebot.elements.element import Element
@@ -46,6 +49,12 @@ class Galley(Element):
         else:
             self.lastTextBox.appendString(fs)
 
+    def appendText(self, text, attributes):
+        u"""Add the plain text with interned attributes to the last text box. Create a new textbox if not found."""
+        if self.lastTextBox is None:
+            self.newTextBox(None)
+        self.lastTextBox.appendText(text, attributes)
+
     def appendHtml(self, html):
         u"""Add the utf-8 html to the laat text box. Create a new textbox if not found."""
         if self.lastTextBox is None:
@@ -109,6 +118,8 @@ class Galley(Element):
         Append the element to *self* (also setting self.lastTextBox) and answer the element."""
         tb = self.TEXTBOX_CLASS('', parent=self, html=html)
         self.appendElement(tb) # Will set the self.lastTextBox by local self.appendElement(tb)
+        if fs:
+            tb.appendString(fs)
         return tb
 
     def newRuler(self, style):
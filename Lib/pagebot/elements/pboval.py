@@ -12,7 +12,10 @@
 #     oval.py
 #
 from __future__ import division # Make integer division result in float.
-from drawBot import oval
+try:
+    from drawBot import oval
+except ImportError:
+    oval = None
 
 from pagebot import setStrokeColor, setFillColor
 from pagebot.style import NO_COLOR
@@ -127,6 +127,7 @@ class Template(Page):
         if parent is not None:
             parent = weakref.ref(parent)
         self._parent = parent
+        self._invalidateCascade() # Cascaded css values now come from the new parent.
     parent = property(_get_parent, _set_parent)
 
  
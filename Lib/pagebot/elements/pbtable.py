@@ -12,10 +12,13 @@
 #     pbtextbox.py
 #
 import re
-import CoreText
-import Quartz
-
-from drawBot import textOverflow, hyphenation, textBox, rect, textSize, FormattedString, line
+try:
+    import CoreText
+    import Quartz
+    from drawBot import textOverflow, hyphenation, textBox, rect, textSize, FormattedString, line
+except ImportError:
+    CoreText = Quartz = textOverflow = hyphenation = textBox = rect = textSize = None
+    FormattedString = line = None
 
 from pagebot.style import LEFT, RIGHT, CENTER, NO_COLOR, MIN_WIDTH, MIN_HEIGHT, makeStyle, MIDDLE
 from pagebot.elements.element import Element
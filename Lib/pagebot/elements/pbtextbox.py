@@ -12,17 +12,23 @@
 #     textbox.py
 #
 import re
-import CoreText
-import Quartz
-
-from drawBot import textOverflow, hyphenation, textBox, text, rect, textSize, FormattedString, line, fill, \
-    stroke, strokeWidth, save, restore
-
-from pagebot import newFS, setStrokeColor, setFillColor, setGradient, setShadow
+try:
+    import CoreText
+    import Quartz
+    from drawBot import textOverflow, hyphenation, textBox, text, rect, textSize, FormattedString, line, fill, \
+        stroke, strokeWidth, save, restore
+except ImportError:
+    CoreText = Quartz = textOverflow = hyphenation = textBox = text = rect = textSize = None
+    FormattedString = line = fill = stroke = strokeWidth = save = restore = None
+
+from pagebot import newFS, getCachedFSAttributes, setStrokeColor, setFillColor, setGradient, setShadow
 from pagebot.style import LEFT, RIGHT, CENTER, NO_COLOR, MIN_WIDTH, MIN_HEIGHT, makeStyle, MIDDLE, BOTTOM, DEFAULT_WIDTH, DEFAULT_HEIGHT
 from pagebot.elements.element import Element
 from pagebot.toolbox.transformer import pointOffset
 from pagebot.fonttoolbox.objects.glyph import Glyph
+from pagebot.fonttoolbox.textlayout import LayoutRun
+from pagebot.toolbox.textbuffer import TextBuffer, StyledRun
+from pagebot.toolbox.textflow import TextFlow
 
 class FoundPattern(object):
     def __init__(self, s, x, ix, y=None, w=None, h=None, line=None, run=None):
@@ -311,6 +317,10 @@ class TextBox(Element):
     isTextBox = True
 
     TEXT_MIN_WIDTH = 24 # Absolute minumum with of a text box.
+    # Optional headless TextLayout instance (pagebot.fonttoolbox.textlayout) that measures and breaks
+    # the text with fontTools, instead of CoreText and DrawBot. The answered text lines have the
+    # same attributes. Set to a TextLayout with the registered font paths to use it.
+    TEXT_LAYOUT = None
 
     def __init__(self, fs, html=None, minW=None, w=DEFAULT_WIDTH, h=None, showBaselines=False, **kwargs):
         Element.__init__(self,  **kwargs)
@@ -323,8 +333,10 @@ class TextBox(Element):
         self._textLines = self._baseLines = None # Force initiaize upon first usage.
         self.size = w, h
         if isinstance(fs, basestring):
-            fs = newFS(fs, self)
-        self.fs = fs # Keep as plain string, in case parent is not set yet.
+            self.setText(fs)
+        else:
+            self.fs = fs
+        self._textFlow = None # TextFlow that placed text in self, made by self.overflow2Next()
         self.html = html or '' # Parallel storage of html content.
         self.showBaselines = showBaselines # Force showing of baseline if view.showBaselines is False.
 
@@ -339,7 +351,7 @@ class TextBox(Element):
         u"""Answer the height of the textBox. If self.style['elasticH'] is set, then answer the 
         vertical space that the text needs. This overwrites the setting of self._h."""
         if self.style['h'] is None: # Elastic height
-            h = self.getTextSize(self.w)[1] + self.pt + self.pb # Add paddings
+            h = self.getTextSize(w=self.w)[1] + self.pt + self.pb # Add paddings
         else:
             h = self.style['h']
         return min(self.maxH, max(self.minH, h)) # Should not be 0 or None
@@ -363,8 +375,8 @@ class TextBox(Element):
         else: # No naming, show unique self.eId:
             name = ':'+self.eId
 
-        if self.fs:
-            fs = ' FS(%d)' % len(self.fs)
+        if self._buffer:
+            fs = ' FS(%d)' % len(self._buffer)
         else:
             fs = ''
 
@@ -377,19 +389,52 @@ class TextBox(Element):
     # Formatted string
 
     def _get_fs(self):
-        return self._fs
+        u"""Answer the FormattedString of the text buffer. It is made from the appended pieces
+        when it is asked for, and cached until the next change."""
+        return self._buffer.getFS()
     def _set_fs(self, fs):
-        self._fs = fs
+        if isinstance(fs, basestring): # Plain string is formatted by the style of self.
+            self._buffer = TextBuffer(fs, getCachedFSAttributes(self))
+        else:
+            self._buffer = TextBuffer(fs)
         self._textLines = None # Force reset when called.
+        self._contentChanged()
     fs = property(_get_fs, _set_fs)
+
+    def _get_textBuffer(self):
+        u"""Answer the TextBuffer with the pieces of styled text of self."""
+        return self._buffer
+    def _set_textBuffer(self, buffer):
+        self._buffer = buffer
+        self._textLines = None # Force reset when called.
+    textBuffer = property(_get_textBuffer, _set_textBuffer)
+
+    def _get_html(self):
+        htmlParts = self._htmlParts
+        if not htmlParts:
+            return ''
+        if len(htmlParts) > 1: # Join the parts only when the html is asked for.
+            htmlParts[:] = [''.join(htmlParts)]
+        return htmlParts[0]
+    def _set_html(self, html):
+        self._htmlParts = [html or '']
+    html = property(_get_html, _set_html)
   
     def setText(self, s):
-        u"""Set the formatted string to s, using self.style."""
-        self.fs = newFS(s, self)
+        u"""Set the formatted string to s, using self.style. Without DrawBot, s is set as a run with the
+        attributes of self, to be measured by the headless self.TEXT_LAYOUT."""
+        if FormattedString is None:
+            buffer = TextBuffer()
+            if s:
+                buffer.appendText(s, getCachedFSAttributes(self))
+            self.textBuffer = buffer
+            self._contentChanged()
+        else:
+            self.fs = newFS(s, self)
 
     def _get_text(self):
         u"""Answer the plain text of the current self.fs"""
-        return u'%s' % self.fs
+        return self._buffer.getText()
     text = property(_get_text)
     
     def appendString(self, fs):
@@ -398,18 +443,28 @@ class TextBox(Element):
         Don't calculate the overflow here, as this is slow/expensive operation.
         Also we don't want to calcualte the textLines/runs for every string appended,
         as we don't know how much more the caller will add. self._textLines is set to None
-        to force recalculation as soon as self.textLines is called again."""
+        to force recalculation as soon as self.textLines is called again.
+        The string is added to the text buffer, without copying the existing text. The complete
+        FormattedString is only made if self.fs is asked for."""
         assert fs is not None
         self._textLines = None # Reset to force call to self.initializeTextLines()
-        if self.fs is None:
-            self.fs = fs
-        else:
-            self.fs += fs
-        return self.fs # Answer the complete FormattedString as convenience for the caller.
+        buffer = self._buffer
+        if not buffer and buffer.attributes is None and isinstance(fs, basestring):
+            buffer.attributes = getCachedFSAttributes(self) # Plain string is formatted by the style of self.
+        buffer.append(fs)
+        self._contentChanged()
+
+    def appendText(self, text, attributes):
+        u"""Append plain text with the interned attributes, as answered by pagebot.getFSAttributes( ).
+        The text is only converted into a FormattedString if self.fs is asked for."""
+        self._textLines = None # Reset to force call to self.initializeTextLines()
+        self._buffer.appendText(text, attributes)
+        self._contentChanged()
 
     def appendHtml(self, html):
         u"""Add parellel utf-8 html string to the self content."""
-        self.html += html or ''
+        if html:
+            self._htmlParts.append(html)
 
     def appendMarker(self, markerId, arg=None):
         marker = getMarker(markerId, arg=arg)
@@ -428,10 +483,59 @@ class TextBox(Element):
         return self._baseLines
     baseLines = property(_get_baseLines)
 
+    def getLayoutRuns(self, fs=None):
+        u"""Answer the list of LayoutRun instances for fs (default is self.fs), as input for self.TEXT_LAYOUT.
+        If fs has no attributed string (e.g. it is a plain string), then answer one run with the style of self.
+        Styled runs of the text buffer are used directly, without making a FormattedString."""
+        if fs is None:
+            runs = []
+            for piece in self._buffer.pieces:
+                if not isinstance(piece, StyledRun):
+                    runs += self._getFSLayoutRuns(piece)
+                elif piece.attributes is None:
+                    runs += self._getFSLayoutRuns(piece.text)
+                else:
+                    attributes = piece.attributes
+                    runs.append(LayoutRun(piece.text, attributes['font'], attributes['fontSize'],
+                        lineHeight=attributes['lineHeight'], tracking=attributes['tracking'] or 0))
+            return runs
+        return self._getFSLayoutRuns(fs)
+
+    def _getFSLayoutRuns(self, fs):
+        runs = []
+        attrString = None
+        if hasattr(fs, 'getNSObject'):
+            attrString = fs.getNSObject()
+        if attrString is not None and hasattr(attrString, 'attributesAtIndex_effectiveRange_'):
+            s = attrString.string()
+            index = 0
+            while index < attrString.length():
+                attrs, (location, length) = attrString.attributesAtIndex_effectiveRange_(index, None)
+                font = attrs.get('NSFont')
+                paragraphStyle = attrs.get('NSParagraphStyle')
+                lineHeight = None
+                if paragraphStyle is not None and paragraphStyle.minimumLineHeight():
+                    lineHeight = paragraphStyle.minimumLineHeight()
+                runs.append(LayoutRun(s[location:location+length], font.fontName(), font.pointSize(),
+                    lineHeight=lineHeight, tracking=attrs.get('NSKern') or 0))
+                index = location + length
+        elif fs:
+            fontSize = self.css('fontSize') or 16
+            lineHeight = None
+            if self.css('leading') or self.css('rLeading'):
+                lineHeight = (self.css('leading') or 0) + (self.css('rLeading') or 0) * fontSize
+            tracking = (self.css('tracking') or 0) + (self.css('rTracking') or 0) * fontSize
+            runs.append(LayoutRun(u'%s' % fs, self.css('font'), fontSize, lineHeight=lineHeight or None,
+                tracking=tracking))
+        return runs
+
     def initializeTextLines(self):
         u"""Answer an ordered list of all baseline position, starting at the top."""    
         self._box = 0, 0, self.w, self.h
-        attrString = self._fs.getNSObject()
+        if self.TEXT_LAYOUT is not None: # Headless layout, lines are already relative from top if originTop.
+            self._textLines = self.TEXT_LAYOUT.getTextLines(self.getLayoutRuns(), self.w, self.h, originTop=self.originTop)
+            return
+        attrString = self.fs.getNSObject()
         setter = CoreText.CTFramesetterCreateWithAttributedString(attrString)
         path = Quartz.CGPathCreateMutable()
         Quartz.CGPathAddRect(path, None, Quartz.CGRectMake(*self._box))
@@ -452,9 +556,11 @@ class TextBox(Element):
         """Figure out what the width/height of the text self.fs is, with or given width or
         the styled width of this text box. If fs is defined as external attribute, then the
         size of the string is answers, as if it was already inside the text box."""
+        if self.TEXT_LAYOUT is not None:
+            return self.TEXT_LAYOUT.getTextSize(self.getLayoutRuns(fs), w or self.w)
         if fs is None:
             fs = self.fs
-        return textSize(self.fs, width=w or self.w)
+        return textSize(fs, width=w or self.w)
 
     def getOverflow(self, w=None, h=None):
         """Figure out what the overflow of the text is, with the given (w,h) or styled
@@ -463,6 +569,8 @@ class TextBox(Element):
         if self.css('elasticH'): # In case elasticH is True, box will aways fit the content.
             return ''
         # Otherwise test if there is overflow of text in the given size.
+        if self.TEXT_LAYOUT is not None: # Answers the overflow as plain string.
+            return self.TEXT_LAYOUT.getOverflow(self.getLayoutRuns(), w or self.w-self.pr-self.pl, h or self.h-self.pt-self.pb)
         return textOverflow(self.fs, (0, 0, w or self.w-self.pr-self.pl, h or self.h-self.pt-self.pb), LEFT)
 
     def NOTNOW_getBaselinePositions(self, y=0, w=None, h=None):
@@ -507,28 +615,56 @@ class TextBox(Element):
         checking if there is a name defined, not if it exists or is already filled by another flow."""
         return self.nextElement is None and len(self.getOverflow())
 
+    def _get_textFlow(self):
+        u"""Answer the TextFlow that places the text of self in the chain of self.nextElement boxes.
+        If self holds text that was placed by the flow of a previous box, possibly with text appended,
+        then answer that flow. Otherwise self is the start of a new flow."""
+        textFlow = self._textFlow
+        if textFlow is None or (textFlow.box is not self and not textFlow.isInFlow(self)):
+            textFlow = self._textFlow = TextFlow(self)
+        return textFlow
+    textFlow = property(_get_textFlow)
+
     def overflow2Next(self):
-        u"""Try to fix if there is overflow."""
+        u"""Try to fix if there is overflow, by flowing the text through the chain of next elements.
+        The chain is resolved and filled iteratively by the TextFlow of self, which only measures the
+        text that lands in each box. Boxes that got new text are solved, without solving further
+        overflow recursively, as their text already fits. The flow keeps the complete text, so text that
+        is appended to a box of the flow is flowed from there. If nothing changed in the text or in the
+        geometry of the boxes, then nothing is placed again.
+
+        >>> import os
+        >>> from pagebot import getFSAttributes
+        >>> from pagebot.document import Document
+        >>> from pagebot.conditions import Overflow2Next
+        >>> from pagebot.fonttoolbox.textlayout import TextLayout, FONT_PATH
+        >>> layout = TextLayout(defaultFont=os.path.join(FONT_PATH, 'fontbureau/AmstelvarAlpha-VF.ttf'))
+        >>> doc = Document(w=500, h=500, autoPages=3)
+        >>> boxes = []
+        >>> for pn in range(3):
+        ...     box = TextBox('', parent=doc.getPage(pn), name='main', w=200, h=100, nextElement='main',
+        ...         nextPage=pn+1, conditions=[Overflow2Next()])
+        ...     box.TEXT_LAYOUT = layout
+        ...     boxes.append(box)
+        >>> attributes = getFSAttributes(style=dict(font='Verdana', fontSize=10, leading=12))
+        >>> for n in range(20):
+        ...     boxes[0].appendText(u'Lorem ipsum dolor sit amet %d. ' % n, attributes)
+        >>> score = doc.solve()
+        >>> [len(box.text) for box in boxes], boxes[1].text.startswith(u'Lorem')
+        ([300, 310, 0], True)
+        >>> boxes[0].appendText(u'EDIT ', attributes) # Appended to the text in the first box, the rest is kept.
+        >>> score = doc.solve()
+        >>> [len(box.text) for box in boxes], boxes[1].text.startswith(u'EDIT')
+        ([300, 306, 9], True)
+        """
         result = True
-        overflow = self.getOverflow()
-        if overflow and self.nextElement: # If there is text overflow and there is a next element?
-            result = False
-            # Find the page of self
-            page = self.getElementPage()
-            if page is not None:        
-                # Try next page
-                nextElement = page.getElementByName(self.nextElement) # Optional search  next page too.
-                if nextElement is None or nextElement.fs and self.nextPage:
-                    # Not found or not empty, search on next page.
-                    page = self.doc.getPage(self.nextPage)
-                    nextElement =  page.getElementByName(self.nextElement)
-                if nextElement is not None and not nextElement.fs: 
-                    # Finally found one empty box on this page or next page?
-                    nextElement.fs = overflow
-                    nextElement.prevPage = page.name
-                    nextElement.prevElement = self.name # Remember the back link
-                    score = nextElement.solve() # Solve any overflow on the next element.
-                    result = len(score.fails) == 0 # Test if total flow placement succeeded.
+        if self.nextElement:
+            textFlow = self.textFlow
+            if textFlow.box is self or not textFlow.isPlaced(self):
+                for e in textFlow.flow():
+                    if e is not self:
+                        score = e.solve() # Solve the other conditions of the next element.
+                        result = result and len(score.fails) == 0 # Test if total flow placement succeeded.
         return result
 
     #   B U I L D
@@ -708,3 +844,7 @@ class TextBox(Element):
                 
 
 
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
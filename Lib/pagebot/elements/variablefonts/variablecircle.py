@@ -86,9 +86,11 @@ class VariableCircle(Element):
         strokeWidth(strokeW)
         oval(mx-fontSize/2*self.R, my-fontSize/2*self.R, fontSize*self.R, fontSize*self.R)
 
-        variableFont = getVariableFont(self.font, location)
-        # Show axis name below circle marker?
-        if self.showAxisNames and axisName is not None:
+        # Show axis name below circle marker? Only then the instance needs to be installed, otherwise
+        # the glyph path is drawn from the instance in memory.
+        showAxisName = self.showAxisNames and axisName is not None
+        variableFont = getVariableFont(self.font, location, install=showAxisName)
+        if showAxisName:
             fs = newFS(axisName, style=dict(font=variableFont.installedName, fontSize=fontSize/4, textFill=0))
             tw, th = textSize(fs)
             text(fs, (mx-tw/2, my-fontSize/2*self.R-th*2/3))
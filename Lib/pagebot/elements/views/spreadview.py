@@ -11,7 +11,10 @@
 #
 #     spreadview.py
 #
-from drawBot import newPage, rect, fill, stroke, strokeWidth
+try:
+    from drawBot import newPage, rect, fill, stroke, strokeWidth
+except ImportError:
+    newPage = rect = fill = stroke = strokeWidth = None
 from pagebot import setFillColor, setStrokeColor
 from view import View
 
@@ -15,9 +15,14 @@ from __future__ import division
 from datetime import datetime
 from math import atan2, radians, degrees, cos, sin
 
-from drawBot import saveImage, newPage, rect, oval, line, newPath, moveTo, lineTo, drawPath,\
-    save, restore, scale, textSize, FormattedString, cmykStroke, text, fill, stroke,\
-    strokeWidth, curveTo, closePath
+try:
+    from drawBot import saveImage, newPage, rect, oval, line, newPath, moveTo, lineTo, drawPath,\
+        save, restore, scale, textSize, FormattedString, cmykStroke, text, fill, stroke,\
+        strokeWidth, curveTo, closePath
+except ImportError:
+    saveImage = newPage = rect = oval = line = newPath = moveTo = lineTo = drawPath = save = None
+    restore = scale = textSize = FormattedString = cmykStroke = text = fill = stroke = None
+    strokeWidth = curveTo = closePath = None
 
 from pagebot import setFillColor, setStrokeColor, newFS
 from pagebot.elements.element import Element
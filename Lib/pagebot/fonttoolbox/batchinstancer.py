@@ -0,0 +1,173 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     batchinstancer.py
+#
+#     Generating the instance files of a Variable Font for a list of locations (e.g.
+#     the named instances or a grid of axis values) in a pool of processes. Each worker
+#     parses the master font once, when it starts, and writes the instances of the
+#     chunks of locations it gets. The file names only depend on the locations and
+#     the timestamp of the master is kept, so the same locations always make the same
+#     files, independent of the number of processes. Locations that make the same
+#     instance are written once.
+#
+import os
+import itertools
+import multiprocessing
+from time import time
+
+from pagebot.fonttoolbox.instancecache import MasterFont, getInstanceName, getLocationKey
+from pagebot.fonttoolbox.mutator import getInstancePath
+
+# MasterFont of the worker process.
+_master = None
+
+def _initWorker(path):
+    global _master
+    _master = MasterFont(path)
+
+def _generateInstances(instances):
+    u"""Write the instances, as list of (location, normalize, instancePath), with the _master of
+    this worker. Answer the list of durations."""
+    durations = []
+    for location, normalize, instancePath in instances:
+        t = time()
+        ttFont = _master.instantiate(_master.getNormalizedLocation(location, normalize), getInstanceName(location))
+        ttFont.recalcTimestamp = False # Keep the time of the master, so files don't depend on when they are made.
+        ttFont.save(instancePath)
+        durations.append(time() - t)
+    return durations
+
+class BatchInstancer(object):
+    u"""Writer of the instance files of the Variable Font at path, in a pool of processes.
+    Falls back to writing in the main process for one process, a few instances, or if fork is
+    not available.
+
+    >>> import pagebot, tempfile
+    >>> path = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+    >>> instancer = BatchInstancer(path, processes=2, minInstances=2)
+    >>> locations = instancer.getGridLocations(['wght', 'wdth'], steps=2)
+    >>> locations
+    [{'wdth': 60.0, 'wght': 38.0}, {'wdth': 402.0, 'wght': 38.0}, {'wdth': 60.0, 'wght': 250.0}, {'wdth': 402.0, 'wght': 250.0}]
+    >>> targetDirectory = tempfile.mkdtemp()
+    >>> paths = instancer.generate(locations + locations[:1], targetDirectory)
+    >>> [path.split('/')[-1] for path in paths[:2]]
+    ['AmstelvarAlpha-VF-wdth60.0-wght38.0.ttf', 'AmstelvarAlpha-VF-wdth402.0-wght38.0.ttf']
+    >>> paths[0] == paths[-1], instancer.written, instancer.parallel
+    (True, 4, True)
+    >>> instancer.generate(locations, targetDirectory) == paths[:4], instancer.written # Files exist.
+    (True, 0)
+    >>> paths = instancer.generate([dict(wght=-1.0), dict(wght=-0.5), dict(wght=0.0), dict(wght=0)], targetDirectory, normalize=False)
+    >>> [path.split('/')[-1] for path in paths], instancer.written
+    (['AmstelvarAlpha-VF-wght-1.0.ttf', 'AmstelvarAlpha-VF-wght-0.5.ttf', 'AmstelvarAlpha-VF-wght0.0.ttf', 'AmstelvarAlpha-VF-wght0.0.ttf'], 3)
+    """
+    MIN_INSTANCES = 4 # Don't start processes for less instances.
+
+    def __init__(self, path, processes=None, minInstances=None):
+        self.path = path
+        self.processes = processes # Default is the number of processors.
+        self.minInstances = minInstances or self.MIN_INSTANCES
+        self._master = None
+        self.written = 0 # Number of instances written by the last generate.
+        self.parallel = False # True if the last generate used a pool.
+        self.duration = 0 # Total time of making and writing the instances of the last generate.
+
+    def __repr__(self):
+        return '[%s %s Processes:%s Written:%d]' % (self.__class__.__name__, self.path.split('/')[-1],
+            self.processes, self.written)
+
+    def _get_master(self):
+        if self._master is None:
+            self._master = MasterFont(self.path)
+        return self._master
+    master = property(_get_master)
+
+    def getNamedLocations(self):
+        u"""Answer the list of (name, location) of the named instances in the fvar table of the font."""
+        ttFont = self.master.ttFont
+        locations = []
+        for instance in ttFont['fvar'].instances:
+            name = ttFont['name'].getName(instance.subfamilyNameID, 3, 1)
+            if name is not None:
+                name = name.toUnicode()
+            locations.append((name, dict(instance.coordinates)))
+        return locations
+
+    def getGridLocations(self, axisTags=None, steps=3):
+        u"""Answer the list of locations of the grid with steps values from minValue to maxValue, for
+        each of the axisTags (default is all axes of the font). Other axes are at their default."""
+        axes = self.master.axes
+        if axisTags is None:
+            axisTags = sorted(axes.keys())
+        values = []
+        for axisTag in axisTags:
+            minValue, defaultValue, maxValue = axes[axisTag]
+            values.append([minValue + (maxValue - minValue) * n / (steps - 1.0) for n in range(steps)])
+        return [dict(zip(axisTags, grid)) for grid in itertools.product(*values)]
+
+    def getInstancePath(self, location, targetDirectory):
+        u"""Answer the file path of the instance at location, same naming as generateInstance( )."""
+        if not targetDirectory.endswith('/'):
+            targetDirectory += '/'
+        return targetDirectory + '.'.join(self.path.split('/')[-1].split('.')[:-1]) + getInstanceName(location) + '.ttf'
+
+    def _canFork(self):
+        u"""Workers are forked processes. Daemon processes cannot make a pool."""
+        return hasattr(os, 'fork') and not multiprocessing.current_process().daemon
+
+    def generate(self, locations, targetDirectory=None, normalize=True, force=False):
+        u"""Write the instances at locations (in axis values, or normalized to (-1, 1) if normalize is
+        False) in targetDirectory (default is getInstancePath( )). Existing files are only written again
+        if force is True. Answer the list of file paths, in the order of locations."""
+        global _master
+        if targetDirectory is None:
+            targetDirectory = getInstancePath()
+        if not os.path.exists(targetDirectory):
+            os.makedirs(targetDirectory)
+        paths = []
+        instances = []
+        unique = {} # Key is location key, value is path. Write each instance once, also if locations has duplicates.
+        for location in locations:
+            locationKey = getLocationKey(self.master.getNormalizedLocation(location, normalize))
+            instancePath = unique.get(locationKey)
+            if instancePath is None:
+                instancePath = unique[locationKey] = self.getInstancePath(location, targetDirectory)
+                if force or not os.path.exists(instancePath):
+                    instances.append((location, normalize, instancePath))
+            paths.append(instancePath)
+
+        processes = self.processes or multiprocessing.cpu_count()
+        self.parallel = processes > 1 and len(instances) >= self.minInstances and self._canFork()
+        self.written = len(instances)
+        if self.parallel:
+            # Chunks of instances, a few per process to balance the load.
+            chunkSize = max(1, len(instances) // (processes * 4))
+            chunks = [instances[index:index+chunkSize] for index in range(0, len(instances), chunkSize)]
+            pool = multiprocessing.Pool(processes, initializer=_initWorker, initargs=(self.path,))
+            try:
+                durations = sum(pool.map(_generateInstances, chunks), [])
+            finally:
+                pool.close()
+                pool.join()
+        elif instances:
+            _master = self.master
+            try:
+                durations = _generateInstances(instances)
+            finally:
+                _master = None
+        else:
+            durations = []
+        self.duration = sum(durations)
+        return paths
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
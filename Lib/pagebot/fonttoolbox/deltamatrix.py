@@ -0,0 +1,138 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     deltamatrix.py
+#
+#     The gvar deltas of all glyphs of a Variable Font, compiled into NumPy arrays,
+#     so the coordinates of all glyphs at a location are calculated in one pass,
+#     instead of glyph by glyph and tuple by tuple.
+#     The deltas of each tuple are stored with the interpolated deltas (IUP) already
+#     filled in. Tuples with the same support share one scalar, that is calculated
+#     once per location. The coordinates of a point are the sum of its default
+#     coordinate and the deltas times their scalar, added in the same order as
+#     MasterFont.getCoordinates( ) does with GlyphCoordinates, so the results are
+#     exactly the same.
+#
+try:
+    import numpy
+except ImportError:
+    print 'DeltaMatrix: Install NumPy from https://pypi.python.org/pypi/numpy'
+    numpy = None
+
+from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
+from fontTools.varLib.models import supportScalar
+
+class DeltaMatrix(object):
+    u"""Default coordinates and deltas of all glyphs of a MasterFont with variations.
+    For every point of every glyph (including the phantom points), there is an entry for the
+    default coordinate, followed by an entry for each tuple of the glyph. The entries of a glyph
+    are ordered by tuple, so the sum of the entries for a point is made in the order of the tuples.
+
+    >>> import os, pagebot
+    >>> from pagebot.fonttoolbox.instancecache import MasterFont
+    >>> path = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+    >>> master = MasterFont(path)
+    >>> matrix = DeltaMatrix(master)
+    >>> len(matrix.glyphNames) == len(master.getGlyphNames()), len(matrix.supports) > 0
+    (True, True)
+    >>> location = master.getNormalizedLocation(dict(wght=200, wdth=100, opsz=30))
+    >>> coordinates = dict(matrix.getGlyphCoordinates(location))
+    >>> reference = [(name, master.getCoordinates(name, location)) for name in master.getGlyphNames()]
+    >>> sorted(coordinates) == sorted([name for name, c in reference if c is not None])
+    True
+    >>> [name for name, c in reference if c is not None and list(coordinates[name]) != list(c)] # Exactly the same
+    []
+    >>> matrix.getGlyphCoordinates(master.getNormalizedLocation({})) # All at default.
+    []
+    """
+    def __init__(self, master):
+        self.glyphNames = list(master.getGlyphNames())
+        self.supports = [] # Unique supports of the tuples.
+        supportIndices = {} # Key is sorted support items, value is index in self.supports
+        self.offsets = [] # Index of the first point of each glyph.
+        pointCount = 0
+        tupleSupports = [] # Support index of each tuple of all glyphs.
+        tupleGlyphs = [] # Glyph index of each tuple of all glyphs.
+        points = [] # Point index of each entry.
+        entrySupports = [] # Support index of each entry, -1 for default coordinates.
+        values = [] # (x, y) of each entry.
+
+        for glyphIndex, glyphName in enumerate(self.glyphNames):
+            coordinates, deltas = master.getVariations(glyphName)
+            n = len(coordinates)
+            glyphPoints = range(pointCount, pointCount + n)
+            self.offsets.append(pointCount)
+            points.extend(glyphPoints)
+            entrySupports.extend([-1] * n)
+            values.extend(coordinates)
+            for support, delta in deltas:
+                key = tuple(sorted(support.items()))
+                supportIndex = supportIndices.get(key)
+                if supportIndex is None:
+                    supportIndex = supportIndices[key] = len(self.supports)
+                    self.supports.append(support)
+                tupleSupports.append(supportIndex)
+                tupleGlyphs.append(glyphIndex)
+                points.extend(glyphPoints)
+                entrySupports.extend([supportIndex] * n)
+                values.extend(delta)
+            pointCount += n
+        self.offsets.append(pointCount)
+        self.pointCount = pointCount
+
+        self.points = numpy.array(points, dtype=numpy.int32)
+        self.entrySupports = numpy.array(entrySupports, dtype=numpy.int32)
+        self.entrySupports[self.entrySupports < 0] = len(self.supports) # Scalar of default coordinates is 1.
+        values = numpy.array(values, dtype=numpy.float64).reshape((-1, 2))
+        self.x = values[:, 0].copy()
+        self.y = values[:, 1].copy()
+        self.tupleSupports = numpy.array(tupleSupports, dtype=numpy.int32)
+        self.tupleGlyphs = numpy.array(tupleGlyphs, dtype=numpy.int32)
+
+    def __repr__(self):
+        return '[%s Glyphs:%d Points:%d Supports:%d Entries:%d]' % (self.__class__.__name__,
+            len(self.glyphNames), self.pointCount, len(self.supports), len(self.points))
+
+    def getScalars(self, normalizedLocation):
+        u"""Answer the array with the scalar of each support at normalizedLocation, followed by the
+        scalar 1 of the default coordinates."""
+        scalars = numpy.ones(len(self.supports) + 1, dtype=numpy.float64)
+        for index, support in enumerate(self.supports):
+            scalars[index] = supportScalar(normalizedLocation, support)
+        return scalars
+
+    def getCoordinates(self, normalizedLocation):
+        u"""Answer the (x, y, glyphs) arrays, where x and y are the coordinates of all points at
+        normalizedLocation and glyphs is True for the glyphs that have deltas at that location."""
+        scalars = self.getScalars(normalizedLocation)
+        entryScalars = scalars[self.entrySupports]
+        # The entries of a point are added in order by bincount, starting with the default coordinate.
+        x = numpy.bincount(self.points, weights=self.x * entryScalars, minlength=self.pointCount)
+        y = numpy.bincount(self.points, weights=self.y * entryScalars, minlength=self.pointCount)
+        glyphs = numpy.bincount(self.tupleGlyphs, weights=scalars[self.tupleSupports] != 0,
+            minlength=len(self.glyphNames)) > 0
+        return x, y, glyphs
+
+    def getGlyphCoordinates(self, normalizedLocation):
+        u"""Answer the list of (glyphName, coordinates) of the glyphs that have deltas at
+        normalizedLocation, where coordinates is a GlyphCoordinates including the phantom points."""
+        x, y, glyphs = self.getCoordinates(normalizedLocation)
+        xy = numpy.column_stack((x, y)).tolist()
+        offsets = self.offsets
+        glyphCoordinates = []
+        for glyphIndex in numpy.flatnonzero(glyphs):
+            glyphCoordinates.append((self.glyphNames[glyphIndex],
+                GlyphCoordinates(xy[offsets[glyphIndex]:offsets[glyphIndex+1]])))
+        return glyphCoordinates
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
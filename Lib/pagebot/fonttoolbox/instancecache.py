@@ -0,0 +1,374 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     instancecache.py
+#
+#     Instances of Variable Fonts in memory. The MasterFont parses the variable font
+#     file once and keeps the default coordinates and the deltas (with interpolated
+#     deltas of untouched points already filled in) of each glyph that was instantiated,
+#     shared by all instances. An instance is a new TTFont from the master data in memory,
+#     with the coordinates of its location, so it doesn't need to be saved and opened again.
+#     If NumPy is available, the coordinates of all glyphs are calculated at once by the
+#     DeltaMatrix of the master. Otherwise (or if MasterFont.DELTA_MATRIX is False) they are
+#     calculated glyph by glyph, with GlyphCoordinates.
+#     The InstanceCache keeps the most recently used instances, by normalized location,
+#     with statistics of hits and misses. Writing an instance file is only needed
+#     to install the font in DrawBot.
+#
+from __future__ import division
+
+import os
+import copy
+from collections import OrderedDict
+from time import time
+
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
+from fontTools.varLib import _GetCoordinates, _SetCoordinates
+from fontTools.varLib.models import supportScalar, normalizeLocation
+
+from drawBot import installFont
+
+from pagebot.fonttoolbox.objects.font import Font
+from pagebot.fonttoolbox.deltamatrix import DeltaMatrix, numpy
+from pagebot.fonttoolbox.trajectory import Trajectory
+from pagebot.fonttoolbox.mutator import _iup_delta, getInstancePath
+
+# Tables of the variable font that are removed from the instances.
+VARIATION_TABLES = ('avar', 'cvar', 'fvar', 'gvar', 'HVAR', 'MVAR', 'VVAR', 'STAT')
+
+def getInstanceName(location):
+    u"""Answer the style name of the instance at location, as used by generateInstance( ) for the
+    instance file name. Values are not clamped to (0, 1000) as generateInstance( ) does, so different
+    locations, e.g. normalized to (-1, 1), get different names.
+
+    >>> getInstanceName(dict(wght=88, wdth=402.0))
+    '-wdth402.0-wght88'
+    >>> getInstanceName(dict(wght=-1.0)), getInstanceName(dict(wght=-0.5)), getInstanceName(dict(wght=1200))
+    ('-wght-1.0', '-wght-0.5', '-wght1200')
+    """
+    instanceName = ''
+    for k, v in sorted(location.items()):
+        instanceName += "-%s%s" % (k, v)
+    return instanceName
+
+def getLocationKey(normalizedLocation):
+    u"""Answer the hashable key of the normalized location, rounded to the F2Dot14 precision
+    of the deltas, without the axes at default. Locations with the same key make the same instance.
+
+    >>> getLocationKey(dict(wght=0.5, wdth=0, opsz=-1.0/3))
+    (('opsz', -5461), ('wght', 8192))
+    """
+    key = []
+    for tag, value in sorted(normalizedLocation.items()):
+        value = int(round(value * 16384))
+        if value:
+            key.append((tag, value))
+    return tuple(key)
+
+def getGlyphVariations(ttFont, glyphName):
+    u"""Answer the (coordinates, variations) of glyphName in the variable ttFont, where coordinates are
+    at the default location, including the phantom points, and variations is the list of (support, deltas).
+    The missing deltas are interpolated, as they don't depend on the location."""
+    coordinates, control = _GetCoordinates(ttFont, glyphName)
+    endPts = None
+    deltas = []
+    for var in ttFont['gvar'].variations.get(glyphName, []):
+        delta = var.coordinates
+        if None in delta:
+            if endPts is None:
+                endPts = control[1] if control[0] >= 1 else list(range(len(control[1])))
+            delta = _iup_delta(delta, coordinates, endPts)
+        deltas.append((var.axes, GlyphCoordinates(delta)))
+    return coordinates, deltas
+
+class MasterFont(object):
+    u"""Variable font that is read and parsed once, to make any number of instances in memory.
+
+    >>> import pagebot
+    >>> path = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+    >>> master = MasterFont(path)
+    >>> master.axes['wght']
+    (38.0, 88.0, 250.0)
+    >>> location = master.getNormalizedLocation(dict(wght=250))
+    >>> location['wght'], location['wdth'] == 0
+    (1.0, True)
+    >>> ttFont = master.instantiate(location, u'-wght250')
+    >>> 'gvar' in ttFont, ttFont['name'].getName(2, 3, 1, 0x409).toUnicode()
+    (False, u'-wght250')
+    >>> ttFont['hmtx']['H'][0] > master.ttFont['hmtx']['H'][0] # Bold is wider.
+    True
+    """
+    DELTA_MATRIX = True # Calculate instances by the DeltaMatrix if NumPy is available.
+
+    def __init__(self, path):
+        self.path = path
+        f = open(path, 'rb')
+        self.data = f.read()
+        f.close()
+        self.ttFont = TTFont(BytesIO(self.data))
+        self.axes = {a.axisTag: (a.minValue, a.defaultValue, a.maxValue) for a in self.ttFont['fvar'].axes}
+        self._glyphNames = None
+        self._variations = {} # Key is glyph name, value is (coordinates, [(support, deltas), ...])
+        self._deltaMatrix = None
+
+    def __repr__(self):
+        return '[%s %s Axes:%d Glyphs:%d]' % (self.__class__.__name__, self.path.split('/')[-1],
+            len(self.axes), len(self._variations))
+
+    def getNormalizedLocation(self, location, normalize=True):
+        u"""Answer the location normalized to (-1, 1) for all axes. If normalize is False, then
+        location is already normalized."""
+        if normalize:
+            return normalizeLocation(location, self.axes)
+        return location
+
+    def getGlyphNames(self):
+        u"""Answer the names of the glyphs with variations, sorted by component depth, so
+        the components of a composite are set before it."""
+        if self._glyphNames is None:
+            glyf = self.ttFont['glyf']
+            self._glyphNames = sorted(self.ttFont['gvar'].variations.keys(),
+                key=lambda name: (glyf[name].getCompositeMaxpValues(glyf).maxComponentDepth
+                    if glyf[name].isComposite() else 0, name))
+        return self._glyphNames
+
+    def getVariations(self, glyphName):
+        u"""Answer the (coordinates, variations) of glyphName, as answered by getGlyphVariations( )."""
+        variations = self._variations.get(glyphName)
+        if variations is None:
+            variations = self._variations[glyphName] = getGlyphVariations(self.ttFont, glyphName)
+        return variations
+
+    def getCoordinates(self, glyphName, normalizedLocation):
+        u"""Answer the coordinates of glyphName at normalizedLocation. Answer None if the glyph
+        has no deltas at that location."""
+        coordinates, deltas = self.getVariations(glyphName)
+        result = None
+        for support, delta in deltas:
+            scalar = supportScalar(normalizedLocation, support)
+            if not scalar:
+                continue
+            if result is None:
+                result = GlyphCoordinates(coordinates)
+            result += delta * scalar
+        return result
+
+    def getDeltaMatrix(self):
+        u"""Answer the DeltaMatrix of all glyphs. Answer None if it cannot be used."""
+        if self._deltaMatrix is None and self.DELTA_MATRIX and numpy is not None:
+            self._deltaMatrix = DeltaMatrix(self)
+        return self._deltaMatrix
+
+    def getTrajectory(self, glyphNames, locations, normalize=True):
+        u"""Answer the Trajectory with the outlines of glyphNames at all locations, e.g. the frames of
+        an animation."""
+        return Trajectory(self, glyphNames, locations, normalize)
+
+    def getGlyphCoordinates(self, normalizedLocation):
+        u"""Answer the list of (glyphName, coordinates) of the glyphs that have deltas at normalizedLocation,
+        in the order of self.getGlyphNames( )."""
+        deltaMatrix = self.getDeltaMatrix()
+        if deltaMatrix is not None:
+            return deltaMatrix.getGlyphCoordinates(normalizedLocation)
+        glyphCoordinates = []
+        for glyphName in self.getGlyphNames():
+            coordinates = self.getCoordinates(glyphName, normalizedLocation)
+            if coordinates is not None: # Otherwise the glyph is at default.
+                glyphCoordinates.append((glyphName, coordinates))
+        return glyphCoordinates
+
+    def instantiate(self, normalizedLocation, styleName=None):
+        u"""Answer a new TTFont of the instance at normalizedLocation, in memory. The optional
+        styleName is set in the name table, as generateInstance( ) does."""
+        ttFont = TTFont(BytesIO(self.data))
+
+        if styleName is not None:
+            # Set the instance name IDs in the name table
+            platforms=((1, 0, 0), (3, 1, 0x409)) # Macintosh and Windows
+            for platformID, platEncID, langID in platforms:
+                familyName = ttFont['name'].getName(1, platformID, platEncID, langID) # 1 Font Family name
+                if not familyName:
+                    continue
+                familyName = familyName.toUnicode() # NameRecord to unicode string
+                styleName = unicode(styleName)
+                fullFontName = " ".join([familyName, styleName])
+                postscriptName = fullFontName.replace(" ", "-")
+                ttFont['name'].setName(styleName, 2, platformID, platEncID, langID) # 2 Font Subfamily name
+                ttFont['name'].setName(fullFontName, 4, platformID, platEncID, langID) # 4 Full font name
+                ttFont['name'].setName(postscriptName, 6, platformID, platEncID, langID) # 6 Postscript name for the font
+
+        # TODO Apply avar
+        glyf = ttFont['glyf']
+        masterGlyf = self.ttFont['glyf']
+        for glyphName, coordinates in self.getGlyphCoordinates(normalizedLocation):
+            # Copy the expanded glyph of the master, instead of decompiling the glyph of the instance.
+            # The coordinates are replaced, but the components are changed in place.
+            glyph = masterGlyf[glyphName]
+            if glyph.isComposite():
+                glyph = copy.deepcopy(glyph)
+            else:
+                glyph = copy.copy(glyph)
+            glyf.glyphs[glyphName] = glyph
+            _SetCoordinates(ttFont, glyphName, coordinates)
+
+        for tag in VARIATION_TABLES:
+            if tag in ttFont:
+                del ttFont[tag]
+
+        # Fix leading bug in drawbot by setting lineGap to 0
+        ttFont['hhea'].lineGap = 0
+        return ttFont
+
+class FontInstance(object):
+    u"""Cached instance of a Variable Font, with the file path and DrawBot name once it is installed."""
+    def __init__(self, ttFont, styleName):
+        self.ttFont = ttFont
+        self.styleName = styleName
+        self.path = None
+        self.installedName = None
+
+class InstanceCache(object):
+    u"""Least recently used instances of Variable Fonts in memory, by path and normalized location.
+    The master fonts are kept for all paths that were used, until the cache is cleared.
+
+    >>> import pagebot
+    >>> path = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+    >>> cache = InstanceCache(maxInstances=2)
+    >>> bold = cache.getInstance(path, dict(wght=250))
+    >>> cache.getInstance(path, dict(wght=250.0, wdth=402)) is bold # Same normalized location.
+    True
+    >>> light = cache.getInstance(path, dict(wght=38))
+    >>> light is bold, cache.hits, cache.misses
+    (False, 1, 2)
+    >>> cache.getInstance(path, dict(wght=150)) is not None # Removes bold, the least recently used.
+    True
+    >>> cache.getInstance(path, dict(wght=38)) is light, len(cache), cache.evictions
+    (True, 2, 1)
+    >>> import tempfile
+    >>> targetDirectory = tempfile.mkdtemp()
+    >>> font = cache.getFont(path, dict(wght=38), install=False, targetDirectory=targetDirectory)
+    >>> font.ttFont is light, cache.writes # In memory.
+    (True, 0)
+    >>> font.path.split('/')[-1], cache.writes # Written when the path is needed.
+    ('AmstelvarAlpha-VF-wght38.ttf', 1)
+    >>> font.save() # Saves over the written instance file.
+    >>> os.path.exists(font.path), cache.writes
+    (True, 1)
+    """
+    MAX_INSTANCES = 32
+
+    def __init__(self, maxInstances=None):
+        self.maxInstances = maxInstances or self.MAX_INSTANCES
+        self.clear()
+
+    def __repr__(self):
+        return '[%s Instances:%d/%d Hits:%d Misses:%d Evictions:%d Writes:%d]' % (self.__class__.__name__,
+            len(self.instances), self.maxInstances, self.hits, self.misses, self.evictions, self.writes)
+
+    def __len__(self):
+        return len(self.instances)
+
+    def clear(self):
+        self.masters = {} # Key is path, value is MasterFont
+        self.instances = OrderedDict() # Key is (path, location key), value is FontInstance. Least recently used first.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self.duration = 0 # Total time of making instances.
+
+    def getMaster(self, path):
+        u"""Answer the MasterFont of the Variable Font at path, reading it on first usage."""
+        master = self.masters.get(path)
+        if master is None:
+            master = self.masters[path] = MasterFont(path)
+        return master
+
+    def getEntry(self, path, location, normalize=True):
+        u"""Answer the cached FontInstance of the Variable Font at path for location in axis values.
+        If normalize is False, then location is already normalized to (-1, 1)."""
+        master = self.getMaster(path)
+        normalizedLocation = master.getNormalizedLocation(location, normalize)
+        key = path, getLocationKey(normalizedLocation)
+        entry = self.instances.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            t = time()
+            styleName = getInstanceName(location)
+            entry = FontInstance(master.instantiate(normalizedLocation, styleName), styleName)
+            self.duration += time() - t
+            while len(self.instances) >= self.maxInstances:
+                self.instances.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+        self.instances[key] = entry # Most recently used.
+        return entry
+
+    def getInstance(self, path, location, normalize=True):
+        u"""Answer the TTFont of the instance of the Variable Font at path for location."""
+        return self.getEntry(path, location, normalize).ttFont
+
+    def getInstancePath(self, path, entry, targetDirectory):
+        u"""Answer the file path of the instance entry in targetDirectory. Same naming as generateInstance( )."""
+        if not targetDirectory.endswith('/'):
+            targetDirectory += '/'
+        return targetDirectory + '.'.join(path.split('/')[-1].split('.')[:-1]) + entry.styleName + '.ttf'
+
+    def save(self, path, location, targetDirectory=None, normalize=True):
+        u"""Write the instance of the Variable Font at path for location in targetDirectory (default
+        is getInstancePath( )), if the file does not already exist. Answer the path of the instance file."""
+        return self._save(path, self.getEntry(path, location, normalize), targetDirectory)
+
+    def _save(self, path, entry, targetDirectory):
+        if entry.path is None:
+            if targetDirectory is None:
+                targetDirectory = getInstancePath()
+            instancePath = self.getInstancePath(path, entry, targetDirectory)
+            if not os.path.exists(instancePath):
+                if not os.path.exists(targetDirectory):
+                    os.makedirs(targetDirectory)
+                entry.ttFont.save(instancePath)
+                self.writes += 1
+            entry.path = instancePath
+        return entry.path
+
+    def getFont(self, path, location, install=True, styleName=None, normalize=True, opticalSize=None,
+            targetDirectory=None):
+        u"""Answer a Font wrapper of the instance of the Variable Font at path for location.
+        The instance is written to targetDirectory (default is getInstancePath( )) if install is True,
+        as DrawBot installs fonts from files. Otherwise it is only written when the path of the Font is
+        needed, e.g. by font.install( ), font.save( ) or font.kerning."""
+        entry = self.getEntry(path, location, normalize)
+        if install:
+            self._save(path, entry, targetDirectory)
+            if entry.installedName is None:
+                entry.installedName = installFont(entry.path)
+        font = Font(entry.path, name=entry.installedName, install=False, opticalSize=opticalSize,
+            location=location, styleName=styleName, ttFont=entry.ttFont,
+            writePath=lambda: self._save(path, entry, targetDirectory))
+        font.installedName = entry.installedName
+        return font
+
+    def getStats(self):
+        u"""Answer the dictionary with the cache statistics."""
+        return dict(instances=len(self.instances), masters=len(self.masters), hits=self.hits,
+            misses=self.misses, evictions=self.evictions, writes=self.writes, duration=self.duration,
+            latency=self.misses and self.duration/self.misses or 0)
+
+# Default cache, as used by getVariableFont( ).
+instanceCache = InstanceCache()
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -13,6 +13,7 @@ import os.path
 
 from drawBot import installFont
 from pagebot.fonttoolbox.objects.font import Font
+from pagebot.toolbox.transformer import path2FontName
 
 def getMasterPath():
     u"""Answer the path to read master fonts. Default is at the same level as pagebot module."""
@@ -194,14 +195,26 @@ def generateInstance(variableFontPath, location, targetDirectory, normalize=Fals
     # Installing the font in DrawBot. Answer font name and path.
     return installFont(outFile), outFile
 
-def getVariableFont(fontOrPath, location, install=True, styleName=None, normalize=True):
+def getVariableFont(fontOrPath, location, install=True, styleName=None, normalize=True, cache=True):
     u"""The variablesFontPath refers to the file of the source variable font.
     The nLocation is dictionary axis locations of the instance with values between (0, 1000), e.g.
     dict(wght=0, wdth=1000) or values between  (0, 1), e.g. dict(wght=0.2, wdth=0.6).
     Set normalize to False if the values in location already are matching the axis min/max of the font.
     If there is a [opsz] Optical Size value defined, then store that information in the font.info.opticalSize.
     The optional *styleName* overwrites the *font.info.styleName* of the *ttFont* or the automatic
-    location name."""
+    location name.
+    If *cache* is True, the instance is made in memory by the instanceCache and only written as file
+    if *install* is True, or when the path of the font is needed, e.g. by font.install( ), font.save( )
+    or font.kerning. Otherwise it is made by generateInstance( ), saved and opened again."""
+    if cache:
+        # Imported here, as the instancecache module uses the IUP functions of this module.
+        from pagebot.fonttoolbox.instancecache import instanceCache
+        if isinstance(fontOrPath, basestring):
+            path = fontOrPath
+        else:
+            path = fontOrPath.path
+        return instanceCache.getFont(path, location, install=install, styleName=styleName,
+            opticalSize=location.get('opsz'), targetDirectory=getInstancePath())
     if isinstance(fontOrPath, basestring):
         varFont = Font(fontOrPath, name=path2FontName(fontOrPath))    
     else:
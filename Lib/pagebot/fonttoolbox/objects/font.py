@@ -89,13 +89,20 @@ class Font(object):
     """
     GLYPH_CLASS = Glyph
 
-    def __init__(self, path, name=None, install=True, opticalSize=None, location=None, styleName=None):
+    def __init__(self, path, name=None, install=True, opticalSize=None, location=None, styleName=None, ttFont=None,
+            writePath=None):
         u"""Initialize the TTFont, for which Font is a wrapper. Default is to
         install the font in DrawBot.
 
         self.name is supported, in case the caller wants to use a different
-        name than the DrawBot installing name."""
-        self.path = path # File path of the font file. 
+        name than the DrawBot installing name.
+        If the optional ttFont is defined (e.g. an instance of a Variable Font that only
+        exists in memory), then it is used instead of reading the font from path. In that
+        case path can be None, and the optional writePath is the function that writes the font
+        file when self.path is needed (e.g. to install or save the font, or read its kerning),
+        answering the path of the file."""
+        self._path = path # File path of the font file, or None if it is not written yet.
+        self._writePath = writePath
         if install:
             # Installs the font in DrawBot from self.path and initializes
             # self.installedName.
@@ -103,7 +110,9 @@ class Font(object):
         else:
             self.installedName = None # Set to DrawBot name, if installing later.
         try:
-            self.ttFont = TTFont(path, lazy=True)
+            if ttFont is None:
+                ttFont = TTFont(path, lazy=True)
+            self.ttFont = ttFont
             # TTFont is available as lazy style.info.font
             self.info = FontInfo(self.ttFont)
             self.info.opticalSize = opticalSize # Optional optical size, to indicate where this Variable Font is rendered for.
@@ -119,7 +128,17 @@ class Font(object):
             raise OSError('Cannot open font file "%s"' % path)
 
     def __repr__(self):
-        return '<PageBot Font %s>' % (self.path or self.name)
+        return '<PageBot Font %s>' % (self._path or self.name) # Don't write the file for showing it.
+
+    def _get_path(self):
+        u"""Answer the path of the font file. A font that only exists in memory is written by
+        self._writePath first. Answer None if there is no file and no way to write it."""
+        if self._path is None and self._writePath is not None:
+            self._path = self._writePath()
+        return self._path
+    def _set_path(self, path):
+        self._path = path
+    path = property(_get_path, _set_path)
 
     def __getitem__(self, glyphName):
         return self.GLYPH_CLASS(self, glyphName)
@@ -15,9 +15,15 @@
 #
 import sys
 import weakref
-from AppKit import NSFont
+try:
+    from AppKit import NSFont
+except ImportError:
+    NSFont = None
 from fontTools.ttLib import TTFont, TTLibError
-from drawBot import BezierPath
+try:
+    from drawBot import BezierPath
+except ImportError:
+    BezierPath = None
 from fontinfo import FontInfo
 from pagebot.fonttoolbox.analyzers import GlyphAnalyzer, PointContext
 from pagebot.toolbox.transformer import point2D
@@ -0,0 +1,516 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     textlayout.py
+#
+#     Text measurement and line breaking with fontTools only, without CoreText and DrawBot.
+#     Advances come from the hmtx table, kerning from the kern table and the kern feature
+#     in GPOS. The answered lines and runs have the same attributes as the TextLine and
+#     TextRun of a TextBox, so the layout can run (and be profiled) on any platform.
+#     Variable fonts are measured in their default location.
+#
+from __future__ import division
+import os
+
+from fontTools.ttLib import TTFont
+
+# Characters after which a line can be broken. Whitespace at the end of a line does not count for its width.
+BREAK_AFTER = u' \t-‐–—­/'
+SPACES = u' \t'
+NEWLINES = u'\n\r  '
+
+# Same as pagebot.getFontPath( ), without importing DrawBot.
+FONT_PATH = os.path.join(os.path.dirname(__file__), '../../../Fonts')
+
+class FontMetrics(object):
+    u"""Cached metrics of the font at path: advances and glyph ids by character, kerning
+    by pair of glyph names. Tables are read from the file on first usage.
+
+    >>> path = os.path.join(FONT_PATH, 'fontbureau/Decovar-VF-2axes.ttf')
+    >>> metrics = getFontMetrics(path)
+    >>> metrics is getFontMetrics(path), metrics.unitsPerEm
+    (True, 2048)
+    >>> glyphName, glyphId, advance = metrics.getGlyph(u'H')
+    >>> glyphName, advance > 0
+    ('H', True)
+    >>> metrics.getKerning('A', 'V'), metrics.getKerning('A', 'A')
+    (-80, 0)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.font = TTFont(path, lazy=True)
+        self.unitsPerEm = self.font['head'].unitsPerEm
+        hhea = self.font['hhea']
+        self.ascender = hhea.ascent
+        self.descender = hhea.descent # Negative value.
+        self.lineGap = hhea.lineGap
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self._cmap = None
+        self._glyphs = {} # Key is character, value is (glyphName, glyphId, advance) in font units.
+        self._kernPairs = None # Key is (glyphName1, glyphName2), value is kerning in font units.
+        self._kernClasses = None # List of (coverage, classDef1, classDef2, class1Records) of class kerning.
+        self._kerning = {} # Cache of answered kerning pairs.
+        self._kernFirst = None # Set of glyph names that start a kerning pair.
+        self._scaledGlyphs = {} # Key is (fontSize, tracking), value is dictionary with scaled glyph tuples.
+
+    def __repr__(self):
+        return '[%s %s]' % (self.__class__.__name__, self.name)
+
+    def getGlyph(self, c):
+        u"""Answer the (glyphName, glyphId, advance) tuple for character c. Missing characters answer
+        the .notdef glyph."""
+        glyph = self._glyphs.get(c)
+        if glyph is None:
+            font = self.font
+            if self._cmap is None:
+                self._cmap = font.getBestCmap() or {}
+            glyphName = self._cmap.get(ord(c), '.notdef')
+            glyph = self._glyphs[c] = glyphName, font.getGlyphID(glyphName), font['hmtx'][glyphName][0]
+        return glyph
+
+    def getScaledGlyphs(self, fontSize, tracking=0):
+        u"""Answer the cached dictionary of (glyphName, glyphId, advance) tuples by character, where advance
+        is in points for fontSize, including tracking. Missing characters must be added by getScaledGlyph( )."""
+        key = fontSize, tracking
+        scaledGlyphs = self._scaledGlyphs.get(key)
+        if scaledGlyphs is None:
+            scaledGlyphs = self._scaledGlyphs[key] = {}
+        return scaledGlyphs
+
+    def getScaledGlyph(self, c, fontSize, tracking=0):
+        glyphName, glyphId, advance = self.getGlyph(c)
+        glyph = self.getScaledGlyphs(fontSize, tracking)[c] = glyphName, glyphId, advance * fontSize / self.unitsPerEm + tracking
+        return glyph
+
+    def getKernFirst(self):
+        u"""Answer the set of glyph names that can be the first of a kerning pair."""
+        if self._kernFirst is None:
+            if self._kernPairs is None:
+                self._readKerning()
+            self._kernFirst = set([glyphName1 for glyphName1, glyphName2 in self._kernPairs])
+            for coverage, classDef1, classDef2, class1Records in self._kernClasses:
+                self._kernFirst.update(coverage)
+        return self._kernFirst
+
+    def _readKerning(self):
+        self._kernPairs = {}
+        self._kernClasses = []
+        font = self.font
+        if 'kern' in font:
+            for kernTable in font['kern'].kernTables:
+                if getattr(kernTable, 'format', None) == 0:
+                    for pair, value in kernTable.kernTable.items():
+                        self._kernPairs.setdefault(pair, value)
+        if 'GPOS' in font:
+            table = font['GPOS'].table
+            lookupIndices = set()
+            if table.FeatureList is not None:
+                for featureRecord in table.FeatureList.FeatureRecord:
+                    if featureRecord.FeatureTag == 'kern':
+                        lookupIndices.update(featureRecord.Feature.LookupListIndex)
+            for lookupIndex in sorted(lookupIndices):
+                lookup = table.LookupList.Lookup[lookupIndex]
+                for subTable in lookup.SubTable:
+                    if lookup.LookupType == 9: # Extension lookup.
+                        subTable = subTable.ExtSubTable
+                    if subTable.LookupType != 2: # Only pair adjustment.
+                        continue
+                    coverage = subTable.Coverage.glyphs
+                    if subTable.Format == 1:
+                        for glyphName1, pairSet in zip(coverage, subTable.PairSet):
+                            for record in pairSet.PairValueRecord:
+                                value = getattr(record.Value1, 'XAdvance', None) if record.Value1 else None
+                                if value:
+                                    self._kernPairs.setdefault((glyphName1, record.SecondGlyph), value)
+                    elif subTable.Format == 2:
+                        self._kernClasses.append((set(coverage), subTable.ClassDef1.classDefs,
+                            subTable.ClassDef2.classDefs, subTable.Class1Record))
+
+    def getKerning(self, glyphName1, glyphName2):
+        u"""Answer the kerning between the glyph names, in font units."""
+        pair = glyphName1, glyphName2
+        value = self._kerning.get(pair)
+        if value is None:
+            if self._kernPairs is None:
+                self._readKerning()
+            value = self._kernPairs.get(pair)
+            if value is None:
+                value = 0
+                for coverage, classDef1, classDef2, class1Records in self._kernClasses:
+                    if glyphName1 in coverage:
+                        record = class1Records[classDef1.get(glyphName1, 0)].Class2Record[classDef2.get(glyphName2, 0)]
+                        value = getattr(record.Value1, 'XAdvance', 0) if record.Value1 else 0
+                        break
+            self._kerning[pair] = value
+        return value
+
+_fontMetrics = {} # Key is font path, value is FontMetrics instance.
+
+def getFontMetrics(path):
+    u"""Answer the cached FontMetrics of the font at path."""
+    metrics = _fontMetrics.get(path)
+    if metrics is None:
+        metrics = _fontMetrics[path] = FontMetrics(path)
+    return metrics
+
+class LayoutRun(object):
+    u"""Styled input text for the layout: a string with one font, fontSize, lineHeight and tracking."""
+    def __init__(self, text, font, fontSize=12, lineHeight=None, tracking=0, style=None):
+        self.text = text
+        self.font = font # Font path, or a font name registered in the TextLayout.
+        self.fontSize = fontSize
+        self.lineHeight = lineHeight # None for the line height of the font.
+        self.tracking = tracking
+        self.style = style or {} # Other attributes of the run, answered as TextRun.style.
+
+    def __repr__(self):
+        return '[%s %s %s %r]' % (self.__class__.__name__, self.font, self.fontSize, self.text[:20])
+
+class HeadlessTextRun(object):
+    u"""Glyphs of a line with the same style, with the attributes of a CoreText based TextRun."""
+    def __init__(self, layoutRun, metrics, runIndex, iStart, iEnd, string, glyphs, glyphNames, positions, advances):
+        self.layoutRun = layoutRun
+        self.metrics = metrics
+        self.runIndex = runIndex
+        self.iStart, self.iEnd = iStart, iEnd
+        self.string = string
+        self.glyphs = glyphs
+        self.glyphNames = glyphNames
+        self.glyphCount = len(glyphs)
+        self.positions = positions # List of (x, y) relative to the start of the line.
+        self.advances = advances
+        self.stringIndices = range(iStart, iEnd)
+        self.status = 0
+        self.attrs = layoutRun.style
+
+    def __len__(self):
+        return self.glyphCount
+
+    def __repr__(self):
+        return '[%s #%d] %s' % (self.__class__.__name__, self.runIndex, self.string)
+
+    def __getitem__(self, index):
+        return self.string[index]
+
+    def _get_scale(self):
+        return self.fontSize / self.metrics.unitsPerEm
+    scale = property(_get_scale)
+
+    def _get_style(self):
+        style = dict(self.layoutRun.style)
+        style.update(dict(font=self.fontName, fontSize=self.fontSize, lineHeight=self.layoutRun.lineHeight,
+            tracking=self.layoutRun.tracking))
+        return style
+    style = property(_get_style)
+
+    def _get_fontName(self):
+        return self.metrics.name
+    fontName = displayName = familyName = property(_get_fontName)
+
+    def _get_fontSize(self):
+        return self.layoutRun.fontSize
+    fontSize = property(_get_fontSize)
+
+    def _get_ascender(self):
+        return self.metrics.ascender * self.scale
+    ascender = property(_get_ascender)
+
+    def _get_descender(self):
+        return self.metrics.descender * self.scale
+    descender = property(_get_descender)
+
+    def _get_leading(self):
+        return self.metrics.lineGap * self.scale
+    leading = property(_get_leading)
+
+    def _get_lineHeight(self):
+        lineHeight = self.layoutRun.lineHeight
+        if lineHeight is None:
+            lineHeight = self.ascender - self.descender + self.leading
+        return lineHeight
+    lineHeight = property(_get_lineHeight)
+
+class HeadlessTextLine(object):
+    u"""Line of runs, with the attributes of a CoreText based TextLine."""
+    def __init__(self, runs, p, lineIndex, width, trailingWhiteSpace, ascender, descender, leading, lineHeight):
+        self.x, self.y = p # Relative position from top of TextBox
+        self.lineIndex = lineIndex
+        self.runs = runs
+        self.glyphCount = sum([run.glyphCount for run in runs])
+        self.string = u''.join([run.string for run in runs])
+        self.width = width # Typographic width, without trailing white space.
+        self.trailingWhiteSpace = trailingWhiteSpace
+        self.ascender = ascender
+        self.descender = descender
+        self.leading = leading
+        self.lineHeight = lineHeight
+
+    def __repr__(self):
+        return '[TextLine #%d Glyphs:%d Runs:%d]' % (self.lineIndex, self.glyphCount, len(self.runs))
+
+    def __len__(self):
+        return self.glyphCount
+
+    def __getitem__(self, index):
+        return self.runs[index]
+
+    def _get_stringIndex(self):
+        if self.runs:
+            return self.runs[0].iStart
+        return 0
+    stringIndex = property(_get_stringIndex)
+
+    def getIndexForPosition(self, (x, y)):
+        u"""Answer the string index of the glyph edge closest to x."""
+        index = self.stringIndex
+        for run in self.runs:
+            for (gx, gy), advance in zip(run.positions, run.advances):
+                if x < gx + advance/2:
+                    return index
+                index += 1
+        return index
+
+    def getOffsetForStringIndex(self, i):
+        u"""Answer the x position that is closest to string index i."""
+        offset = 0
+        for run in self.runs:
+            if i < run.iEnd:
+                if i <= run.iStart:
+                    return run.positions[0][0] if run.positions else offset
+                return run.positions[i - run.iStart][0]
+            if run.positions:
+                offset = run.positions[-1][0] + run.advances[-1]
+        return offset
+
+    def getGlyphIndex2Run(self, glyphIndex):
+        for run in self.runs:
+            if run.iStart >= glyphIndex:
+                return run
+        return None
+
+    def _get_bounds(self):
+        u"""Answer the typographic bounds (width, ascender, descender, leading) of the line."""
+        return self.width, self.ascender, -self.descender, self.leading
+    bounds = property(_get_bounds)
+
+    def _get_imageBounds(self):
+        return 0, self.descender, self.width, self.ascender - self.descender
+    imageBounds = property(_get_imageBounds)
+
+class TextLayout(object):
+    u"""Headless layout of LayoutRun lists into lines of a box width, using the metrics of
+    fontTools. Fonts are referred to by path, or by name if they are registered.
+
+    >>> layout = TextLayout()
+    >>> layout.registerFont('Decovar', os.path.join(FONT_PATH, 'fontbureau/Decovar-VF-2axes.ttf'))
+    >>> runs = [LayoutRun(u'Hello world, this text wraps into several lines.', 'Decovar', 24, lineHeight=30)]
+    >>> lines = layout.getTextLines(runs, 200)
+    >>> len(lines) > 1, lines[0].string.startswith(u'Hello'), lines[1].y - lines[0].y
+    (True, True, 30.0)
+    >>> w, h = layout.getTextSize(runs, 200)
+    >>> w <= 200, h
+    (True, 90)
+    >>> overflow = layout.getOverflow(runs, 200, 40)
+    >>> lines[0].string + overflow == runs[0].text
+    True
+    """
+    def __init__(self, fontPaths=None, defaultFont=None):
+        self.fontPaths = dict(fontPaths or {}) # Key is font name, value is font path.
+        self.defaultFont = defaultFont # Used if a run has no font or an unknown font.
+
+    def registerFont(self, name, path):
+        self.fontPaths[name] = path
+
+    def getMetrics(self, font):
+        u"""Answer the FontMetrics for the font name or path."""
+        path = self.fontPaths.get(font, font)
+        if path is None or not os.path.exists(path):
+            if self.defaultFont is None:
+                raise ValueError('[%s] Cannot find font "%s"' % (self.__class__.__name__, font))
+            path = self.fontPaths.get(self.defaultFont, self.defaultFont)
+        return getFontMetrics(path)
+
+    def _measure(self, runs):
+        u"""Answer the lists of all characters, with their run index, glyph tuple and advance in points.
+        Kerning of the previous character in the same run is added to its advance."""
+        chars = []
+        runIndices = []
+        glyphs = []
+        advances = []
+        for runIndex, run in enumerate(runs):
+            metrics = self.getMetrics(run.font)
+            fontSize = run.fontSize
+            tracking = run.tracking or 0
+            scaledGlyphs = metrics.getScaledGlyphs(fontSize, tracking)
+            runGlyphs = []
+            for c in run.text:
+                glyph = scaledGlyphs.get(c)
+                if glyph is None:
+                    glyph = metrics.getScaledGlyph(c, fontSize, tracking)
+                runGlyphs.append(glyph)
+            runAdvances = [glyph[2] for glyph in runGlyphs]
+            kernFirst = metrics.getKernFirst()
+            if kernFirst:
+                scale = fontSize / metrics.unitsPerEm
+                for index in range(len(runGlyphs) - 1):
+                    glyphName = runGlyphs[index][0]
+                    if glyphName in kernFirst:
+                        kern = metrics.getKerning(glyphName, runGlyphs[index+1][0])
+                        if kern:
+                            runAdvances[index] += kern * scale
+            chars.extend(run.text)
+            runIndices.extend([runIndex] * len(run.text))
+            glyphs.extend(runGlyphs)
+            advances.extend(runAdvances)
+        return chars, runIndices, glyphs, advances
+
+    def _breakLines(self, chars, advances, w):
+        u"""Answer the list of (start, end, width, trailingWhiteSpace) of the lines, greedy breaking
+        after spaces and hyphens. Words that don't fit on a line are broken at the box width."""
+        lines = []
+        count = len(chars)
+        start = 0
+        while start < count:
+            width = 0 # Width of the line until index, excluding trailing spaces.
+            lineWidth = 0 # Width including spaces, up to the current index.
+            breakIndex = None # Index after the last break opportunity.
+            breakWidth = 0
+            index = start
+            end = None
+            while index < count:
+                c = chars[index]
+                if c in NEWLINES:
+                    end = index + 1
+                    breakWidth = width
+                    break
+                if c in SPACES:
+                    lineWidth += advances[index]
+                    breakIndex = index + 1
+                    breakWidth = width
+                    index += 1
+                    continue
+                if lineWidth + advances[index] > w and index > start:
+                    if breakIndex is not None and breakIndex > start:
+                        end = breakIndex
+                    else: # No break opportunity, break the word at the box width.
+                        end = index
+                        breakWidth = width
+                    break
+                lineWidth += advances[index]
+                width = lineWidth
+                if c in BREAK_AFTER:
+                    breakIndex = index + 1
+                    breakWidth = width
+                index += 1
+            if end is None: # End of the text.
+                end = count
+                breakWidth = width
+            # Include the spaces after the break into this line, as CoreText does.
+            while end < count and chars[end] in SPACES:
+                end += 1
+            lines.append((start, end, breakWidth, sum(advances[start:end]) - breakWidth))
+            start = end
+        return lines
+
+    def layout(self, runs, w, h=None, originTop=True, align=None):
+        u"""Answer the tuple (lines, overflowIndex) for the runs in a box of width w and height h.
+        The y of each line is its baseline, from the top of the box if originTop is True, otherwise
+        from the bottom. Lines that don't fit in h are not answered, overflowIndex is the index of the
+        first character that does not fit. If h is None, then all lines are answered."""
+        chars, runIndices, glyphs, advances = self._measure(runs)
+        metricsList = [self.getMetrics(run.font) for run in runs]
+        lines = []
+        baseline = 0
+        overflowIndex = None
+        for lineIndex, (start, end, width, trailing) in enumerate(self._breakLines(chars, advances, w)):
+            # Group the characters of the line into runs of the same style.
+            textRuns = []
+            ascender = descender = leading = lineHeight = 0
+            runStart = start
+            x = 0
+            while runStart < end or (runStart == end == start and not textRuns and runs):
+                runIndex = runIndices[runStart] if runStart < len(runIndices) else len(runs) - 1
+                runEnd = runStart
+                while runEnd < end and runIndices[runEnd] == runIndex:
+                    runEnd += 1
+                runAdvances = advances[runStart:runEnd]
+                runGlyphs = glyphs[runStart:runEnd]
+                positions = []
+                for advance in runAdvances:
+                    positions.append((x, 0))
+                    x += advance
+                textRun = HeadlessTextRun(runs[runIndex], metricsList[runIndex], len(textRuns), runStart, runEnd,
+                    u''.join(chars[runStart:runEnd]), [glyph[1] for glyph in runGlyphs],
+                    [glyph[0] for glyph in runGlyphs], positions, runAdvances)
+                textRuns.append(textRun)
+                ascender = max(ascender, textRun.ascender)
+                descender = min(descender, textRun.descender)
+                leading = max(leading, textRun.leading)
+                lineHeight = max(lineHeight, textRun.lineHeight)
+                if runEnd == runStart:
+                    break
+                runStart = runEnd
+            if lines:
+                baseline += lineHeight
+            else:
+                baseline = ascender # First baseline at the ascender of the first line.
+            if h is not None and baseline - descender > h:
+                overflowIndex = start
+                break
+            if align == 'right':
+                lineX = w - width
+            elif align == 'center':
+                lineX = (w - width)/2
+            else:
+                lineX = 0
+            if not originTop and h is not None:
+                y = h - baseline
+            else:
+                y = baseline
+            lines.append(HeadlessTextLine(textRuns, (lineX, y), lineIndex, width, trailing, ascender, descender, leading,
+                lineHeight))
+        if not originTop and h is None: # Elastic height, measure from the bottom of the last line.
+            height = self.getLinesHeight(lines)
+            for line in lines:
+                line.y = height - line.y
+        return lines, overflowIndex
+
+    def getLinesHeight(self, lines):
+        u"""Answer the height from the top of the first line to the bottom of the last line."""
+        if not lines:
+            return 0
+        first = lines[0]
+        last = lines[-1]
+        return abs(last.y - first.y) + first.ascender - last.descender
+
+    def getTextLines(self, runs, w, h=None, originTop=True, align=None):
+        return self.layout(runs, w, h, originTop, align)[0]
+
+    def getTextSize(self, runs, w):
+        u"""Answer the (width, height) of the runs, laid out in width w. The height is the sum of the line heights."""
+        lines = self.getTextLines(runs, w)
+        return max([line.width for line in lines] or [0]), sum([line.lineHeight for line in lines])
+
+    def getOverflow(self, runs, w, h):
+        u"""Answer the text that does not fit in the box (w, h)."""
+        lines, overflowIndex = self.layout(runs, w, h)
+        if overflowIndex is None:
+            return u''
+        return u''.join([run.text for run in runs])[overflowIndex:]
+
+    def getBaseLines(self, runs, box, originTop=False):
+        u"""Answer the list of (x, y) positions of all line starts in box, as textBoxBaseLines( ) does."""
+        x, y, w, h = box
+        return [(x + line.x, y + line.y) for line in self.getTextLines(runs, w, h, originTop=originTop)]
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     trajectory.py
+#
+#     Outlines of a few glyphs of a Variable Font at many locations, e.g. the frames
+#     of an animation along a path through the design space. Instead of making an
+#     instance (or calculating the outline) for every frame, the coordinates of all
+#     frames are calculated at once, as one NumPy array of frames x points x 2:
+#     the default coordinates plus, for each tuple of deltas, the scalars of all
+#     frames times the deltas. Composite glyphs are decomposed, with their
+#     component offsets at each frame. Drawing a frame then only draws.
+#
+from __future__ import division
+
+from fontTools.varLib.models import supportScalar
+
+from pagebot.fonttoolbox.deltamatrix import numpy
+
+SCALED_COMPONENT_OFFSET = 0x0800 # Flag of a glyf component, to transform its offset too.
+
+class Trajectory(object):
+    u"""Coordinates of the outlines of glyphNames in the MasterFont master at each of the locations
+    (in axis values, or normalized to (-1, 1) if normalize is False).
+    self.coordinates is the array of frames x points x 2, with the points of all glyphs, decomposed,
+    without phantom points. self.advances is the array of frames x glyphs with the advance widths.
+
+    >>> import os, pagebot
+    >>> from pagebot.fonttoolbox.instancecache import MasterFont
+    >>> path = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+    >>> master = MasterFont(path)
+    >>> locations = [dict(wght=38 + n*53) for n in range(5)]
+    >>> trajectory = Trajectory(master, ['H', 'e'], locations)
+    >>> trajectory.coordinates.shape == (5, len(trajectory.getGlyphCoordinates(0, 'H')) + len(trajectory.getGlyphCoordinates(0, 'e')), 2)
+    True
+    >>> reference = master.getCoordinates('e', master.getNormalizedLocation(locations[3]))
+    >>> trajectory.getGlyphCoordinates(3, 'e').tolist() == [list(p) for p in reference][:-4] # Same as calculated by glyph.
+    True
+    >>> trajectory.advances[0][0] < trajectory.advances[-1][0] # Bold H is wider.
+    True
+    >>> from fontTools.pens.boundsPen import ControlBoundsPen
+    >>> pen = ControlBoundsPen(None)
+    >>> trajectory.drawGlyph(pen, 4, 'H')
+    >>> pen.bounds[2] - pen.bounds[0] > 0
+    True
+    """
+    def __init__(self, master, glyphNames, locations, normalize=True):
+        self.master = master
+        self.glyphNames = list(glyphNames)
+        self.locations = [master.getNormalizedLocation(location, normalize) for location in locations]
+        self._supportScalars = {} # Key is sorted support items, value is array of the scalars of all frames.
+        self._blocks = {} # Key is glyph name, value is (coordinates, endPts, flags, advances) of all frames.
+        self.offsets = {} # Key is glyph name, value is (start, end) of its points in self.coordinates.
+        self.contours = {} # Key is glyph name, value is (endPts, flags).
+        coordinates = []
+        advances = []
+        start = 0
+        for glyphName in self.glyphNames:
+            if glyphName in self.offsets: # Glyph is already in the trajectory.
+                advances.append(advances[self.glyphNames.index(glyphName)])
+                continue
+            glyphCoordinates, endPts, flags, glyphAdvances = self._getBlock(glyphName)
+            coordinates.append(glyphCoordinates)
+            advances.append(glyphAdvances)
+            self.offsets[glyphName] = start, start + glyphCoordinates.shape[1]
+            self.contours[glyphName] = endPts, flags
+            start += glyphCoordinates.shape[1]
+        self.coordinates = numpy.concatenate(coordinates, axis=1)
+        self.advances = numpy.column_stack(advances)
+        self._supportScalars = {}
+        self._blocks = {}
+
+    def __repr__(self):
+        return '[%s Glyphs:%d Frames:%d Points:%d]' % (self.__class__.__name__, len(self.offsets),
+            self.coordinates.shape[0], self.coordinates.shape[1])
+
+    def __len__(self):
+        return len(self.locations)
+
+    def getScalars(self, support):
+        u"""Answer the array of the scalars of support at all locations."""
+        key = tuple(sorted(support.items()))
+        scalars = self._supportScalars.get(key)
+        if scalars is None:
+            scalars = self._supportScalars[key] = numpy.array(
+                [supportScalar(location, support) for location in self.locations], dtype=numpy.float64)
+        return scalars
+
+    def _getBlock(self, glyphName):
+        u"""Answer the (coordinates, endPts, flags, advances) of glyphName at all locations, where coordinates is
+        the array frames x points x 2 of the decomposed outline and advances is the array of advance widths."""
+        block = self._blocks.get(glyphName)
+        if block is not None:
+            return block
+        defaultCoordinates, deltas = self.master.getVariations(glyphName)
+        coordinates = numpy.empty((len(self.locations), len(defaultCoordinates), 2), dtype=numpy.float64)
+        coordinates[:] = numpy.array(list(defaultCoordinates), dtype=numpy.float64).reshape((-1, 2))
+        # Add the tuples in order, as MasterFont.getCoordinates( ) does, for exactly the same result.
+        for support, delta in deltas:
+            delta = numpy.array(list(delta), dtype=numpy.float64).reshape((-1, 2))
+            coordinates += self.getScalars(support)[:, None, None] * delta
+        advances = coordinates[:, -3, 0] - coordinates[:, -4, 0] # Right minus left phantom point.
+        coordinates = coordinates[:, :-4]
+
+        glyph = self.master.ttFont['glyf'][glyphName]
+        if glyph.isComposite():
+            # The coordinates are the component offsets. Replace them by the points of the components.
+            offsets = coordinates
+            points = []
+            endPts = []
+            flags = []
+            pointCount = 0
+            for index, component in enumerate(glyph.components):
+                componentCoordinates, componentEndPts, componentFlags, _ = self._getBlock(component.glyphName)
+                if hasattr(component, 'firstPt'): # Align point secondPt of the component on point firstPt.
+                    move = numpy.concatenate(points, axis=1)[:, component.firstPt] - componentCoordinates[:, component.secondPt]
+                else:
+                    move = offsets[:, index]
+                if not hasattr(component, 'transform'):
+                    componentCoordinates = componentCoordinates + move[:, None, :]
+                elif component.flags & SCALED_COMPONENT_OFFSET:
+                    componentCoordinates = numpy.dot(componentCoordinates + move[:, None, :], component.transform)
+                else:
+                    componentCoordinates = numpy.dot(componentCoordinates, component.transform) + move[:, None, :]
+                points.append(componentCoordinates)
+                endPts += [endPt + pointCount for endPt in componentEndPts]
+                flags += componentFlags
+                pointCount += componentCoordinates.shape[1]
+            if points:
+                coordinates = numpy.concatenate(points, axis=1)
+            else:
+                coordinates = numpy.empty((len(self.locations), 0, 2), dtype=numpy.float64)
+        elif glyph.numberOfContours > 0:
+            endPts = list(glyph.endPtsOfContours)
+            flags = [flag & 1 for flag in glyph.flags] # Only the on-curve bit.
+        else:
+            endPts = []
+            flags = []
+        block = self._blocks[glyphName] = coordinates, endPts, flags, advances
+        return block
+
+    def getGlyphCoordinates(self, frame, glyphName):
+        u"""Answer the array of points x 2 of glyphName at the location of frame."""
+        start, end = self.offsets[glyphName]
+        return self.coordinates[frame, start:end]
+
+    def getAdvance(self, frame, glyphName):
+        return self.advances[frame, self.glyphNames.index(glyphName)]
+
+    def drawGlyph(self, pen, frame, glyphName, offset=None, scale=1):
+        u"""Draw the outline of glyphName at the location of frame in pen (e.g. a DrawBot BezierPath),
+        optionally scaled and moved by offset (x, y)."""
+        points = self.getGlyphCoordinates(frame, glyphName)
+        if scale != 1:
+            points = points * scale
+        if offset is not None:
+            points = points + offset
+        points = [tuple(point) for point in points.tolist()]
+        endPts, flags = self.contours[glyphName]
+        start = 0
+        for endPt in endPts:
+            drawContour(pen, points[start:endPt+1], flags[start:endPt+1])
+            start = endPt + 1
+
+def drawContour(pen, points, onCurves):
+    u"""Draw the closed TrueType contour of points in pen, where onCurves is 1 for the on-curve points,
+    as the glyf glyphs are drawn by fontTools."""
+    if not points:
+        return
+    if 1 not in onCurves: # No on-curve points, a quadratic curve with an implied on-curve point.
+        pen.qCurveTo(*(points + [None]))
+    else:
+        # Rotate, so the last point is on-curve.
+        firstOnCurve = onCurves.index(1) + 1
+        points = points[firstOnCurve:] + points[:firstOnCurve]
+        onCurves = onCurves[firstOnCurve:] + onCurves[:firstOnCurve]
+        pen.moveTo(points[-1])
+        while points:
+            nextOnCurve = onCurves.index(1) + 1
+            if nextOnCurve == 1:
+                pen.lineTo(points[0])
+            else:
+                pen.qCurveTo(*points[:nextOnCurve])
+            points = points[nextOnCurve:]
+            onCurves = onCurves[nextOnCurve:]
+    pen.closePath()
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
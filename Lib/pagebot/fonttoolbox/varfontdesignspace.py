@@ -12,14 +12,24 @@
 #
 #     varfontdesignscpace.py
 #
+#     Glyphs of a Variable Font at a location, drawn by TTVarFontGlyphSet and
+#     TTVarFontDesignSpace. The OutlineCache of the glyph set keeps the expanded glyphs
+#     with their deltas, the support scalars of the recent locations and the recently
+#     drawn glyphs at their location, so drawing the same glyph at the same location
+#     again only draws it.
+#
 from __future__ import division
 
+import copy
+from collections import OrderedDict
+from time import time
+
 from fontTools.ttLib import TTFont
 from fontTools.ttLib.tables._g_l_y_f import Glyph as TTGlyph, GlyphCoordinates
 from fontTools.varLib.models import supportScalar, normalizeLocation # VariableModel
-from fontTools.varLib import _GetCoordinates
 from pagebot.fonttoolbox.designspacemodel import DesignSpaceBase, Axis
 from pagebot.fonttoolbox.ttftools import getBestCmap
+from pagebot.fonttoolbox.instancecache import getGlyphVariations
 
 
 def setCoordinates(glyph, coord, glyfTable):
@@ -56,11 +66,163 @@ def setCoordinates(glyph, coord, glyfTable):
     # font["hmtx"].metrics[glyphName] = int(round(horizontalAdvanceWidth)), int(round(leftSideBearing))
 
 
+class LimitedCache(object):
+    u"""Dictionary of at most maxEntries, removing the least recently used entry if it is full,
+    with statistics of the hits, misses and removed entries.
+
+    >>> cache = LimitedCache(2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache.get('a'), cache.get('c')
+    (1, None)
+    >>> cache['c'] = 3 # Removes 'b', the least recently used.
+    >>> cache.get('b'), sorted(cache.keys()), cache.hits, cache.misses, cache.evictions
+    (None, ['a', 'c'], 1, 2, 1)
+    """
+    def __init__(self, maxEntries):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict() # Least recently used first.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return '[%s %d/%d Hits:%d Misses:%d Evictions:%d]' % (self.__class__.__name__,
+            len(self.entries), self.maxEntries, self.hits, self.misses, self.evictions)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def keys(self):
+        return self.entries.keys()
+
+    def get(self, key):
+        u"""Answer the value of key, or None if it is not in the cache."""
+        value = self.entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries[key] = value # Most recently used.
+        return value
+
+    def __setitem__(self, key, value):
+        self.entries.pop(key, None)
+        while len(self.entries) >= self.maxEntries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+
+class OutlineCache(object):
+    u"""Cache of the glyph data of a Variable Font and of the glyph outlines at locations:
+    The expanded glyphs with their default coordinates and deltas, the support scalars
+    for each location and the glyphs with coordinates at each location. Each cache is
+    limited in number of entries.
+
+    >>> import os, pagebot
+    >>> path = '/'.join(os.path.abspath(pagebot.__file__).split('/')[:-3]) + '/Fonts/fontbureau/AmstelvarAlpha-VF.ttf'
+    >>> ttFont = TTFont(path, lazy=True)
+    >>> cache = OutlineCache(ttFont, maxOutlines=2)
+    >>> glyph, width, lsb = cache.getOutline('H', {'wght': 1.0})
+    >>> cache.getOutline('H', {'wght': 1.0})[0] is glyph, width > ttFont['hmtx']['H'][0] # Bold is wider.
+    (True, True)
+    >>> outline = cache.getOutline('H', {'wght': 0.5}), cache.getOutline('H', {'wght': -1.0})
+    >>> cache.outlines.hits, cache.outlines.misses, cache.outlines.evictions, cache.glyphs.misses
+    (1, 3, 1, 1)
+    """
+    MAX_GLYPHS = 1000 # Glyphs with default coordinates and deltas.
+    MAX_LOCATIONS = 100 # Locations with support scalars.
+    MAX_OUTLINES = 2000 # Glyphs at a location.
+
+    def __init__(self, ttFont, maxGlyphs=None, maxLocations=None, maxOutlines=None):
+        self.ttFont = ttFont
+        self.glyphs = LimitedCache(maxGlyphs or self.MAX_GLYPHS) # Key is glyph name.
+        self.scalars = LimitedCache(maxLocations or self.MAX_LOCATIONS) # Key is location key.
+        self.outlines = LimitedCache(maxOutlines or self.MAX_OUTLINES) # Key is (glyph name, location key)
+        self.duration = 0 # Total time of making the missing outlines.
+
+    def __repr__(self):
+        return '[%s Glyphs:%d Locations:%d Outlines:%d Hits:%d Misses:%d]' % (self.__class__.__name__,
+            len(self.glyphs), len(self.scalars), len(self.outlines), self.outlines.hits, self.outlines.misses)
+
+    def clear(self):
+        self.glyphs.clear()
+        self.scalars.clear()
+        self.outlines.clear()
+
+    def getLocationKey(self, location):
+        u"""Answer the hashable key of the normalized location, without the axes at default."""
+        return tuple(sorted([(tag, value) for tag, value in location.items() if value]))
+
+    def getGlyphData(self, glyphName):
+        u"""Answer the (glyph, coordinates, variations) of glyphName, where glyph is the expanded glyph of
+        the glyf table and (coordinates, variations) is answered by getGlyphVariations( ), with the support
+        of each variation as (key, support) tuple."""
+        glyphData = self.glyphs.get(glyphName)
+        if glyphData is None:
+            glyfTable = self.ttFont['glyf']
+            glyph = glyfTable[glyphName]
+            glyph = TTGlyph(glyph.compile(glyfTable)) # Copy, the glyph of the font is not changed.
+            glyph.expand(glyfTable)
+            coordinates, deltas = getGlyphVariations(self.ttFont, glyphName)
+            variations = [((self.getLocationKey(support), support), delta) for support, delta in deltas]
+            glyphData = self.glyphs[glyphName] = glyph, coordinates, variations
+        return glyphData
+
+    def getScalars(self, location, locationKey=None):
+        u"""Answer the dictionary of support scalars at the normalized location, with the support key as key.
+        The dictionary is filled as supports are used."""
+        if locationKey is None:
+            locationKey = self.getLocationKey(location)
+        scalars = self.scalars.get(locationKey)
+        if scalars is None:
+            scalars = self.scalars[locationKey] = {}
+        return scalars
+
+    def getOutline(self, glyphName, location):
+        u"""Answer the (glyph, width, lsb) of glyphName at normalized location, where glyph is a TTGlyph
+        with the coordinates of the location."""
+        locationKey = self.getLocationKey(location)
+        key = glyphName, locationKey
+        outline = self.outlines.get(key)
+        if outline is None:
+            t = time()
+            glyph, coordinates, variations = self.getGlyphData(glyphName)
+            scalars = self.getScalars(location, locationKey)
+            coordinates = GlyphCoordinates(coordinates) # Copy, setCoordinates changes them.
+            for (supportKey, support), deltas in variations:
+                scalar = scalars.get(supportKey)
+                if scalar is None:
+                    scalar = scalars[supportKey] = supportScalar(location, support)
+                if scalar:
+                    coordinates += deltas * scalar
+            if glyph.isComposite():
+                glyph = copy.deepcopy(glyph)
+            else:
+                glyph = copy.copy(glyph)
+            width, lsb = setCoordinates(glyph, coordinates, self.ttFont['glyf'])
+            outline = self.outlines[key] = glyph, width, lsb
+            self.duration += time() - t
+        return outline
+
+    def getStats(self):
+        u"""Answer the dictionary with the statistics of the caches."""
+        stats = dict(duration=self.duration)
+        for name in ('glyphs', 'scalars', 'outlines'):
+            cache = getattr(self, name)
+            stats[name] = dict(entries=len(cache), maxEntries=cache.maxEntries, hits=cache.hits,
+                misses=cache.misses, evictions=cache.evictions)
+        return stats
+
 class TTVarFontGlyphSet(object):
     # TODO: CHange to PageBot Font wrapper
-    def __init__(self, ttFont):
+    def __init__(self, ttFont, cache=None):
         self._ttFont = ttFont
         self._axes = {a.axisTag: (a.minValue, a.defaultValue, a.maxValue) for a in ttFont['fvar'].axes}
+        self.cache = cache or OutlineCache(ttFont) # Shared by the glyphs of this glyph set.
         self.setLocation({})
     
     def setLocation(self, location):
@@ -74,7 +236,7 @@ class TTVarFontGlyphSet(object):
     __contains__ = has_key
 
     def __getitem__(self, glyphName):
-        return TTVarGlyph(self._ttFont, glyphName, self.location)
+        return TTVarGlyph(self._ttFont, glyphName, self.location, self.cache)
 
     def get(self, glyphName, default=None):
         try:
@@ -85,47 +247,30 @@ class TTVarFontGlyphSet(object):
 
 class TTVarGlyph(object):
 
-    def __init__(self, ttFont, glyphName, location):
+    drawBefore = None # Optional function(glyph, pen), called before the glyph is drawn.
+    drawAfter = None # Optional function(glyph, pen), called after the glyph is drawn.
+
+    def __init__(self, ttFont, glyphName, location, cache=None):
         self._ttFont = ttFont
         self._glyphName = glyphName
         self._location = location
+        self._cache = cache or OutlineCache(ttFont)
         try:
             self.width, self.lsb = ttFont['hmtx'][glyphName]
         except KeyError:
             self.width = 1000
             self.lsb = 50
 
-    @staticmethod
-    def _copyGlyph(glyph, glyfTable):
-        glyph = TTGlyph(glyph.compile(glyfTable))
-        glyph.expand(glyfTable)
-        return glyph
-
     def draw(self, pen):
-        glyph = self._ttFont['glyf'][self._glyphName]
-        glyph = self._copyGlyph(glyph, self._ttFont['glyf'])
+        glyph, self.width, self.lsb = self._cache.getOutline(self._glyphName, self._location)
 
         if self.drawBefore is not None: # Call if defined
-            self.drawBefore(self, p, view)
-
-        variables = self._ttFont['gvar'].variables[self._glyphName]
-        coordinates, _ = _GetCoordinates(self._ttFont, self._glyphName)
-        for var in variables:
-            scalar = supportScalar(self._location, var.axes)
-            if not scalar:
-                continue
-            # print(var.coordinates)
-            if None in var.coordinates:
-                print("warning: replacing missing deltas with (0, 0)")
-            deltas = GlyphCoordinates([pt or (0, 0) for pt in var.coordinates])
-            coordinates += deltas * scalar
-
-        horizontalAdvanceWidth, leftSideBearing = setCoordinates(glyph, coordinates, self._ttFont['glyf'])
-        self.width = horizontalAdvanceWidth
+            self.drawBefore(self, pen)
+
         glyph.draw(pen, self._ttFont['glyf'])  # XXX offset based on lsb
 
         if self.drawAfter is not None: # Call if defined
-            self.drawAfter(self, p, view)
+            self.drawAfter(self, pen)
 
 class TTVarFontDesignSpace(DesignSpaceBase):
 
@@ -27,6 +27,8 @@ from fontTools.varLib.models import VariationModel, supportScalar #, normalizeLo
 
 from pagebot import setFillColor, setStrokeColor, newFS
 from pagebot.fonttoolbox.objects.font import Font
+from pagebot.fonttoolbox.instancecache import instanceCache
+from pagebot.fonttoolbox.batchinstancer import BatchInstancer
 from pagebot.fonttoolbox.varfontdesignspace import TTVarFontGlyphSet
 from pagebot.fonttoolbox.variablefontaxes import axisDefinitions
 from pagebot.toolbox.transformer import path2FontName
@@ -123,14 +125,29 @@ def getVarLocation(font, location, normalize=True):
                 varLocation[axisTag] = axisValue
     return varLocation
 
-def getVariableFont(fontOrPath, location, install=True, styleName=None, normalize=True):
+def getVariableFont(fontOrPath, location, install=True, styleName=None, normalize=True, cache=instanceCache):
     u"""The variablesFontPath refers to the file of the source variable font.
     The nLocation is dictionary axis locations of the instance with values between (0, 1000), e.g.
     dict(wght=0, wdth=1000) or values between  (0, 1), e.g. dict(wght=0.2, wdth=0.6).
     Set normalize to False if the values in location already are matching the axis min/max of the font.
     If there is a [opsz] Optical Size value defined, then store that information in the font.info.opticalSize.
     The optional *styleName* overwrites the *font.info.styleName* of the *ttFont* or the automatic
-    location name."""
+    location name.
+    The instance is made in memory by the *cache* (default is instanceCache), which keeps the most
+    recently used instances. It is only written as file if *install* is True, or when the path of the
+    font is needed, e.g. by font.install( ), font.save( ) or font.kerning. If *cache* is None, then
+    the instance is made by generateInstance( ), saved and opened again."""
+    if cache is not None:
+        if isinstance(fontOrPath, basestring):
+            path = fontOrPath
+            varFont = cache.getMaster(path) # Parsed once, for the axes.
+        else:
+            path = fontOrPath.path
+            varFont = fontOrPath
+        font = cache.getFont(path, getVarLocation(varFont, location, normalize), install=install, styleName=styleName,
+            normalize=normalize, opticalSize=location.get('opsz'), targetDirectory=getInstancePath())
+        font.info.location = location # Requested location, not the location in axis values.
+        return font
     if isinstance(fontOrPath, basestring):
         varFont = Font(fontOrPath, name=path2FontName(fontOrPath))    
     else:
@@ -139,6 +156,28 @@ def getVariableFont(fontOrPath, location, install=True, styleName=None, normaliz
     # Answer the generated Variable Font instance. Add [opsz] value if is defined in the location, otherwise None.
     return Font(path, name=fontName, install=install, opticalSize=location.get('opsz'), location=location, styleName=styleName)
 
+def getVariableFonts(fontOrPath, locations, install=True, styleNames=None, normalize=True, processes=None):
+    u"""Answer the list of Font instances of the variable font for the list of locations, as getVariableFont( )
+    answers them one by one. The instance files that don't exist yet are written in getInstancePath( )
+    by a BatchInstancer, in a pool of *processes* (default is the number of processors).
+    The optional *styleNames* is a list with a style name for each location."""
+    if isinstance(fontOrPath, basestring):
+        path = fontOrPath
+        varFont = instanceCache.getMaster(path) # Parsed once, for the axes.
+    else:
+        path = fontOrPath.path
+        varFont = fontOrPath
+    varLocations = [getVarLocation(varFont, location, normalize) for location in locations]
+    paths = BatchInstancer(path, processes=processes).generate(varLocations, getInstancePath(), normalize=normalize)
+    fonts = []
+    for index, location in enumerate(locations):
+        styleName = None
+        if styleNames is not None:
+            styleName = styleNames[index]
+        fonts.append(Font(paths[index], install=install, opticalSize=location.get('opsz'), location=location,
+            styleName=styleName))
+    return fonts
+
 # TODO: Remove from here.
 def drawGlyphPath(font, glyphName, x, y, s=0.1, fillColor=0, strokeColor=None, strokeWidth=0):
     glyph = font[glyphName]
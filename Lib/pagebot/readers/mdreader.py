@@ -12,9 +12,13 @@
 #     mdreader.py
 #
 #     Read markdown files from path or url and answer the etree.
+#     The markdown is converted to XML and parsed in memory. Converted XML can be
+#     cached by the hash of the markdown, so unchanged files skip the conversion.
 #
+import os
 import codecs
-from xmlreader import readXML
+import hashlib
+import xml.etree.ElementTree as ET
 
 try:
     import markdown
@@ -25,6 +29,102 @@ except ImportError:
     print 'Typesetter: Install Python markdown from https://pypi.python.org/pypi/Markdown'
     markdown = None
 
+def getMarkDownExtensions():
+    u"""Answer a list of new instances of the default markdown extensions. New instances are
+    needed for every conversion, as the extensions keep the state of the converted text."""
+    return [FootnoteExtension(), LiteratureExtension(), Nl2BrExtension()]
+
+class MarkDownCache(object):
+    u"""Cache of markdown converted to XML, where the key is the hash of the markdown text and the names
+    of the extensions. Parsed trees are kept in memory. If path is defined, then the XML is also saved as
+    file in that directory, so it can be used by the next build of an unchanged manuscript.
+    Answered trees are shared by all callers, so they should not be altered.
+
+    >>> cache = MarkDownCache()
+    >>> root = parseMarkDown(u'# Title\\n\\nSome *text*.', cache=cache)
+    >>> root.tag, [node.tag for node in root], cache.misses
+    ('document', ['h1', 'p'], 1)
+    >>> parseMarkDown(u'# Title\\n\\nSome *text*.', cache=cache) is root, cache.hits
+    (True, 1)
+    """
+    def __init__(self, path=None):
+        self.path = path # Optional directory to save converted XML files.
+        self.trees = {} # Key is hash, value is the parsed root node.
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return '[%s Trees:%d Hits:%d Misses:%d]' % (self.__class__.__name__, len(self.trees), self.hits, self.misses)
+
+    def __len__(self):
+        return len(self.trees)
+
+    def getKey(self, mdText, extensions):
+        u"""Answer the hash of mdText and the class names of the extensions."""
+        names = ','.join([extension.__class__.__name__ for extension in extensions])
+        return hashlib.sha1(mdText.encode('utf-8') + '|' + names).hexdigest()
+
+    def _getXMLPath(self, key):
+        return os.path.join(self.path, key + '.xml')
+
+    def get(self, key):
+        u"""Answer the parsed root node for key. Answer None if it is not in the cache."""
+        root = self.trees.get(key)
+        if root is None and self.path is not None:
+            xmlPath = self._getXMLPath(key)
+            if os.path.exists(xmlPath):
+                root = self.trees[key] = ET.parse(xmlPath).getroot()
+        if root is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return root
+
+    def set(self, key, xml, root):
+        self.trees[key] = root
+        if self.path is not None:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            f = codecs.open(self._getXMLPath(key), mode="w", encoding="utf-8")
+            f.write(xml)
+            f.close()
+
+    def clear(self):
+        u"""Clear the trees in memory. Saved XML files are not removed."""
+        self.trees = {}
+
+# Default cache of converted markdown for all readers and typesetters in this process.
+markDownCache = MarkDownCache()
+
+def markDown2XML(mdText, extensions=None):
+    u"""Answer the XML (XHTML) string of the markdown text, with a root <document> tag."""
+    if extensions is None:
+        extensions = getMarkDownExtensions()
+    xml = u'<?xml version="1.0" encoding="UTF-8"?>\n<document>%s</document>' % markdown.markdown(mdText, extensions=extensions)
+    return xml.replace('&nbsp;', ' ')
+
+def parseMarkDown(mdText, extensions=None, cache=None):
+    u"""Answer the root node of the etree of markdown text, without saving XML files. If cache is
+    defined, then answer the cached tree if the same text was converted before."""
+    if extensions is None:
+        extensions = getMarkDownExtensions()
+    if cache is not None:
+        key = cache.getKey(mdText, extensions)
+        root = cache.get(key)
+        if root is not None:
+            return root
+    xml = markDown2XML(mdText, extensions)
+    root = ET.fromstring(xml.encode('utf-8'))
+    if cache is not None:
+        cache.set(key, xml, root)
+    return root
+
+def readMarkDownText(path):
+    f = codecs.open(path, mode="r", encoding="utf-8")
+    mdText = f.read()
+    f.close()
+    return mdText
+
 def markDown2XMLFile(path):
     u"""If fileName is pointing to a non-XML file, then try to convert. This needs to be
     extended in the future e.g. to support Word documents or other text resources.
@@ -32,22 +132,21 @@ def markDown2XMLFile(path):
     fileExtension = path.split('.')[-1].lower()
     assert fileExtension.lower() == 'md'
     # If we have MarkDown content, convert to XML (XHTML)
-    f = codecs.open(path, mode="r", encoding="utf-8")
-    mdText = f.read()
-    f.close()
-    mdExtensions = [FootnoteExtension(), LiteratureExtension(), Nl2BrExtension()]
-    xml = u'<?xml version="1.0" encoding="UTF-8"?>\n<document>%s</document>' % markdown.markdown(mdText, extensions=mdExtensions)
-    xml = xml.replace('&nbsp;', ' ')
-
+    xml = markDown2XML(readMarkDownText(path))
     xmlPath = path + '.xml'
-    print xmlPath
     f = codecs.open(xmlPath, mode="w", encoding="utf-8")
     f.write(xml)
     f.close()
     return xmlPath # Return altered fileName if converted. Otherwise return original fileName
 
-def readMD(path):
-    u"""Read the markdown from path and answer the compiled etree."""
-    xmlPath = markDown2XMLFile(path)
-    return readXML(xmlPath)
+def readMD(path, xPath=None, extensions=None, cache=markDownCache):
+    u"""Read the markdown from path and answer the compiled etree. The tree is made in memory,
+    without writing an XML file. Set cache to None to always convert the markdown."""
+    root = parseMarkDown(readMarkDownText(path), extensions, cache)
+    if xPath is not None:
+        return root.findall(xPath)
+    return root
 
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -15,7 +15,10 @@
 #
 import sys
 import copy
-from drawBot import sizes
+try:
+    from drawBot import sizes
+except ImportError:
+    sizes = None
 
 from pagebot.toolbox.units import MM, INCH, mm, fr, pt, px, perc
 
@@ -71,14 +74,23 @@ Legal = 8.5*INCH, 14*INCH
 JuniorLegal = 5*INCH, 8*INCH
 Tabloid = 11*INCH, 17*INCH
 # Other rounded definintions compatible to DrawBot
-drawBotSizes = sizes()
+if sizes is not None:
+    drawBotSizes = sizes()
+    Ledger = sizes('Ledger') # 1224, 792
+    Statement = sizes('Statement') # 396, 612 
+    Executive = sizes('Executive') # 540, 720
+    Folio = sizes('Folio') # 612, 936
+    Quarto = sizes('Quarto') # 610, 780
+    Size10x14 = sizes('10x14') # 720, 1008
+else: # Same values without DrawBot, there is no screen.
+    drawBotSizes = {}
+    Ledger = 1224, 792
+    Statement = 396, 612
+    Executive = 540, 720
+    Folio = 612, 936
+    Quarto = 610, 780
+    Size10x14 = 720, 1008
 Screen = drawBotSizes.get('screen', None) # Current screen size.
-Ledger = sizes('Ledger') # 1224, 792
-Statement = sizes('Statement') # 396, 612 
-Executive = sizes('Executive') # 540, 720
-Folio = sizes('Folio') # 612, 936
-Quarto = sizes('Quarto') # 610, 780
-Size10x14 = sizes('10x14') # 720, 1008
 
 # Hybrid sizes
 # International generic fit for stationary
@@ -0,0 +1,212 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     attributecache.py
+#
+#     Cache of the FormattedString attributes that newFS( ) resolves from a style
+#     and an element, with about 40 css( ) lookups per call. Most calls in a document
+#     use the same few styles, so the resolved (interned) attribute dictionary is kept
+#     per identity of the element and of the style layers, so a new ChainedStyle or
+#     stack on the same layers finds the same entry. As in the e.css( ) cache, entries
+#     of elements and CascadeStyle layers are valid while the tree generation and the
+#     generations of the style keys that getFSAttributes( ) reads are unchanged, so
+#     writing other values, such as the position of an element, keeps them valid.
+#     Plain dictionaries are compared with the snapshot that was made when they were cached.
+#     For every attribute dictionary there is an empty template FormattedString, so
+#     a new string only needs the text to be added to a copy of the template.
+#     Elements are referred to by weakref, so removed elements are not kept alive by
+#     the cache. If the cache is full, the least recently used entries are removed.
+#
+import weakref
+
+from pagebot.toolbox.cascade import CascadeStyle, cascadeGenerations
+from pagebot.toolbox.chainedstyle import ChainedStyle
+
+# Names of the style values that pagebot.getFSAttributes( ) reads.
+FS_STYLE_KEYS = ('fontSize', 'leading', 'rLeading', 'hyphenation', 'font', 'fallbackFont', 'textFill',
+    'cmykFill', 'textStroke', 'textStrokeWidth', 'cmykStroke', 'xTextAlign', 'openTypeFeatures', 'tabs',
+    'language', 'paragraphTopSpacing', 'rParagraphTopSpacing', 'paragraphBottomSpacing',
+    'rParagraphBottomSpacing', 'tracking', 'rTracking', 'baselineShift', 'rBaselineShift',
+    'firstLineIndent', 'rFirstLineIndent', 'indent', 'rIndent', 'tailIndent', 'rTaildIndent',
+    'uppercase', 'lowercase', 'capitalized')
+
+class AttributeCache(object):
+    u"""Resolved FormattedString attributes, by identity of (element, style layers, fontSize).
+    Cached style layers are kept alive by the cache, so their identity stays unique. Elements are
+    referred to by weakref. If there are maxEntries, then the least recently used EVICT_FRACTION
+    of the entries is removed.
+
+    >>> cache = AttributeCache()
+    >>> style = dict(font='Verdana', fontSize=12)
+    >>> cache.get(None, style) is None
+    True
+    >>> attributes = dict(font='Verdana', fontSize=12)
+    >>> cache.set(None, style, None, attributes)
+    >>> cache.get(None, style) is attributes
+    True
+    >>> style['fontSize'] = 14 # Changing a plain dictionary invalidates the entry.
+    >>> cache.get(None, style), cache.hits, cache.misses
+    (None, 1, 2)
+    >>> from pagebot.toolbox.cascade import CascadeStyle
+    >>> root = CascadeStyle(font='Verdana', fontSize=12)
+    >>> h1 = dict(fontSize=24)
+    >>> cache.set(None, ChainedStyle(h1, root), None, attributes)
+    >>> cache.get(None, ChainedStyle(h1, root)) is None # Other layer, root is copied by ChainedStyle.
+    True
+    >>> parent = ChainedStyle(None, root)
+    >>> style = ChainedStyle(h1, parent)
+    >>> cache.set(None, style, None, attributes)
+    >>> cache.get(None, ChainedStyle(h1, parent)) is attributes # New style on the same layers.
+    True
+    >>> cache.set(None, [h1, root], None, attributes) # Stack of styles with a CascadeStyle layer.
+    >>> root['tracking'] = 2 # Writing a value that the attributes depend on invalidates the entry.
+    >>> cache.get(None, [h1, root]) is None
+    True
+    >>> cache.set(None, [h1, root], None, attributes)
+    >>> root['x'] = 100 # Writing other values keeps the entry valid.
+    >>> cache.get(None, (h1, root)) is attributes
+    True
+    >>> from pagebot.elements import Element
+    >>> e = Element()
+    >>> cache.set(e, None, None, attributes)
+    >>> cache.get(e, None) is attributes
+    True
+    >>> ref = weakref.ref(e)
+    >>> del e # The cache does not keep the element alive.
+    >>> ref() is None
+    True
+    >>> cache = AttributeCache(maxEntries=4)
+    >>> styles = [dict(fontSize=n) for n in range(6)]
+    >>> for style in styles[:4]:
+    ...     cache.set(None, style, None, attributes)
+    >>> cache.get(None, styles[0]) is attributes # Used, so it is not the least recently used.
+    True
+    >>> cache.set(None, styles[4], None, attributes) # Full, removes the least recently used styles[1]
+    >>> [cache.get(None, style) is attributes for style in styles[:5]], len(cache)
+    ([True, False, True, True, True], 4)
+    """
+    EVICT_FRACTION = 0.25 # Part of the entries that is removed if the cache is full.
+
+    def __init__(self, maxEntries=1000):
+        self.maxEntries = maxEntries
+        self.entries = {} # Key is (id(e), ids of style layers, fontSize), value is entry list.
+        self.templates = {} # Key is id of interned attributes, value is [attributes, template, last use].
+        self._uses = 0 # Counter for the last use of entries and templates.
+        self.hits = 0
+        self.misses = 0
+        self._cascadeGeneration = None # Global cascade generation of self._keysGeneration.
+        self._keysGeneration = None
+
+    def __repr__(self):
+        return '[%s Entries:%d Templates:%d Hits:%d Misses:%d]' % (self.__class__.__name__,
+            len(self.entries), len(self.templates), self.hits, self.misses)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries = {}
+        self.templates = {}
+
+    def _evict(self, table):
+        u"""Remove the least recently used EVICT_FRACTION of the entries of table, by their last use
+        as last item."""
+        count = max(1, int(len(table) * self.EVICT_FRACTION))
+        for key, entry in sorted(table.items(), key=lambda item: item[1][-1])[:count]:
+            del table[key]
+
+    def _getLayers(self, style):
+        u"""Answer the tuple of style dictionaries that css( ) reads for style."""
+        if style is None:
+            return ()
+        if isinstance(style, ChainedStyle):
+            return style.maps
+        if isinstance(style, (tuple, list)):
+            layers = ()
+            for layer in style:
+                layers += self._getLayers(layer)
+            return layers
+        return (style,)
+
+    def _getGeneration(self):
+        u"""Answer the tree generation and the sum of the generations of FS_STYLE_KEYS. Generations only
+        increase, so the sum is unchanged only if none of the keys changed."""
+        if self._cascadeGeneration != cascadeGenerations.generation:
+            keys = cascadeGenerations.keys
+            self._keysGeneration = cascadeGenerations.tree, sum([keys.get(name, 0) for name in FS_STYLE_KEYS])
+            self._cascadeGeneration = cascadeGenerations.generation
+        return self._keysGeneration
+
+    def get(self, e, style, fontSize=None):
+        u"""Answer the cached attributes of e and style. Answer None if there is no valid entry."""
+        layers = self._getLayers(style)
+        entry = self.entries.get((id(e), tuple([id(layer) for layer in layers]), fontSize))
+        if entry is not None:
+            eRef, cachedLayers, generation, snapshots, attributes, _ = entry
+            if (eRef is None and e is None or eRef is not None and eRef() is e) and \
+                    (generation is None or generation == self._getGeneration()):
+                for cachedLayer, layer in zip(cachedLayers, layers):
+                    if cachedLayer is not layer:
+                        break
+                else:
+                    for layer, snapshot in snapshots:
+                        if layer != snapshot:
+                            break
+                    else:
+                        self.hits += 1
+                        self._uses += 1
+                        entry[-1] = self._uses
+                        return attributes
+        self.misses += 1
+        return None
+
+    def set(self, e, style, fontSize, attributes):
+        u"""Store the resolved attributes of e and style."""
+        if len(self.entries) >= self.maxEntries:
+            self._evict(self.entries)
+        layers = self._getLayers(style)
+        snapshots = []
+        generation = None # No need to check the cascade generations, if nothing depends on them.
+        eRef = None
+        if e is not None:
+            generation = self._getGeneration()
+            eRef = weakref.ref(e)
+        for layer in layers:
+            if isinstance(layer, CascadeStyle):
+                generation = self._getGeneration()
+            else:
+                snapshots.append((layer, dict(layer)))
+        # Only the layers are kept, not a ChainedStyle or list that holds them.
+        self._uses += 1
+        self.entries[(id(e), tuple([id(layer) for layer in layers]), fontSize)] = \
+            [eRef, layers, generation, tuple(snapshots), attributes, self._uses]
+
+    def getTemplate(self, attributes):
+        u"""Answer the template FormattedString of the interned attributes. Answer None if there is none."""
+        template = self.templates.get(id(attributes))
+        if template is not None and template[0] is attributes:
+            self._uses += 1
+            template[-1] = self._uses
+            return template[1]
+        return None
+
+    def setTemplate(self, attributes, template):
+        if len(self.templates) >= self.maxEntries:
+            self._evict(self.templates)
+        self._uses += 1
+        self.templates[id(attributes)] = [attributes, template, self._uses]
+
+# Shared cache, used by pagebot.newFS( )
+fsAttributeCache = AttributeCache()
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     cascade.py
+#
+#     Generation counters that keep the cached e.css(name) values of elements valid.
+#     Every write into a CascadeStyle increments the generation of the written key.
+#     Every change in the parent tree that may alter the cascade of child elements
+#     increments the tree generation. A cached css value is valid as long as both
+#     generations are identical to the ones stored together with the value.
+#
+class CascadeGenerations(object):
+    u"""Global generation counters and hit/miss statistics of the e.css( ) cache.
+
+    >>> g = CascadeGenerations()
+    >>> g.tree, g.getKey('font')
+    (0, 0)
+    >>> g.bumpKey('font')
+    >>> g.getKey('font'), g.generation
+    (1, 1)
+    >>> g.hits = 3
+    >>> g.misses = 1
+    >>> g.hitRate
+    0.75
+    >>> g.reset()
+    >>> g.hits, g.misses
+    (0, 0)
+    """
+    def __init__(self):
+        self.tree = 0 # Incremented when parent links or complete styles of containers change.
+        self.keys = {} # Key is style name, value is the generation of that key in all styles.
+        self.generation = 0 # Incremented on any change of key or tree generations.
+        self.reset()
+
+    def __repr__(self):
+        return '[%s Tree:%d Keys:%d Hits:%d Misses:%d Invalidations:%d]' % (self.__class__.__name__,
+            self.tree, len(self.keys), self.hits, self.misses, self.invalidations)
+
+    def reset(self):
+        u"""Reset the statistics counters. Generations are not changed, so cached values stay valid."""
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def getKey(self, name):
+        return self.keys.get(name, 0)
+
+    def bumpKey(self, name):
+        u"""Invalidate all cached css values of *name*, in all elements."""
+        self.keys[name] = self.keys.get(name, 0) + 1
+        self.generation += 1
+
+    def bumpTree(self):
+        u"""Invalidate all cached css values in all elements."""
+        self.tree += 1
+        self.generation += 1
+        self.invalidations += 1
+
+    def _get_hitRate(self):
+        total = self.hits + self.misses
+        if total:
+            return self.hits / float(total)
+        return 0
+    hitRate = property(_get_hitRate)
+
+# Shared instance for all elements and documents.
+cascadeGenerations = CascadeGenerations()
+
+# Style keys that define position and size of an element in its parent. They are read directly
+# from the local style of the element, so changes don't cascade into other elements.
+GEOMETRY_KEYS = set(('x', 'y', 'z', 'w', 'h', 'd'))
+
+class CascadeStyle(dict):
+    u"""Dictionary that increments the key generation in *cascadeGenerations* for every key
+    that is changed, so cached cascading css values of that key become invalid.
+    Copies made by style.copy( ) or copy.copy(style) are shallow copies of the items, made
+    without incrementing generations. A copy is not copy-on-write: in Python 2.7, dict(style),
+    dict.update( ), f(**style) and json.dumps(style) read the storage of a dict subclass directly,
+    so a copy that reads from its source until it is written would be empty for them.
+
+    >>> style = CascadeStyle(font='Verdana')
+    >>> g = cascadeGenerations.getKey('font')
+    >>> style['font'] = 'Georgia'
+    >>> cascadeGenerations.getKey('font') == g + 1
+    True
+    >>> style.update(dict(font='Verdana'), fontSize=12)
+    >>> cascadeGenerations.getKey('font') == g + 2
+    True
+    >>> copied = style.copy()
+    >>> copied['font'], dict(copied) == dict(font='Verdana', fontSize=12), cascadeGenerations.getKey('font') == g + 2
+    ('Verdana', True, True)
+    >>> style['font'] = 'Georgia' # Changing the original does not change the copy.
+    >>> copied['font'], dict(**copied)['font']
+    ('Verdana', 'Verdana')
+    >>> copied['fontSize'] = 14
+    >>> import json
+    >>> json.dumps(copied, sort_keys=True), style['fontSize']
+    ('{"font": "Verdana", "fontSize": 14}', 12)
+    """
+    # Optional weakref to the element that needs to know about changes in its GEOMETRY_KEYS,
+    # e.g. to update the spatial index of its parent.
+    __slots__ = ('element',)
+
+    def __init__(self, *args, **kwargs):
+        self.element = None
+        dict.__init__(self, *args, **kwargs)
+
+    def copy(self):
+        u"""Answer a shallow copy of self."""
+        style = CascadeStyle()
+        dict.update(style, self)
+        return style
+    __copy__ = copy
+
+    def _changed(self, name):
+        cascadeGenerations.bumpKey(name)
+        if self.element is not None and name in GEOMETRY_KEYS:
+            e = self.element()
+            if e is not None:
+                e._geometryChanged()
+
+    def __deepcopy__(self, memo):
+        import copy
+        return CascadeStyle(copy.deepcopy(dict(self), memo))
+
+    def __reduce__(self):
+        return CascadeStyle, (dict(self),)
+
+    # Changing
+
+    def __setitem__(self, name, value):
+        dict.__setitem__(self, name, value)
+        self._changed(name)
+
+    def __delitem__(self, name):
+        dict.__delitem__(self, name)
+        self._changed(name)
+
+    def update(self, *args, **kwargs):
+        for arg in args + (kwargs,):
+            if hasattr(arg, 'keys'):
+                arg = [(name, arg[name]) for name in arg.keys()]
+            for name, value in arg:
+                self[name] = value
+
+    def setdefault(self, name, value=None):
+        if not name in self:
+            self[name] = value
+        return self[name]
+
+    def pop(self, name, *args):
+        if not name in self:
+            return dict.pop(self, name, *args)
+        value = dict.pop(self, name)
+        self._changed(name)
+        return value
+
+    def popitem(self):
+        name, value = dict.popitem(self)
+        self._changed(name)
+        return name, value
+
+    def clear(self):
+        names = dict.keys(self)
+        dict.clear(self)
+        for name in names:
+            self._changed(name)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
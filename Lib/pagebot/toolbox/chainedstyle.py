@@ -0,0 +1,197 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     chainedstyle.py
+#
+#     Layered style for cascading stacks, such as the graphic state of the Typesetter.
+#     A ChainedStyle holds only its own values on top of the layers of its parent,
+#     similar to collections.ChainMap in Python 3. Making a child style costs the size
+#     of its own values, instead of a copy of all the values of the root style. The own
+#     values are shared with the source style until they are written, so styles that are
+#     made for the same tag have the same layers, e.g. as key in the FormattedString
+#     attribute cache of newFS( ).
+#     The layers are plain dictionaries, so style.maps can be used as stack of styles
+#     by css(name, e, styles) and newFS( ) without copying. The flat dictionary of all
+#     values is only made when it is asked for, e.g. by style.items( ), and then cached.
+#
+class ChainedStyle(object):
+    u"""Style dictionary that reads from its own values first, then from the layers of parent.
+    Layers of the parent and the source of the own values are shared, and should not be altered
+    while the child is in use. Writing only changes the own values of the style, copied on first write.
+
+    >>> root = dict(font='Verdana', fontSize=12, leading=14)
+    >>> h1 = ChainedStyle(dict(fontSize=24), root)
+    >>> em = ChainedStyle(dict(font='Verdana-Italic'), h1)
+    >>> em['font'], em['fontSize'], em.get('leading'), em.get('tracking', 0), 'leading' in em, len(em)
+    ('Verdana-Italic', 24, 14, 0, True, 3)
+    >>> em['leading'] = 28 # Writing only changes the own values.
+    >>> em['leading'], h1['leading'], sorted(em.items())
+    (28, 14, [('font', 'Verdana-Italic'), ('fontSize', 24), ('leading', 28)])
+    >>> bold = dict(font='Verdana-Bold')
+    >>> b1, b2 = ChainedStyle(bold, h1), ChainedStyle(bold, h1)
+    >>> b1.maps == b2.maps and b1.maps[0] is bold # Same layers, the own values are shared with bold.
+    True
+    >>> b1['font'] = 'Verdana-Black' # Copied on first write, bold and b2 don't change.
+    >>> b1['font'], b2['font'], bold['font'], b1.maps[0] is bold
+    ('Verdana-Black', 'Verdana-Bold', 'Verdana-Bold', False)
+    >>> import copy
+    >>> for source in (ChainedStyle(None, root), ChainedStyle(dict(fontSize=24), root)):
+    ...     copied = copy.copy(source)
+    ...     copied['tracking'] = 2 # Writing the copy or the source does not change the other.
+    ...     source['leading'] = 28
+    ...     print source.get('tracking'), source['leading'], copied['tracking'], copied['leading'], root['leading']
+    None 28 2 14 14
+    None 28 2 14 14
+    >>> em.getDepth(), ChainedStyle({}, em).getDepth() # Empty layers are not added to the chain.
+    (3, 3)
+    """
+    __slots__ = ('style', 'maps', '_flat', '_shared')
+
+    def __init__(self, style=None, parent=None):
+        if type(style) is dict and style:
+            self.style = style # Own values, shared with the source until self is written.
+            self._shared = True
+        else:
+            self.style = dict(style or {})
+            self._shared = False
+        if parent is None:
+            maps = ()
+        elif isinstance(parent, ChainedStyle):
+            maps = parent.maps
+        elif type(parent) is dict:
+            maps = (parent,)
+        else: # Other styles, such as CascadeStyle, are copied once into a plain dictionary.
+            maps = (dict(parent.items()),)
+        if self.style:
+            maps = (self.style,) + maps
+        self.maps = maps # Layers of values, plain dictionaries in order of reading.
+        self._flat = None # Cached dictionary of all values, made by self.flatten()
+
+    def __repr__(self):
+        return '[%s Layers:%d Own:%s]' % (self.__class__.__name__, len(self.maps), self.style)
+
+    def getDepth(self):
+        u"""Answer the number of layers that are read to find a value."""
+        return len(self.maps)
+
+    def flatten(self):
+        u"""Answer the cached dictionary with all values of all layers. The dictionary is shared,
+        so it should not be altered by the caller."""
+        flat = self._flat
+        if flat is None:
+            flat = {}
+            for style in reversed(self.maps):
+                flat.update(style)
+            self._flat = flat
+        return flat
+
+    # Reading, value by value through the layers.
+
+    def __getitem__(self, name):
+        for style in self.maps:
+            if name in style:
+                return style[name]
+        raise KeyError(name)
+
+    def get(self, name, default=None):
+        for style in self.maps:
+            if name in style:
+                return style[name]
+        return default
+
+    def __contains__(self, name):
+        for style in self.maps:
+            if name in style:
+                return True
+        return False
+    has_key = __contains__
+
+    # Reading all values, from the flat dictionary.
+
+    def __len__(self):
+        return len(self.flatten())
+
+    def __nonzero__(self):
+        for style in self.maps:
+            if style:
+                return True
+        return False
+
+    def __iter__(self):
+        return iter(self.flatten())
+
+    def __eq__(self, other):
+        if isinstance(other, ChainedStyle):
+            other = other.flatten()
+        return self.flatten() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def keys(self):
+        return self.flatten().keys()
+
+    def values(self):
+        return self.flatten().values()
+
+    def items(self):
+        return self.flatten().items()
+
+    def iterkeys(self):
+        return self.flatten().iterkeys()
+
+    def itervalues(self):
+        return self.flatten().itervalues()
+
+    def iteritems(self):
+        return self.flatten().iteritems()
+
+    def copy(self):
+        u"""Answer a copy of self, sharing the same parent layers."""
+        style = ChainedStyle() # Empty own values of its own.
+        style.maps = self.maps
+        if self.style: # Own values are shared by both, until one of them is written.
+            style.style = self.style
+            style._shared = self._shared = True
+        return style
+    __copy__ = copy
+
+    # Writing, only in the own values of self.
+
+    def _own(self):
+        u"""Copy the own values, if they are shared with the source style."""
+        if self._shared:
+            self.style = dict(self.style)
+            self.maps = (self.style,) + self.maps[1:]
+            self._shared = False
+
+    def __setitem__(self, name, value):
+        self._own()
+        if not self.style:
+            self.maps = (self.style,) + self.maps
+        self.style[name] = value
+        self._flat = None
+
+    def __delitem__(self, name):
+        u"""Delete the own value of name. Values of the parent layers are not changed."""
+        self._own()
+        del self.style[name]
+        if not self.style:
+            self.maps = self.maps[1:]
+        self._flat = None
+
+    def update(self, *args, **kwargs):
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,173 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     elementindex.py
+#
+#     Document-wide index of the elements in the page trees, by eId, name and class_.
+#     The document and elements keep the index up-to-date when elements are appended,
+#     removed or renamed, so lookups don't need to search the element trees.
+#
+from bisect import bisect_left
+
+class ElementIndex(object):
+    u"""Index of elements by e.eId, e.name and e.class_. Lists of elements with the same name or
+    class are kept in the order of adding. Use getTreeOrder( ) to sort results in tree order.
+
+    >>> class E(object):
+    ...     def __init__(self, eId, name, class_=None):
+    ...         self.eId = eId; self.name = name; self.class_ = class_; self.elements = []
+    >>> index = ElementIndex()
+    >>> page = E('p1', 'Page 1', 'page')
+    >>> page.elements = [E('e1', 'Box'), E('e2', 'Box2'), E('e3', 'Caption')]
+    >>> index.addTree(page)
+    >>> len(index), index.get('e2').name
+    (4, 'Box2')
+    >>> [e.eId for e in index.findByName('Box')], [e.eId for e in index.findByClass('page')]
+    (['e1'], ['p1'])
+    >>> [e.eId for e in index.findByPrefix('Box')], [e.eId for e in index.findByPattern('ox')]
+    (['e1', 'e2'], ['e1', 'e2'])
+    >>> index.rename(page.elements[0], 'Box', 'Main'); page.elements[0].name = 'Main'
+    >>> [e.eId for e in index.findByPrefix('Box')]
+    ['e2']
+    >>> index.removeTree(page)
+    >>> len(index), index.findByName('Main')
+    (0, [])
+    """
+    def __init__(self):
+        self.eIds = {} # Key is e.eId, value is element.
+        self.names = {} # Key is e.name, value is list of elements in order of adding.
+        self.classes = {} # Key is e.class_, value is list of elements in order of adding.
+        self._sortedNames = None # Sorted list of names for prefix search, made on demand.
+
+    def __len__(self):
+        return len(self.eIds)
+
+    def __contains__(self, e):
+        return self.eIds.get(e.eId) is e
+
+    def _addTo(self, d, key, e):
+        if key is not None:
+            if not key in d:
+                d[key] = []
+            d[key].append(e)
+
+    def _removeFrom(self, d, key, e):
+        elements = d.get(key)
+        if elements is not None:
+            for index, e1 in enumerate(elements):
+                if e1 is e:
+                    del elements[index]
+                    break
+            if not elements:
+                del d[key]
+                return True # Key was removed.
+        return False
+
+    def add(self, e):
+        u"""Add e to the index. Child elements are not added."""
+        if e in self:
+            return
+        self.eIds[e.eId] = e
+        if e.name is not None and not e.name in self.names:
+            self._sortedNames = None
+        self._addTo(self.names, e.name, e)
+        self._addTo(self.classes, e.class_, e)
+
+    def remove(self, e):
+        u"""Remove e from the index. Child elements are not removed."""
+        if e in self:
+            del self.eIds[e.eId]
+            if self._removeFrom(self.names, e.name, e):
+                self._sortedNames = None
+            self._removeFrom(self.classes, e.class_, e)
+
+    def addTree(self, e):
+        u"""Add e and all its offspring to the index."""
+        stack = [e]
+        while stack:
+            e = stack.pop()
+            self.add(e)
+            stack.extend(e.elements)
+
+    def removeTree(self, e):
+        u"""Remove e and all its offspring from the index."""
+        stack = [e]
+        while stack:
+            e = stack.pop()
+            self.remove(e)
+            stack.extend(e.elements)
+
+    def rename(self, e, oldName, newName):
+        u"""Move e from oldName to newName. Call before or after the name of e changed."""
+        if e in self and oldName != newName:
+            if self._removeFrom(self.names, oldName, e) or not newName in self.names:
+                self._sortedNames = None
+            self._addTo(self.names, newName, e)
+
+    def reclass(self, e, oldClass, newClass):
+        u"""Move e from oldClass to newClass. Call before or after the class_ of e changed."""
+        if e in self and oldClass != newClass:
+            self._removeFrom(self.classes, oldClass, e)
+            self._addTo(self.classes, newClass, e)
+
+    def get(self, eId):
+        u"""Answer the element with eId. Answer None if it does not exist."""
+        return self.eIds.get(eId)
+
+    def findByName(self, name):
+        u"""Answer the list of elements with name, in order of adding."""
+        return list(self.names.get(name, []))
+
+    def findByClass(self, class_):
+        u"""Answer the list of elements with class_, in order of adding."""
+        return list(self.classes.get(class_, []))
+
+    def findByPrefix(self, prefix):
+        u"""Answer the list of elements where the name starts with prefix."""
+        if self._sortedNames is None:
+            self._sortedNames = sorted(self.names.keys())
+        sortedNames = self._sortedNames
+        found = []
+        index = bisect_left(sortedNames, prefix)
+        while index < len(sortedNames) and sortedNames[index].startswith(prefix):
+            found += self.names[sortedNames[index]]
+            index += 1
+        return found
+
+    def findByPattern(self, pattern):
+        u"""Answer the list of elements where pattern is part of the name. Only the
+        unique names are tested, not all elements."""
+        found = []
+        for name, elements in self.names.items():
+            if pattern in name:
+                found += elements
+        return found
+
+def getTreeOrder(elements):
+    u"""Answer the list of elements, sorted in the depth-first order of their tree,
+    where parents come before their children."""
+    positions = {} # Key is id(parent), value is dictionary with child positions.
+    def getPath(e):
+        path = []
+        parent = e.parent
+        while parent is not None and hasattr(parent, 'elements'): # The document has no elements list.
+            children = positions.get(id(parent))
+            if children is None:
+                children = positions[id(parent)] = dict([(id(child), n) for n, child in enumerate(parent.elements)])
+            path.insert(0, children.get(id(e), -1))
+            e = parent
+            parent = e.parent
+        return path
+    return [e for path, n, e in sorted([(getPath(e), n, e) for n, e in enumerate(elements)])]
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
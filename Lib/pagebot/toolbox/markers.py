@@ -11,7 +11,11 @@
 #
 #     markers.py
 #
-from drawBot import cmykStroke, newPath, drawPath, moveTo, lineTo, strokeWidth, oval, text, rect, fill, curveTo, closePath, FormattedString
+try:
+    from drawBot import cmykStroke, newPath, drawPath, moveTo, lineTo, strokeWidth, oval, text, rect, fill, curveTo, closePath, FormattedString
+except ImportError:
+    cmykStroke = newPath = drawPath = moveTo = lineTo = strokeWidth = oval = text = rect = None
+    fill = curveTo = closePath = FormattedString = None
 from pagebot.toolbox.transformer import point3D
 
 def drawRegistrationMark(origin, cmSize, cmStrokeWidth, vertical):
@@ -0,0 +1,219 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     pagestore.py
+#
+#     Storage of the document pages, as rows of pages with the same page number.
+#     It behaves as the original dictionary {pn: [page, ...]} for reading, and keeps
+#     a sorted list of page numbers and a reversed page --> row table up-to-date, so
+#     appending pages and looking up page numbers don't need to search all pages.
+#     Finding the position of an insert or remove is O(log n), but the renumbering
+#     that follows stays O(n): the rows after it get their new pn, one by one, so
+#     the pn --> row dictionary keeps O(1) lookup. Lazy offsets (e.g. per block of
+#     rows) would make every lookup pay for a search instead. Inserting and removing
+#     a page at the front of 10000 pages takes about 2ms.
+#
+from bisect import bisect_left
+
+class PageRow(list):
+    u"""List of pages that share the same page number self.pn."""
+    __slots__ = ('pn',)
+
+    def __init__(self, pn):
+        list.__init__(self)
+        self.pn = pn
+
+class PageStore(object):
+    u"""Rows of pages, where the key is the page number pn and value the list of pages with that pn.
+
+    >>> pages = PageStore()
+    >>> pages.append('a'), pages.append('b'), pages.append('c')
+    (0, 1, 2)
+    >>> pages.add(1, 'b2')
+    >>> pages[1], pages.getPageNumber('b2'), pages.getPageIndex('b2')
+    (['b', 'b2'], 1, 1)
+    >>> pages.insert(1, 'x') # Insert new row, renumbering the pages after it.
+    >>> pages.keys(), pages[2], pages.getPageNumber('c')
+    ([0, 1, 2, 3], ['b', 'b2'], 3)
+    >>> pages.remove('x') # Remove the page and the empty row, renumbering the pages after it.
+    >>> pages.items()
+    [(0, ['a']), (1, ['b', 'b2']), (2, ['c'])]
+    >>> pages.getNextPage('b2'), pages.getNextPage('b', 2), pages.getNextPage('c')
+    ('c', 'c', None)
+    """
+    def __init__(self, startPn=0):
+        self.startPn = startPn # Page number of the first page appended to an empty store.
+        self._rows = {} # Key is pn, value is PageRow list of pages.
+        self._rowList = [] # List of PageRow instances, sorted by page number.
+        self._pns = [] # Sorted list of page numbers, in the same order as self._rowList.
+        self._pageRows = {} # Key is page, value is its PageRow.
+
+    def __repr__(self):
+        return '[%s %d rows %d pages]' % (self.__class__.__name__, len(self._pns), len(self._pageRows))
+
+    # Reading as dictionary {pn: [page, ...]}, in order of page number.
+
+    def __getitem__(self, pn):
+        return self._rows[pn]
+
+    def __contains__(self, pn):
+        return pn in self._rows
+    has_key = __contains__
+
+    def __len__(self):
+        return len(self._pns)
+
+    def __iter__(self):
+        return iter(list(self._pns))
+
+    def get(self, pn, default=None):
+        return self._rows.get(pn, default)
+
+    def keys(self):
+        return list(self._pns)
+    iterkeys = __iter__
+
+    def values(self):
+        return list(self._rowList)
+
+    def items(self):
+        return zip(self._pns, self._rowList)
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def getPages(self):
+        u"""Answer the flat list of all pages, in order of page number and index."""
+        pages = []
+        for row in self._rowList:
+            pages += row
+        return pages
+
+    def getPageCount(self):
+        return len(self._pageRows)
+
+    def getFirstPage(self):
+        if self._rowList:
+            return self._rowList[0][0]
+        return None
+
+    def getLastPage(self):
+        if self._rowList:
+            return self._rowList[-1][-1]
+        return None
+
+    def getNextPageNumber(self):
+        u"""Answer the page number after the last row."""
+        if self._pns:
+            return self._pns[-1] + 1
+        return self.startPn
+
+    def getPageNumber(self, page):
+        u"""Answer the page number of page. Answer None if the page is not in the store."""
+        row = self._pageRows.get(page)
+        if row is None:
+            return None
+        return row.pn
+
+    def getPageIndex(self, page):
+        u"""Answer the index of page in its row. Answer None if the page is not in the store."""
+        row = self._pageRows.get(page)
+        if row is None:
+            return None
+        for index, pg in enumerate(row):
+            if pg is page:
+                return index
+        return None
+
+    def getNextPage(self, page, step=1):
+        u"""Answer the page that is step pages after page, in order of page number and index.
+        Answer None if page is not in the store or if there are not enough pages after page."""
+        row = self._pageRows.get(page)
+        if row is None:
+            return None
+        index = self.getPageIndex(page) + step
+        position = bisect_left(self._pns, row.pn)
+        while index >= len(row):
+            index -= len(row)
+            position += 1
+            if position >= len(self._rowList):
+                return None
+            row = self._rowList[position]
+        return row[index]
+
+    # Changing
+
+    def add(self, pn, page):
+        u"""Add page to the row of pn. Create the row if it does not exist."""
+        if page in self._pageRows:
+            self.remove(page, renumber=False)
+        row = self._rows.get(pn)
+        if row is None:
+            row = self._rows[pn] = PageRow(pn)
+            if not self._pns or pn > self._pns[-1]:
+                position = len(self._pns) # Most common case, appending at the end.
+            else:
+                position = bisect_left(self._pns, pn)
+            self._pns.insert(position, pn)
+            self._rowList.insert(position, row)
+        row.append(page)
+        self._pageRows[page] = row
+
+    def append(self, page):
+        u"""Add page as new row after the last row. Answer its page number."""
+        pn = self.getNextPageNumber()
+        self.add(pn, page)
+        return pn
+
+    def _shift(self, pn, delta):
+        u"""Add delta to the page number of all rows starting at pn. This is O(n) for the rows after pn."""
+        position = bisect_left(self._pns, pn)
+        rows = self._rows
+        shifted = self._rowList[position:]
+        for row in shifted:
+            del rows[row.pn]
+        for row in shifted: # All old keys are removed first, so new keys don't overwrite rows.
+            row.pn += delta
+            rows[row.pn] = row
+        self._pns[position:] = [row.pn for row in shifted]
+
+    def insert(self, pn, page):
+        u"""Insert page as new row at pn. If the row already exists, then increment the page number
+        of that row and all rows after it."""
+        if page in self._pageRows:
+            self.remove(page, renumber=False)
+        if pn in self._rows:
+            self._shift(pn, 1)
+        self.add(pn, page)
+
+    def remove(self, page, renumber=True):
+        u"""Remove page from its row. If the row becomes empty, then remove it, and if renumber
+        is True, decrement the page number of all rows after it."""
+        row = self._pageRows.pop(page)
+        pn = row.pn
+        for index, pg in enumerate(row):
+            if pg is page:
+                del row[index]
+                break
+        if not row:
+            del self._rows[pn]
+            position = bisect_left(self._pns, pn)
+            del self._pns[position]
+            del self._rowList[position]
+            if renumber:
+                self._shift(pn + 1, -1)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     selectormatcher.py
+#
+#     Compiles the names of document styles (e.g. 'h1', 'li p', 'ul li em') into a
+#     trie automaton of tags, with failure links (as in Aho-Corasick string matching).
+#     Each state of the automaton knows all style names that match the end of the
+#     tag stack, so pushing a tag is a single transition, and popping a tag restores
+#     the previous state. There is no joining of tag strings while matching.
+#
+
+class SelectorMatcher(object):
+    u"""Matcher of a stack of tags on the space separated tag names of styles. States are integers,
+    where 0 is the empty stack. The matches of a state are the style names that fit the end of the
+    stack, with decreasing length and relevance.
+
+    >>> matcher = SelectorMatcher(['h1', 'p', 'li p', 'ul li p', 'em', 'p em'])
+    >>> state = matcher.START
+    >>> for tag in ('document', 'ul', 'li', 'p'):
+    ...     state = matcher.next(state, tag)
+    >>> matcher.getMatches(state)
+    ('ul li p', 'li p', 'p')
+    >>> matcher.getMatches(matcher.next(state, 'em')), matcher.getMatches(matcher.next(state, 'strong'))
+    (('p em', 'em'), ())
+    >>> matcher.match(('main', 'h1')), matcher.match('li h1'), matcher.match('div')
+    ('h1', 'h1', None)
+    """
+    START = 0
+
+    def __init__(self, styleNames):
+        self.styleNames = set(styleNames)
+        self._goto = [{}] # Per state the trie transitions, key is tag, value is state.
+        self._fail = [0] # Per state the longest proper suffix state that also is in the trie.
+        self._matches = [()] # Per state the tuple of matching style names, longest first.
+        self._next = [{}] # Per state the cache of resolved transitions, including failure links.
+        terminals = {}
+        for styleName in self.styleNames:
+            state = self.START
+            for tag in styleName.split():
+                nextState = self._goto[state].get(tag)
+                if nextState is None:
+                    nextState = self._goto[state][tag] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._matches.append(())
+                    self._next.append({})
+                state = nextState
+            if state != self.START:
+                terminals[state] = styleName
+        # Breadth first, so the failure state is always resolved before the states that refer to it.
+        queue = [self.START]
+        for state in queue:
+            for tag, child in self._goto[state].items():
+                if state != self.START:
+                    self._fail[child] = self._resolve(self._fail[state], tag)
+                matches = self._matches[self._fail[child]]
+                if child in terminals:
+                    matches = (terminals[child],) + matches
+                self._matches[child] = matches
+                queue.append(child)
+
+    def __repr__(self):
+        return '[%s %d styles %d states]' % (self.__class__.__name__, len(self.styleNames), len(self._goto))
+
+    def _resolve(self, state, tag):
+        while True:
+            nextState = self._goto[state].get(tag)
+            if nextState is not None:
+                return nextState
+            if state == self.START:
+                return self.START
+            state = self._fail[state]
+
+    def next(self, state, tag):
+        u"""Answer the state after pushing tag on the stack of state."""
+        nextState = self._next[state].get(tag)
+        if nextState is None:
+            nextState = self._next[state][tag] = self._resolve(state, tag)
+        return nextState
+
+    def getMatches(self, state):
+        u"""Answer the tuple of style names that match the stack of state, longest first."""
+        return self._matches[state]
+
+    def getState(self, tags):
+        u"""Answer the state of the sequence of tags."""
+        state = self.START
+        for tag in tags:
+            state = self.next(state, tag)
+        return state
+
+    def match(self, tags):
+        u"""Answer the longest style name that matches the end of tags, which can be a sequence
+        or a space separated string. Answer None if there is no matching style."""
+        if isinstance(tags, basestring):
+            tags = tags.split()
+        matches = self._matches[self.getState(tags)]
+        if matches:
+            return matches[0]
+        return None
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,191 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     skyline.py
+#
+#     Skylines of the floating elements in a container. A skyline is the maximum
+#     value of the intervals that were added, as a sorted list of breakpoints, with a
+#     value at each breakpoint and a value for the open span to the next breakpoint.
+#     Adding an interval and asking the maximum over an interval are a binary search,
+#     plus the breakpoints inside the interval, which are few, as floating elements
+#     don't overlap.
+#     The FloatLayout of a container keeps the skylines of the first elements in the
+#     list of child elements, so Float2Top, Float2Left, etc. find the side of the
+#     previous siblings by a query, instead of testing all previous siblings. Solving
+#     the elements in order extends the skylines. If an element that is already in
+#     a skyline moves, then the skyline is made again on the next query.
+#
+from bisect import bisect_left, bisect_right
+
+NONE = float('-inf') # Value of the skyline where no interval was added.
+
+class Skyline(object):
+    u"""Maximum of values over closed intervals, queried over closed or open intervals.
+
+    >>> skyline = Skyline()
+    >>> skyline.add(0, 100, 50)
+    >>> skyline.add(100, 200, 80)
+    >>> skyline.add(300, 400, 20)
+    >>> skyline.getMax(0, 50), skyline.getMax(50, 150), skyline.getMax(210, 290)
+    (50, 80, -inf)
+    >>> skyline.getMax(200, 300), skyline.getMax(200, 300, closed=False) # Touching ends only count if closed.
+    (80, -inf)
+    >>> skyline.add(50, 350, 10) # Lower than what is there, only fills the gap.
+    >>> skyline.getMax(210, 290), skyline.getMax(0, 10), len(skyline)
+    (10, 50, 7)
+    """
+    def __init__(self):
+        self.xs = [] # Sorted breakpoints.
+        self.points = [] # Value at each breakpoint.
+        self.spans = [] # Value of the open span from each breakpoint to the next.
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __repr__(self):
+        return '[%s Breakpoints:%d]' % (self.__class__.__name__, len(self.xs))
+
+    def _split(self, x):
+        u"""Answer the index of breakpoint x, inserting it with the value of the span it is in."""
+        xs = self.xs
+        index = bisect_left(xs, x)
+        if index < len(xs) and xs[index] == x:
+            return index
+        value = NONE
+        if index:
+            value = self.spans[index-1]
+        xs.insert(index, x)
+        self.points.insert(index, value)
+        self.spans.insert(index, value)
+        return index
+
+    def add(self, x1, x2, value):
+        u"""Add the closed interval (x1, x2) with value, where x1 <= x2."""
+        i1 = self._split(x1)
+        i2 = self._split(x2)
+        points = self.points
+        spans = self.spans
+        for index in range(i1, i2+1):
+            if points[index] < value:
+                points[index] = value
+        for index in range(i1, i2):
+            if spans[index] < value:
+                spans[index] = value
+
+    def getMax(self, x1, x2, closed=True):
+        u"""Answer the maximum value of the added intervals that overlap (x1, x2), where x1 <= x2.
+        If closed is False, then intervals that only touch the ends of (x1, x2) don't overlap.
+        Answer NONE if there is no overlapping interval."""
+        xs = self.xs
+        value = NONE
+        if closed:
+            pointRange = bisect_left(xs, x1), bisect_right(xs, x2)
+        else:
+            pointRange = bisect_right(xs, x1), bisect_left(xs, x2)
+        points = self.points
+        for index in range(*pointRange):
+            if value < points[index]:
+                value = points[index]
+        spans = self.spans
+        for index in range(max(0, bisect_right(xs, x1) - 1), bisect_left(xs, x2)):
+            if value < spans[index]:
+                value = spans[index]
+        return value
+
+class FloatLayout(object):
+    u"""Skylines of the child elements of a container, for each float side, sign and z-layer,
+    for the first count elements in the list of child elements.
+    The sides are 'top' and 'bottom' (over the horizontal projection of the elements), and 'left'
+    and 'right' (over the vertical projection). Values for the minimum side are stored negative.
+    The optional watch function is called for every element that is added to a skyline, so the
+    element can report its changes to self.markChanged( ).
+    """
+    def __init__(self, container, watch=None):
+        self.elements = container.elements
+        self.watch = watch
+        self.orders = {} # Key is id of element, value is its index in self.elements.
+        for index, e in enumerate(self.elements):
+            self.orders[id(e)] = index
+        self.valid = len(self.orders) == len(self.elements) # False if elements are in the list twice.
+        self.layers = {} # Key is (side, negative), value is [count, {z: Skyline}]
+        self.generations = None # Validation tag, as set by the container.
+        self.queries = 0
+        self.rebuilds = 0
+
+    def __repr__(self):
+        return '[%s Elements:%d Layers:%d Queries:%d Rebuilds:%d]' % (self.__class__.__name__,
+            len(self.elements), len(self.layers), self.queries, self.rebuilds)
+
+    def markChanged(self, e):
+        u"""The position or size of e changed. Forget the skylines that include e."""
+        order = self.orders.get(id(e))
+        if order is None:
+            return
+        for key, layer in self.layers.items():
+            if order < layer[0]:
+                del self.layers[key]
+
+    def getOrder(self, e):
+        return self.orders.get(id(e))
+
+    def _getInterval(self, e, side):
+        u"""Answer the (x1, x2, value) of e in the skyline of side, as compared by
+        Element.getFloatTopSide( ), etc."""
+        if side in ('top', 'bottom'):
+            x1, x2 = e.mLeft, e.mRight
+        else:
+            x1, x2 = e.mTop, e.mBottom
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if side == 'top':
+            value = e.mBottom
+        elif side == 'bottom':
+            value = e.mTop
+        elif side == 'left':
+            value = e.mRight
+        else:
+            value = e.mLeft
+        return x1, x2, value
+
+    def getMax(self, e, side, negative, x1, x2, closed=True):
+        u"""Answer the maximum value of side of the elements before e in the list, with the same z as e,
+        that overlap (x1, x2). If negative is True, answer the maximum of the negative values.
+        Answer NONE if there are no such elements."""
+        order = self.orders[id(e)]
+        key = side, negative
+        layer = self.layers.get(key)
+        if layer is None or layer[0] > order: # Skylines include elements after e, make them again.
+            if layer is not None:
+                self.rebuilds += 1
+            layer = self.layers[key] = [0, {}]
+        count, skylines = layer
+        elements = self.elements
+        for index in range(count, order): # Add the elements up to e.
+            sibling = elements[index]
+            if self.watch is not None:
+                self.watch(sibling)
+            sx1, sx2, value = self._getInterval(sibling, side)
+            if negative:
+                value = -value
+            skyline = skylines.get(sibling.z)
+            if skyline is None:
+                skyline = skylines[sibling.z] = Skyline()
+            skyline.add(sx1, sx2, value)
+        layer[0] = order
+        self.queries += 1
+        skyline = skylines.get(e.z)
+        if skyline is None:
+            return NONE
+        return skyline.getMax(x1, x2, closed)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
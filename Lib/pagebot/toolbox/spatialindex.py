@@ -0,0 +1,184 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     spatialindex.py
+#
+#     Uniform grid of the bounding boxes of the child elements in a container.
+#     Instead of testing all siblings, point, rectangle and strip queries only test the
+#     elements in the grid cells that overlap the query. Elements that moved are marked
+#     dirty and get their cells updated on the next query.
+#
+from math import floor
+
+class SpatialIndex(object):
+    u"""Grid index of objects with a bounding box (x1, y1, x2, y2), where x1 <= x2 and y1 <= y2.
+    The getBox function answers the box of an object. Objects keep the order in which they
+    were added, which is answered by self.getOrder(obj).
+
+    >>> boxes = {'a': (0, 0, 10, 10), 'b': (20, 0, 30, 10), 'c': (0, 20, 30, 30)}
+    >>> index = SpatialIndex(boxes.get, cellSize=10)
+    >>> for name in sorted(boxes): index.add(name)
+    >>> sorted(index.query(5, 5, 5, 5))
+    ['a']
+    >>> sorted(index.query(5, 5, 25, 25))
+    ['a', 'b', 'c']
+    >>> sorted(index.queryX(22, 25)) # All objects in the vertical strip of x.
+    ['b', 'c']
+    >>> boxes['b'] = (100, 100, 110, 110)
+    >>> index.markDirty('b')
+    >>> sorted(index.queryY(0, 10))
+    ['a']
+    >>> index.remove('a')
+    >>> sorted(index.query(0, 0, 200, 200)), index.getOrder('c')
+    (['b', 'c'], 2)
+    """
+    # Objects that overlap more cells than this are stored in a separate list, that is always tested.
+    MAX_CELLS = 64
+
+    def __init__(self, getBox, cellSize=100):
+        self.getBox = getBox
+        self.cellSize = max(cellSize, 1)
+        self.cells = {} # Key is (column, row), value is a set of objects.
+        self.large = set() # Objects that overlap too many cells.
+        self.boxes = {} # Key is object, value is (box, cellKeys), as the object was added.
+        self.orders = {} # Key is object, value is the order number of adding.
+        self.dirty = set() # Objects that need to get their box and cells updated.
+        self.nextOrder = 0
+        self.bounds = None # Union box of all added boxes.
+        self.generations = None # Optional validation tag, as set by the owner of the index.
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __contains__(self, obj):
+        return obj in self.orders
+
+    def _getCellRange(self, x1, y1, x2, y2):
+        cellSize = self.cellSize
+        return int(floor(x1/cellSize)), int(floor(y1/cellSize)), int(floor(x2/cellSize)), int(floor(y2/cellSize))
+
+    def _insert(self, obj):
+        box = x1, y1, x2, y2 = self.getBox(obj)
+        c1, r1, c2, r2 = self._getCellRange(x1, y1, x2, y2)
+        if (c2 - c1 + 1) * (r2 - r1 + 1) > self.MAX_CELLS:
+            cellKeys = None
+            self.large.add(obj)
+        else:
+            cellKeys = []
+            cells = self.cells
+            for column in range(c1, c2+1):
+                for row in range(r1, r2+1):
+                    key = column, row
+                    if not key in cells:
+                        cells[key] = set()
+                    cells[key].add(obj)
+                    cellKeys.append(key)
+        self.boxes[obj] = box, cellKeys
+        if self.bounds is None:
+            self.bounds = box
+        else:
+            bx1, by1, bx2, by2 = self.bounds
+            self.bounds = min(bx1, x1), min(by1, y1), max(bx2, x2), max(by2, y2)
+
+    def _delete(self, obj):
+        box, cellKeys = self.boxes.pop(obj)
+        if cellKeys is None:
+            self.large.discard(obj)
+        else:
+            cells = self.cells
+            for key in cellKeys:
+                cell = cells[key]
+                cell.discard(obj)
+                if not cell:
+                    del cells[key]
+
+    def add(self, obj):
+        u"""Add obj to the index, with an order number after all objects that were added before."""
+        if obj in self.orders:
+            self.remove(obj)
+        self.orders[obj] = self.nextOrder
+        self.nextOrder += 1
+        self._insert(obj)
+
+    def remove(self, obj):
+        if obj in self.orders:
+            del self.orders[obj]
+            self.dirty.discard(obj)
+            self._delete(obj)
+
+    def markDirty(self, obj):
+        u"""The box of obj changed. Update its cells on the next query."""
+        if obj in self.orders:
+            self.dirty.add(obj)
+
+    def update(self):
+        u"""Move all dirty objects to the cells of their current box."""
+        for obj in self.dirty:
+            self._delete(obj)
+            self._insert(obj)
+        self.dirty = set()
+
+    def getOrder(self, obj):
+        return self.orders.get(obj)
+
+    def query(self, x1, y1, x2, y2):
+        u"""Answer the set of objects where the box overlaps (x1, y1, x2, y2), including the edges."""
+        if self.dirty:
+            self.update()
+        found = set()
+        if self.bounds is None:
+            return found
+        bx1, by1, bx2, by2 = self.bounds
+        x1 = max(x1, bx1)
+        y1 = max(y1, by1)
+        x2 = min(x2, bx2)
+        y2 = min(y2, by2)
+        if x1 > x2 or y1 > y2:
+            return found
+        candidates = set(self.large)
+        cells = self.cells
+        c1, r1, c2, r2 = self._getCellRange(x1, y1, x2, y2)
+        if (c2 - c1 + 1) * (r2 - r1 + 1) > len(cells):
+            for (column, row), cell in cells.items(): # Fewer cells than the query range.
+                if c1 <= column <= c2 and r1 <= row <= r2:
+                    candidates.update(cell)
+        else:
+            for column in range(c1, c2+1):
+                for row in range(r1, r2+1):
+                    cell = cells.get((column, row))
+                    if cell:
+                        candidates.update(cell)
+        boxes = self.boxes
+        for obj in candidates:
+            ox1, oy1, ox2, oy2 = boxes[obj][0]
+            if ox1 <= x2 and x1 <= ox2 and oy1 <= y2 and y1 <= oy2:
+                found.add(obj)
+        return found
+
+    def queryX(self, x1, x2):
+        u"""Answer the set of objects that overlap the vertical strip between x1 and x2."""
+        if self.dirty:
+            self.update()
+        if self.bounds is None:
+            return set()
+        return self.query(x1, self.bounds[1], x2, self.bounds[3])
+
+    def queryY(self, y1, y2):
+        u"""Answer the set of objects that overlap the horizontal strip between y1 and y2."""
+        if self.dirty:
+            self.update()
+        if self.bounds is None:
+            return set()
+        return self.query(self.bounds[0], y1, self.bounds[2], y2)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
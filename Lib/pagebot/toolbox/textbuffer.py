@@ -0,0 +1,254 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     textbuffer.py
+#
+#     Run list of styled text, as storage of TextBox content while it is built.
+#     Appending is O(1) amortized, where adding formatted strings with fs += s
+#     copies the complete string every time. Text is stored as StyledRun with
+#     interned attribute dictionaries (as answered by pagebot.getFSAttributes),
+#     so runs with the same attributes share the same dictionary, and following
+#     text with identical attributes is merged into the same run.
+#     The runs are converted into one FormattedString only when it is needed, e.g.
+#     for measuring or drawing, and the result is cached until the next change.
+#
+from bisect import bisect_right
+
+try:
+    from drawBot import FormattedString
+except ImportError: # Headless, the runs are measured by a TextLayout, without FormattedString.
+    FormattedString = None
+
+MAX_INTERNED = 10000 # Clear the table if there are more attribute dictionaries, e.g. from fitted font sizes.
+
+# Key is the frozen tuple of attributes, value is the shared attribute dictionary.
+internedAttributes = {}
+
+def _freeze(value):
+    u"""Answer a hashable version of value, to be used in the key of interned attributes."""
+    if isinstance(value, dict):
+        return ('dict',) + tuple(sorted([(key, _freeze(v)) for key, v in value.items()]))
+    if isinstance(value, (list, tuple)):
+        return (value.__class__.__name__,) + tuple([_freeze(v) for v in value])
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value)) # The interned dictionary keeps value alive, so its id stays unique.
+    return value
+
+def internAttributes(attributes):
+    u"""Answer the shared dictionary with the same items as attributes. The answered dictionary should
+    not be altered, as it may be used by many runs.
+
+    >>> a = internAttributes(dict(font='Verdana', fontSize=12, tabs=[(20, 'left')]))
+    >>> a is internAttributes(dict(font='Verdana', fontSize=12, tabs=[(20, 'left')]))
+    True
+    >>> a is internAttributes(dict(font='Verdana', fontSize=14, tabs=[(20, 'left')]))
+    False
+    """
+    key = _freeze(attributes)
+    interned = internedAttributes.get(key)
+    if interned is None:
+        if len(internedAttributes) >= MAX_INTERNED:
+            internedAttributes.clear()
+        interned = internedAttributes[key] = attributes
+    return interned
+
+def transformText(t, attributes):
+    u"""Answer t in the upper/lower/capitalized text transform of the attributes dictionary."""
+    textTransform = attributes.get('textTransform')
+    if textTransform is not None:
+        t = getattr(t, textTransform)()
+    return t
+
+class StyledRun(object):
+    u"""Plain text with one interned attribute dictionary. If attributes is None, then the text is
+    plain string, that gets the formatting of the string it is appended to."""
+    __slots__ = ('attributes', 'parts', 'length')
+
+    def __init__(self, text, attributes=None):
+        self.attributes = attributes
+        self.parts = [text] # Joined into one string when the text is asked for.
+        self.length = len(text)
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return '[%s %d]' % (self.__class__.__name__, self.length)
+
+    def append(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def _get_text(self):
+        parts = self.parts
+        if len(parts) > 1:
+            parts[:] = [u''.join(parts)]
+        return parts[0]
+    text = property(_get_text)
+
+    def slice(self, start, end):
+        return StyledRun(self.text[start:end], self.attributes)
+
+    def getFS(self):
+        u"""Answer the run as FormattedString, or as plain string if there are no attributes."""
+        if self.attributes is None:
+            return self.text
+        from pagebot import templateAttributes2FS # Not at top level, as pagebot imports this module.
+        return templateAttributes2FS(self.text, self.attributes, transform=False) # Text is already transformed.
+
+class TextBuffer(object):
+    u"""List of pieces of styled text, where a piece is a StyledRun or a FormattedString.
+
+    >>> attributes = internAttributes(dict(font='Verdana', fontSize=12))
+    >>> buffer = TextBuffer()
+    >>> buffer.appendText(u'Hello ', attributes)
+    >>> buffer.appendText(u'world', attributes) # Same attributes, added to the same run.
+    >>> buffer.appendText(u'!', internAttributes(dict(font='Verdana-Bold', fontSize=12)))
+    >>> len(buffer), len(buffer.pieces), buffer.getText()
+    (12, 2, u'Hello world!')
+    >>> part = buffer.slice(6, 12)
+    >>> part.getText(), [len(piece) for piece in part.pieces]
+    (u'world!', [5, 1])
+    >>> part.extend(buffer.slice(11, 12)) # Same attributes, added to the last run.
+    >>> part.getText(), [len(piece) for piece in part.pieces]
+    (u'world!!', [5, 2])
+    >>> plain = TextBuffer(u'Plain ', attributes) # Plain text at the start gets the default attributes.
+    >>> plain.appendText(u'bold', internAttributes(dict(font='Verdana-Bold', fontSize=12)))
+    >>> plain.pieces[0].attributes is attributes, plain.slice(0, 3).pieces[0].attributes is attributes
+    (True, True)
+    """
+    def __init__(self, fs=None, attributes=None):
+        self.pieces = [] # StyledRun and FormattedString instances, in order of the text.
+        self.starts = [] # Text index of the start of each piece.
+        self.length = 0
+        self.attributes = attributes # Interned attributes of plain text without formatted text before it.
+        self._fs = None # Cached FormattedString of all pieces, made by self.getFS()
+        if fs is not None:
+            self.append(fs)
+
+    def __len__(self):
+        return self.length
+
+    def __nonzero__(self):
+        return self.length > 0
+
+    def __repr__(self):
+        return '[%s Pieces:%d Length:%d]' % (self.__class__.__name__, len(self.pieces), self.length)
+
+    def _addPiece(self, piece):
+        self.starts.append(self.length)
+        self.pieces.append(piece)
+        self.length += len(piece)
+
+    def append(self, fs):
+        u"""Append the FormattedString or plain string fs. A plain string gets the formatting of the
+        text before it, as with fs += s, or self.attributes if it is the first text."""
+        self._fs = None
+        pieces = self.pieces
+        if isinstance(fs, basestring):
+            if not pieces:
+                self._addPiece(StyledRun(fs, self.attributes))
+            elif isinstance(pieces[-1], StyledRun):
+                pieces[-1].append(fs)
+                self.length += len(fs)
+            else: # Format as the last formatted string, only copying that piece.
+                pieces[-1] = pieces[-1] + fs
+                self.length += len(fs)
+        elif fs is not None:
+            self._addPiece(fs)
+
+    def appendText(self, text, attributes):
+        u"""Append plain text with the interned attributes dictionary. If the last run has the same
+        attributes, then the text is added to that run. The text transform of the attributes is
+        applied here, so texts with the same attributes can be joined."""
+        self._appendRun(transformText(text, attributes), attributes)
+
+    def _appendRun(self, text, attributes):
+        self._fs = None
+        pieces = self.pieces
+        if pieces and isinstance(pieces[-1], StyledRun) and pieces[-1].attributes is attributes:
+            pieces[-1].append(text)
+            self.length += len(text)
+        else:
+            self._addPiece(StyledRun(text, attributes))
+
+    def extend(self, buffer):
+        u"""Append the pieces of the TextBuffer buffer. Runs are copied, text is not transformed again."""
+        for piece in buffer.pieces:
+            if not isinstance(piece, StyledRun):
+                self.append(piece)
+            elif piece.attributes is None:
+                self.append(piece.text)
+            else:
+                self._appendRun(piece.text, piece.attributes)
+
+    def getText(self):
+        u"""Answer the plain unicode text of all pieces."""
+        texts = []
+        for piece in self.pieces:
+            if isinstance(piece, StyledRun):
+                texts.append(piece.text)
+            else:
+                texts.append(u'%s' % piece)
+        return u''.join(texts)
+
+    def getFS(self):
+        u"""Answer the FormattedString of all pieces. Answer None if the buffer is empty.
+        The result is cached until the next change. A single formatted piece is answered
+        without making a copy. Runs of plain text get the attributes of the run before them,
+        or self.attributes, as the formatting of fs += s."""
+        if self._fs is None and self.pieces:
+            formatted = []
+            attributes = self.attributes
+            for piece in self.pieces:
+                if isinstance(piece, StyledRun):
+                    if piece.attributes is not None:
+                        attributes = piece.attributes
+                    elif attributes is not None:
+                        piece = StyledRun(piece.text, attributes)
+                    piece = piece.getFS()
+                formatted.append(piece)
+            if len(formatted) == 1:
+                self._fs = formatted[0]
+            else:
+                fs = FormattedString()
+                for piece in formatted:
+                    fs.append(piece)
+                self._fs = fs
+        return self._fs
+
+    def slice(self, start, end=None):
+        u"""Answer a new TextBuffer with the text from index start to end. Formatted strings are
+        only copied if they are cut at start or end."""
+        if end is None or end > self.length:
+            end = self.length
+        buffer = self.__class__(attributes=self.attributes)
+        if start >= end:
+            return buffer
+        index = bisect_right(self.starts, start) - 1
+        while index < len(self.pieces) and self.starts[index] < end:
+            piece = self.pieces[index]
+            pieceStart = self.starts[index]
+            s = max(0, start - pieceStart)
+            e = min(len(piece), end - pieceStart)
+            if isinstance(piece, StyledRun): # Always a new run, as runs are changed by appending.
+                piece = piece.slice(s, e)
+            elif s > 0 or e < len(piece):
+                piece = piece[s:e]
+            buffer._addPiece(piece)
+            index += 1
+        return buffer
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,378 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#     Made for usage in DrawBot, www.drawbot.com
+# -----------------------------------------------------------------------------
+#
+#     textflow.py
+#
+#     Iterative flow of text through a chain of text boxes, linked by their
+#     nextElement and nextPage attributes. The chain is resolved once, as far as
+#     the text needs it, without recursion into the solving of the next box.
+#     Each box only measures a slice of the text that ends on a break position
+#     after the estimated capacity of the box, and the overflow of that slice tells
+#     how much text fits. The placements are kept, so flowing an edited text starts
+#     at the first box that changed. The flow keeps the complete text as source, as
+#     the boxes only hold their slice of it. Text that is appended to a placed box is
+#     inserted in the source at the end of that slice.
+#
+import re
+
+from pagebot.toolbox.textbuffer import TextBuffer, StyledRun
+
+BREAK_PATTERN = re.compile(r'\s') # Positions where a measured slice of text can end.
+
+def getBreak(text, index):
+    u"""Answer the first break position in text at or after index, after the white space.
+
+    >>> text = u'Lorem ipsum dolor'
+    >>> getBreak(text, 0), getBreak(text, 7), getBreak(text, 14)
+    (6, 12, 17)
+    """
+    if index >= len(text):
+        return len(text)
+    match = BREAK_PATTERN.search(text, index)
+    if match is None:
+        return len(text)
+    return match.end()
+
+def fitText(box, source, start=0, capacity=500, text=None):
+    u"""Place slices of the TextBuffer source from start in box, ending on break positions, growing
+    from capacity until there is overflow or the end of the text. The overflow tells where the text
+    in box ends. Answer the tuple (end, full, measurements), where full is True if there was overflow.
+    The last measured slice is left in box."""
+    if text is None:
+        text = source.getText()
+    measurements = 0
+    probeEnd = getBreak(text, start + max(1, capacity))
+    while True:
+        box.textBuffer = source.slice(start, probeEnd)
+        measurements += 1
+        overflow = len(box.getOverflow() or '')
+        if overflow:
+            return probeEnd - overflow, True, measurements
+        if probeEnd >= len(text):
+            return probeEnd, False, measurements
+        probeEnd = getBreak(text, start + 2*(probeEnd - start))
+
+class TextPlacement(object):
+    u"""Range of text of the flow that is placed in one box, with the geometry of the box
+    at the time it was measured."""
+    __slots__ = ('start', 'end', 'full', 'geometry', 'buffer')
+
+    def __init__(self, start, end, full, geometry, buffer):
+        self.start = start
+        self.end = end
+        self.full = full # True if the box had overflow, False if the text ended in the box.
+        self.geometry = geometry
+        self.buffer = buffer # The TextBuffer that was placed in the box.
+
+    def __repr__(self):
+        return '[%s %d-%d]' % (self.__class__.__name__, self.start, self.end)
+
+class TextFlow(object):
+    u"""Flow of the text of a source TextBuffer through box and the chain of boxes that it
+    is linked to. Boxes need the TextBox interface of textBuffer, getOverflow( ), solve( ),
+    nextElement, nextPage and getElementPage( ).
+    The last box of the chain gets all remaining text, so its overflow can still be shown.
+    Boxes after the end of the text are not changed, unless they have text of a previous flow.
+
+    >>> from pagebot.toolbox.textbuffer import internAttributes
+    >>> class Box(object): # Box for w/5 characters, breaking after spaces, linked to the next box in boxes.
+    ...     def __init__(self, boxes):
+    ...         self.name = 'box%d' % len(boxes)
+    ...         self.boxes = boxes
+    ...         self.textBuffer = TextBuffer()
+    ...         self.w, self.h, self.pl, self.pr, self.pt, self.pb = 100, 100, 0, 0, 0, 0
+    ...     def getOverflow(self):
+    ...         text = self.textBuffer.getText()
+    ...         if len(text) <= self.w//5:
+    ...             return u''
+    ...         return text[text.rfind(u' ', 0, self.w//5 + 1) + 1:]
+    ...     def _get_nextElement(self):
+    ...         index = self.boxes.index(self) + 1
+    ...         if index < len(self.boxes):
+    ...             return self.boxes[index].name
+    ...     nextElement = property(_get_nextElement)
+    ...     def getElementPage(self):
+    ...         return self
+    ...     def getElementByName(self, name):
+    ...         return [box for box in self.boxes if box.name == name][0]
+    ...     elements = ()
+    >>> boxes = []
+    >>> for n in range(4):
+    ...     boxes.append(Box(boxes))
+    >>> attributes = internAttributes(dict(font='Verdana', fontSize=12))
+    >>> boxes[0].textBuffer.appendText(u'Lorem ipsum dolor sit amet, consectetur adipiscing elit.', attributes)
+    >>> flow = TextFlow(boxes[0])
+    >>> flow.flow() == boxes, [box.textBuffer.getText() for box in boxes]
+    (True, [u'Lorem ipsum dolor ', u'sit amet, ', u'consectetur ', u'adipiscing elit.'])
+    >>> boxes[1].textBuffer.appendText(u'EDIT ', attributes) # Inserted at the end of the text of the box.
+    >>> flow.isPlaced(boxes[1]), flow.flow() == boxes[1:], [box.textBuffer.getText() for box in boxes]
+    (False, True, [u'Lorem ipsum dolor ', u'sit amet, EDIT ', u'consectetur ', u'adipiscing elit.'])
+    >>> boxes[0].textBuffer.appendText(u'EDIT ', attributes)
+    >>> boxes[1].w = 50 # Changed geometry is measured again.
+    >>> flow.flow() == boxes, [box.textBuffer.getText() for box in boxes]
+    (True, [u'Lorem ipsum dolor ', u'EDIT sit ', u'amet, EDIT ', u'consectetur adipiscing elit.'])
+    >>> flow.flow(), len(flow.source)
+    ([], 66)
+    >>> boxes[0].textBuffer = TextBuffer(u'New text') # Another buffer in the first box is the new source.
+    >>> flow.flow() == boxes, [box.textBuffer.getText() for box in boxes]
+    (True, [u'New text', u'', u'', u''])
+    """
+
+    MAX_BOXES = 10000 # Guard against flows that never end, e.g. by pages that make new pages.
+    INITIAL_CAPACITY = 500 # Estimated number of characters of a box that was not measured before.
+
+    def __init__(self, box):
+        self.box = box # First box of the flow.
+        self.chain = None # List of resolved boxes, extended by self._getBox(index)
+        self._indices = {} # Key is id of box, value is its index in self.chain
+        self._resolving = True # False if the end of the chain is found.
+        self.placements = []
+        self.source = None # TextBuffer with the complete text of the flow.
+        self._text = None # Plain text and piece signature of the source when it was flowed.
+        self._signature = None
+        self.measurements = 0 # Number of measured slices, for statistics.
+
+    def __repr__(self):
+        return '[%s Boxes:%d Placed:%d Measurements:%d]' % (self.__class__.__name__,
+            len(self.chain or ()), len(self.placements), self.measurements)
+
+    #   C H A I N
+
+    def _getElementByName(self, page, name):
+        u"""Answer the element with name on page. Flow boxes are mostly children of the page, so these
+        are tried first, before searching the offspring, where all pages of a flow have the same names."""
+        for e in page.elements:
+            if e.name == name:
+                return e
+        return page.getElementByName(name)
+
+    def _findNext(self, box, found):
+        u"""Answer the box that box is linked to, as TextBox.overflow2Next did. Search on the
+        page of box first, then on box.nextPage. Answer None if there is no next box."""
+        if not box.nextElement:
+            return None
+        page = box.getElementPage()
+        if page is None:
+            return None
+        nextBox = self._getElementByName(page, box.nextElement)
+        if nextBox is None or id(nextBox) in found or (len(nextBox.textBuffer) and nextBox.prevElement != box.name):
+            # Not found, already in the chain or filled by another flow, search on the next page.
+            if box.nextPage is None or box.doc is None:
+                return None
+            page = box.doc.getPage(box.nextPage)
+            if page is None:
+                return None
+            nextBox = self._getElementByName(page, box.nextElement)
+            if nextBox is None or id(nextBox) in found:
+                return None
+        nextBox.prevPage = page.name
+        nextBox.prevElement = box.name # Remember the back link
+        return nextBox
+
+    def _getBox(self, index):
+        u"""Answer the box at index in the chain, resolving the chain up to that box when needed.
+        Answer None if the chain ends before index."""
+        chain = self.chain
+        if chain is None:
+            chain = self.chain = [self.box]
+            self._indices = {id(self.box): 0}
+            self.box._textFlow = self
+        while index >= len(chain) and len(chain) < self.MAX_BOXES and self._resolving:
+            box = self._findNext(chain[-1], self._indices)
+            if box is None:
+                self._resolving = False
+                break
+            self._indices[id(box)] = len(chain)
+            chain.append(box)
+            box._textFlow = self
+        if index < len(chain):
+            return chain[index]
+        return None
+
+    def resolve(self):
+        u"""Answer the list of all boxes of the flow, starting with self.box. The chain is resolved
+        once, boxes are added when the flow needs them. Call self.reset( ) if the links or pages
+        have changed."""
+        self._getBox(self.MAX_BOXES)
+        return self.chain
+
+    def reset(self):
+        u"""Forget the chain and all placements, so the next flow starts from the first box."""
+        self.chain = None
+        self._indices = {}
+        self._resolving = True
+        self.placements = []
+        self._text = self._signature = None
+
+    def _getPlacement(self, box):
+        u"""Answer the placement of box, if box is in the chain and still has the buffer that was placed
+        in it, possibly with text appended. Otherwise answer None."""
+        index = self._indices.get(id(box))
+        if index is None or index >= len(self.placements) or self.chain[index] is not box:
+            return None
+        placement = self.placements[index]
+        if placement.buffer is not box.textBuffer:
+            return None
+        return placement
+
+    def isInFlow(self, box):
+        u"""Answer the boolean flag if box has text of this flow, possibly edited."""
+        return self._getPlacement(box) is not None
+
+    def isPlaced(self, box):
+        u"""Answer the boolean flag if box still has the text that this flow placed in it."""
+        placement = self._getPlacement(box) # Appending to the placed buffer also changes the text.
+        return placement is not None and len(placement.buffer) == placement.end - placement.start
+
+    def getSource(self):
+        u"""Answer the TextBuffer with the complete text of the flow, with the edits of the boxes applied.
+        Text that was appended to the placed text of a box is inserted at the end of its slice. If self.box
+        has another buffer than the one that was placed, then that is the new text of the flow.
+        Answer self.source if nothing was edited."""
+        source = self.source
+        if source is None or not self.placements or self.box.textBuffer is not self.placements[0].buffer:
+            return self.box.textBuffer
+        edited = None
+        start = 0
+        for index, placement in enumerate(self.placements):
+            buffer = placement.buffer
+            if self.chain[index].textBuffer is buffer and len(buffer) != placement.end - placement.start:
+                if edited is None:
+                    edited = TextBuffer(attributes=source.attributes)
+                edited.extend(source.slice(start, placement.start))
+                edited.extend(buffer)
+                start = placement.end
+        if edited is None:
+            return source
+        edited.extend(source.slice(start))
+        return edited
+
+    #   F L O W
+
+    def _getSignature(self, source):
+        u"""Answer the list of (start, attributes) of the pieces of source, to find changes in style.
+        Formatted strings are compared by identity."""
+        signature = []
+        for start, piece in zip(source.starts, source.pieces):
+            if isinstance(piece, StyledRun):
+                piece = piece.attributes
+            signature.append((start, piece))
+        return signature
+
+    def _getFirstChange(self, text, signature):
+        u"""Answer the index of the first character that differs from the previous flow, in text
+        or in style. Answer None if nothing changed."""
+        if self._text is None:
+            return 0
+        oldText = self._text
+        change = None
+        if oldText != text: # Bisect on the length of the common start, comparing slices is fast.
+            low, high = 0, min(len(oldText), len(text))
+            while low < high:
+                middle = (low + high + 1) // 2
+                if oldText[low:middle] == text[low:middle]:
+                    low = middle
+                else:
+                    high = middle - 1
+            change = low
+        oldSignature = self._signature
+        for index in range(max(len(oldSignature), len(signature))):
+            if index >= len(oldSignature):
+                start = signature[index][0]
+            elif index >= len(signature):
+                start = oldSignature[index][0]
+            else:
+                (oldStart, oldKey), (start, key) = oldSignature[index], signature[index]
+                if oldStart == start and oldKey is key:
+                    continue
+                start = min(oldStart, start)
+            if change is None or start < change:
+                change = start
+            break
+        return change
+
+    def _getGeometry(self, box):
+        return box.w, box.h, box.pl, box.pr, box.pt, box.pb
+
+    def _place(self, box, buffer):
+        box.textBuffer = buffer
+
+    def _measure(self, box, text, start, capacity):
+        end, full, measurements = fitText(box, self.source, start, capacity, text)
+        self.measurements += measurements
+        return end, full
+
+    def flow(self, source=None):
+        u"""Flow the text of source (default is self.getSource( ), the text of the previous flow with the
+        edits of the boxes) through the chain of boxes. Placements of boxes before the first change in
+        text, style or box geometry are kept. Answer the list of boxes that got new text."""
+        if source is None:
+            source = self.getSource()
+        if source is self.source and len(source) == len(self._text): # Nothing changed in the text.
+            text = self._text
+            change = None
+        else:
+            text = source.getText()
+            signature = self._getSignature(source)
+            change = self._getFirstChange(text, signature)
+            self.source = source
+            self._text = text
+            self._signature = signature
+
+        changed = []
+        placements = []
+        start = index = 0
+        box = self._getBox(0)
+        while box is not None:
+            nextBox = self._getBox(index + 1)
+            geometry = self._getGeometry(box)
+            placement = None
+            if index < len(self.placements):
+                placement = self.placements[index]
+            if placement is not None and placement.start == start and placement.geometry == geometry and\
+                    (nextBox is not None or not placement.full) and\
+                    (change is None or (placement.full and change > getBreak(text, placement.end))):
+                # Nothing changed in the text of the box, or in the first word that did not fit.
+                if box.textBuffer is not placement.buffer:
+                    placement.buffer = source.slice(placement.start, placement.end)
+                    self._place(box, placement.buffer)
+                    changed.append(box)
+            else:
+                if nextBox is None: # Last box of the chain gets all remaining text.
+                    end, full = len(text), False
+                else:
+                    capacity = self.INITIAL_CAPACITY
+                    if placement is not None and placement.full: # Measured before, start with that capacity.
+                        capacity = placement.end - placement.start
+                    elif placements:
+                        capacity = placements[-1].end - placements[-1].start
+                    end, full = self._measure(box, text, start, capacity)
+                placement = TextPlacement(start, end, full, geometry, source.slice(start, end))
+                self._place(box, placement.buffer)
+                changed.append(box)
+            placements.append(placement)
+            if not placement.full: # End of the text.
+                break
+            start = placement.end
+            index += 1
+            box = nextBox
+        # Clear boxes that still have text of the previous flow, after the end of the text.
+        for index in range(len(placements), len(self.placements)):
+            box = self.chain[index]
+            if self.isPlaced(box):
+                self._place(box, TextBuffer())
+                changed.append(box)
+        self.placements = placements
+        return changed
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -11,7 +11,6 @@
 #
 #     typesetter.py
 #
-import copy
 import codecs
 
 import xml.etree.ElementTree as ET
@@ -26,10 +25,12 @@ except ImportError:
     print 'Typesetter: Install Python markdown from https://pypi.python.org/pypi/Markdown'
     markdown = None
 
-from pagebot import newFS, getMarker
+from pagebot import newFS, getMarker, getFSAttributes, templateAttributes2FS
 from pagebot.elements import Galley, Image, Ruler, TextBox
 from pagebot.document import Document
 from pagebot.builders import WebBuilder
+from pagebot.toolbox.chainedstyle import ChainedStyle
+from pagebot.readers.mdreader import markDownCache, parseMarkDown, readMarkDownText
 
 class Typesetter(object):
 
@@ -38,6 +39,10 @@ class Typesetter(object):
     RULER_CLASS = Ruler
     GALLEY_CLASS = Galley
 
+    # Cache of parsed markdown trees, keyed by the hash of the markdown text. Set to None to
+    # convert on every typesetFile. Use MarkDownCache(path) to keep the XML for following runs.
+    MARKDOWN_CACHE = markDownCache
+
     DEFAULT_BULLET = u'•' # Used if no valid bullet string can be found in styles.
 
     TAG_MATCHING = {
@@ -72,6 +77,8 @@ class Typesetter(object):
         # Stack of graphic state as cascading styles. Last is template for the next.
         self.gState = [] 
         self.tagHistory = []
+        self._tagStates = [] # States of self._styleMatcher for the tags in self.tagHistory.
+        self._styleMatcher = None # SelectorMatcher of the doc styles, used to match the tag history.
         # HTML/CSS Builder, to build parallel HTML while parsing the markdown.
         self.b = WebBuilder()
         # Code block results if any ~~~Python blocks defined in the Markdown file.
@@ -309,9 +316,34 @@ class Typesetter(object):
         if not self.tagHistory or tag != self.tagHistory[-1]:
             self.tagHistory.append(tag)
 
+    def popHistory(self):
+        u"""Remove the last tag from the history and answer it."""
+        tag = self.tagHistory.pop()
+        del self._tagStates[len(self.tagHistory):]
+        return tag
+
     def getHistory(self):
         return self.tagHistory
 
+    def getHistoryState(self):
+        u"""Answer the (matcher, state) of the tag history in the compiled style names of self.doc.
+        Only tags added since the previous call make a transition. If the doc or its styles changed,
+        then the matcher is new and the states of the full history are calculated again."""
+        matcher = self.doc.getStyleMatcher()
+        if matcher is not self._styleMatcher:
+            self._styleMatcher = matcher
+            self._tagStates = []
+        states = self._tagStates
+        del states[len(self.tagHistory):]
+        if states:
+            state = states[-1]
+        else:
+            state = matcher.START
+        for tag in self.tagHistory[len(states):]:
+            state = matcher.next(state, tag)
+            states.append(state)
+        return matcher, state
+
     def getFootnotes(self, e):
         u"""Answer the footnotes dictionary from the e.lib (derived from the root document)"""
         if self.doc is not None:
@@ -420,19 +452,12 @@ class Typesetter(object):
         return s
 
     def getMatchingStyleNames(self, tag):
-        u"""Answer the list of matching style, with decreasing relevance."""
+        u"""Answer the list of style names that match the end of the tag history, with decreasing relevance."""
         #parents = self.TAG_MATCHING.get(tag)
-        revHistory = self.tagHistory[:]
-        revHistory.reverse()
-        matches = []
-        for n in range(len(revHistory)):
-            styleName = revHistory[:n+1]
-            styleName.reverse()
-            styleName = ' '.join(styleName)
-            if self.doc is not None and styleName in self.doc.styles:
-                matches.append(styleName)
-        matches.reverse()
-        return matches
+        if self.doc is None:
+            return []
+        matcher, state = self.getHistoryState()
+        return list(matcher.getMatches(state))
 
     def getNamedStyle(self, styleName):
         u"""Answer the named style and otherwise an empty style dict if the named style
@@ -444,19 +469,18 @@ class Typesetter(object):
         return {}
 
     def getNodeStyle(self, tag):
-        u"""Make a copy of the top of the style graphics state and mew *style* into it. Answer the new style."""
+        u"""Answer a new ChainedStyle with the best matching style for *tag* as layer on top of the
+        style graphics state. Only the values of the matching style are copied, the layers of
+        the top style are shared."""
         if self.peekStyle() is None: # Not an initialized stack, use doc.rootStyle as default.
             self.pushStyle(self.getNamedStyle('root')) # Happens if calling directly, without check on e
-        mergedStyle = copy.copy(self.peekStyle())
         # Find the best matching style for tag on order of relevance, 
         # considering the possible HTML tag parents and the history.
         for styleName in self.getMatchingStyleNames(tag):
             nodeStyle = self.getNamedStyle(styleName)
             if nodeStyle: # Not None and not empty
-                for name, value in nodeStyle.items():
-                    mergedStyle[name] = value
-                break
-        return mergedStyle
+                return ChainedStyle(nodeStyle, self.peekStyle())
+        return ChainedStyle(None, self.peekStyle())
 
     def appendString(self, fs):
         u"""Append the string to the current box, if it is defined. Otherwise add to the existing galley."""
@@ -488,6 +512,21 @@ class Typesetter(object):
         u"""Opem+close the html tag of node."""
         self.htmlNode(node, end=True)
 
+    def appendText(self, text, style, e=None):
+        u"""Append the plain text with the formatting attributes of style to the current box or galley.
+        The text is stored with the interned attributes in the text buffer of the box, it does not become
+        a FormattedString until the box is measured or drawn. Targets that cannot store attributed text
+        get a new FormattedString."""
+        attributes = getFSAttributes(e, style)
+        if self.box is not None:
+            target = self.box
+        else:
+            target = self.galley
+        if hasattr(target, 'appendText'):
+            target.appendText(text, attributes)
+        else:
+            target.appendString(templateAttributes2FS(text, attributes))
+
     def appendHtml(self, html):
         u"""Append the UTF-8 html to the current box, if it is defined. Otherwise add to the existing galley."""
         if self.box is not None:
@@ -533,8 +572,8 @@ class Typesetter(object):
         
         nodeText = self._strip(node.text)
         if nodeText: # Not None and still has content after stripping?
-            fs = newFS(nodeText, e, nodeStyle)
-            self.appendString(fs)
+            # The layers of the ChainedStyle are read as stack of styles, without making a copy.
+            self.appendText(nodeText, nodeStyle.maps, e)
             self.appendHtml(nodeText) # Export the plain text as parallel HTML output as well.
 
         # Type set all child node in the current node, by recursive call.
@@ -554,8 +593,7 @@ class Typesetter(object):
             # to empty string?
             childTail = child.tail #self._strip(child.tail, postfix=self.getStyleValue('postfix', e, nodeStyle, ''))
             if childTail: # Any tail left after stripping, then append to the galley.
-                fs = newFS(childTail, e, nodeStyle)
-                self.appendString(fs)
+                self.appendText(childTail, nodeStyle.maps, e)
                 self.appendHtml(childTail) # Export the plain text as parallel HTML output as well.
 
         # Close the HTML tag of this node.
@@ -581,6 +619,10 @@ class Typesetter(object):
             self.galley.appendString(fs) # Add to the current flow textBox
         """
 
+    def getMarkDownExtensions(self):
+        u"""Answer the list of new markdown extension instances used to convert markdown files."""
+        return [FencedCodeExtension(), FootnoteExtension(), LiteratureExtension(), Nl2BrExtension()]
+
     def typesetFile(self, fileName, e=None, xPath=None):
         u"""Read the XML document and parse it into a tree of document-chapter nodes. Make the typesetter
         start at page pageNumber and find the name of the flow in the page template.
@@ -590,20 +632,13 @@ class Typesetter(object):
         child elements. Answer the root node for convenience of the caller."""
         fileExtension = fileName.split('.')[-1]
         if fileExtension == 'md':
-            # If we have MarkDown content, convert to XML (XHTML)
-            f = codecs.open(fileName, mode="r", encoding="utf-8")
-            mdText = f.read()
-            f.close()
-            mdExtensions = [FencedCodeExtension(), FootnoteExtension(), LiteratureExtension(), Nl2BrExtension()]
-            xml = u'<?xml version="1.0" encoding="utf-8"?>\n<document>%s</document>' % markdown.markdown(mdText, extensions=mdExtensions)
-            xml = xml.replace('&nbsp;', ' ')
-            fileName = fileName + '.xml' # New file name to XML export
-            f = codecs.open(fileName, mode="w", encoding="utf-8")
-            f.write(xml)
-            f.close()
-
-        tree = ET.parse(fileName)
-        root = tree.getroot() # Get the root element of the tree.
+            # If we have MarkDown content, convert to XML (XHTML) and parse it in memory.
+            # Unchanged markdown answers the tree from self.MARKDOWN_CACHE, skipping conversion.
+            mdText = readMarkDownText(fileName)
+            root = parseMarkDown(mdText, extensions=self.getMarkDownExtensions(), cache=self.MARKDOWN_CACHE)
+        else:
+            tree = ET.parse(fileName)
+            root = tree.getroot() # Get the root element of the tree.
         # If there is XSL filtering defined, they get the filtered nodes.
         if xPath is not None:
             filteredNodes = root.findall(xPath)